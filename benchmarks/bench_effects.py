@@ -0,0 +1,91 @@
+"""
+Measures the cost per megapixel of each effect of effects.apply_effects,
+and of effect chains run fused (one call, as the pipeline does) against the
+same effects run one at a time (one pass and one intermediate image each).
+
+Usage:
+    python benchmarks/bench_effects.py [--size 2000] [--repeat 3] [--output effects.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from image_ops.effects import apply_effects, parse_effect
+
+EFFECTS = [
+    'grayscale', 'sepia', 'brightness:1.2', 'contrast:1.2', 'gamma:2.2', 'threshold',
+    'blur:2', 'sharpen', 'matrix:0.9,0.1,0,0,1,0,0.1,0,0.9',
+]
+
+CHAINS = {
+    'tone': ['brightness:1.1', 'contrast:1.2', 'gamma:1.4'],
+    'vintage': ['contrast:1.1', 'sepia', 'brightness:0.95', 'gamma:1.2'],
+    'print': ['grayscale', 'contrast:1.3', 'threshold:140'],
+}
+
+def _make_source(size: int) -> Image.Image:
+    """A photo-like RGB image: gradients plus noise."""
+    gradient = Image.linear_gradient('L').resize((size, size))
+    noise = Image.effect_noise((size, size), 16)
+    return Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+def _time(func, repeat: int) -> float:
+    """Best time of `repeat` calls, in ms."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _one_at_a_time(img: Image.Image, chain: list) -> Image.Image:
+    for effect in chain:
+        img = apply_effects(img, [effect])
+    return img
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cost per megapixel of each effect and of fused chains.")
+    parser.add_argument('--size', type=int, default=2000, metavar='PX', help="Side of the square test image (default: 2000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best is kept (default: 3).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    img = _make_source(args.size)
+    img.load()
+    megapixels = args.size * args.size / 1_000_000
+    apply_effects(img, [parse_effect('sepia')])  # Warm-up
+
+    results = {'megapixels': megapixels, 'effects': [], 'chains': []}
+    print(f"{'effect':<60} {'ms':>9} {'ms/MP':>9}")
+    for spec in EFFECTS:
+        effect = parse_effect(spec)
+        elapsed = _time(lambda: apply_effects(img, [effect]), args.repeat)
+        print(f"{spec:<60} {elapsed:9.1f} {elapsed / megapixels:9.2f}")
+        results['effects'].append({'effect': spec, 'ms': round(elapsed, 2), 'ms_per_mp': round(elapsed / megapixels, 3)})
+
+    print(f"\n{'chain':<60} {'fused':>9} {'separate':>9} {'speedup':>8}  (ms/MP)")
+    for name, specs in CHAINS.items():
+        chain = [parse_effect(spec) for spec in specs]
+        fused = _time(lambda: apply_effects(img, chain), args.repeat) / megapixels
+        separate = _time(lambda: _one_at_a_time(img, chain), args.repeat) / megapixels
+        label = f"{name} ({', '.join(specs)})"
+        print(f"{label:<60} {fused:9.2f} {separate:9.2f} {separate / fused:7.1f}x")
+        results['chains'].append({
+            'chain': name,
+            'effects': specs,
+            'fused_ms_per_mp': round(fused, 3),
+            'separate_ms_per_mp': round(separate, 3),
+        })
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares encode time and output size of the encoder presets.
+
+Each format is encoded with Pillow's defaults ('default', the previous
+behaviour) and with every preset of convert.ENCODE_PRESETS, from a photo-like
+image and a flat graphic with transparency. 'auto' rows time
+convert.choose_format with its default quality budget, compared with PNG.
+
+Usage:
+    python benchmarks/bench_encode.py [--size 2000] [--repeat 3] [--output encode.json]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image, ImageDraw
+from image_ops.convert import ENCODE_PRESETS, choose_format, encode, pil_format, to_format
+
+FORMATS = ['png', 'jpg', 'webp', 'avif']
+
+def _make_sources(size: int) -> dict:
+    """A photo-like RGB image (gradients plus noise) and a flat RGBA graphic."""
+    gradient = Image.linear_gradient('L').resize((size, size))
+    noise = Image.effect_noise((size, size), 8)
+    photo = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+    graphic = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(graphic)
+    for i in range(8):
+        inset = i * size // 20
+        draw.ellipse((inset, inset, size - inset, size - inset), fill=(40 * i, 120, 255 - 30 * i, 255))
+    return {'photo': photo, 'graphic': graphic}
+
+def _encode_default(img: Image.Image, output_format: str) -> bytes:
+    buffer = io.BytesIO()
+    to_format(img, output_format).save(buffer, format=pil_format(output_format))
+    return buffer.getvalue()
+
+def _time(func, repeat: int) -> tuple:
+    """Best time of `repeat` calls in ms, and the size of the result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encode time and size per encoder preset.")
+    parser.add_argument('--size', type=int, default=2000, metavar='PX', help="Side of the square test images (default: 2000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Encodes per measurement; the best is kept (default: 3).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'source':<8} {'format':<6} {'preset':<9} {'encode ms':>10} {'bytes':>10} {'vs default':>10}")
+    for source_name, img in _make_sources(args.size).items():
+        for output_format in FORMATS:
+            default_ms, default_bytes = _time(lambda: _encode_default(img, output_format), args.repeat)
+            rows = [('default', default_ms, default_bytes)]
+            for preset in ENCODE_PRESETS:
+                elapsed, size = _time(lambda: encode(img, output_format, preset), args.repeat)
+                rows.append((preset, elapsed, size))
+
+            for preset, elapsed, size in rows:
+                ratio = size / default_bytes
+                print(f"{source_name:<8} {output_format:<6} {preset:<9} {elapsed:10.1f} {size:10d} {ratio:9.0%}")
+                results.append({
+                    'source': source_name,
+                    'format': output_format,
+                    'preset': preset,
+                    'encode_ms': round(elapsed, 2),
+                    'bytes': size,
+                    'size_vs_default': round(ratio, 4),
+                })
+
+        png_bytes = len(_encode_default(img, 'png'))
+        start = time.perf_counter()
+        chosen, data = choose_format(img)
+        elapsed = (time.perf_counter() - start) * 1000
+        ratio = len(data) / png_bytes
+        print(f"{source_name:<8} {'auto':<6} {chosen:<9} {elapsed:10.1f} {len(data):10d} {ratio:9.0%}")
+        results.append({
+            'source': source_name,
+            'format': 'auto',
+            'preset': chosen,
+            'encode_ms': round(elapsed, 2),
+            'bytes': len(data),
+            'size_vs_default': round(ratio, 4),
+        })
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares resize throughput and peak memory across presets.
+
+Each mode runs in a fresh interpreter so its peak RSS is measured on its own.
+'baseline' is the previous behaviour: a full decode followed by `img.resize`.
+
+Usage:
+    python benchmarks/bench_resize.py [--width 6000] [--height 4000] [--target 256] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from image_ops.resize import RESIZE_PRESETS, resize
+
+MODES = ['baseline'] + list(RESIZE_PRESETS)
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _make_source(path: str, width: int, height: int):
+    """Writes a synthetic photo-like JPEG (smooth gradients plus noise)."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(path, quality=90)
+
+def _run_mode(source: str, mode: str, target: int, repeat: int) -> dict:
+    """Times `repeat` resizes of `source` in this process."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(source) as img:
+            if mode == 'baseline':
+                img.resize((target, target))
+            else:
+                resize(img, target, target, preset=mode)
+        durations.append(time.perf_counter() - start)
+
+    with Image.open(source) as img:
+        megapixels = img.width * img.height / 1e6
+    mean = sum(durations) / len(durations)
+    return {
+        'mode': mode,
+        'mean_seconds': round(mean, 4),
+        'images_per_second': round(1 / mean, 2),
+        'source_megapixels_per_second': round(megapixels / mean, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark resize presets against a full decode.")
+    parser.add_argument('--width', type=int, default=6000, help="Source width (default: 6000, i.e. 24MP with the default height).")
+    parser.add_argument('--height', type=int, default=4000, help="Source height (default: 4000).")
+    parser.add_argument('--target', type=int, default=256, help="Square thumbnail size (default: 256).")
+    parser.add_argument('--repeat', type=int, default=5, help="Resizes per mode (default: 5).")
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--make-source', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.make_source:
+        _make_source(args.source, args.width, args.height)
+        return
+    if args.mode:
+        print(json.dumps(_run_mode(args.source, args.mode, args.target, args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "source.jpg")
+        # Generated in a child too: Linux carries the peak RSS of a parent over to
+        # children, so this process must stay small for the measurements to be fair.
+        subprocess.run(
+            [sys.executable, __file__, '--make-source', '--source', source, '--width', str(args.width), '--height', str(args.height)],
+            check=True
+        )
+
+        results = []
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, '--source', source, '--target', str(args.target), '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output))
+
+    print(f"{'mode':<10} {'img/s':>8} {'MP/s':>8} {'peak RSS (MB)':>14}")
+    for result in results:
+        print(f"{result['mode']:<10} {result['images_per_second']:>8} {result['source_megapixels_per_second']:>8} {result['peak_rss_mb']:>14}")
+
+if __name__ == '__main__':
+    main()
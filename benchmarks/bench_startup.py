@@ -0,0 +1,99 @@
+"""
+Measures CLI startup: how long `main.py` takes before doing any image work,
+and which heavy modules each kind of run imports.
+
+Each scenario runs `--repeat` times in a fresh interpreter. Times are reported
+as the median wall time and as the overhead over a bare `python -c pass`, which
+is what the budgets apply to. The run fails (exit code 1) when a scenario is
+over its budget or imports a module it should not need.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 10] [--budget-scale 1.0] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN = os.path.join(ROOT, 'main.py')
+SAMPLE = os.path.join(ROOT, 'assets', 'logo.png')
+
+# Modules that only some flags need.
+HEAVY_MODULES = ['PIL.Image', 'numpy', 'requests', 'rich.console', 'dotenv', 'image_ops.pipeline']
+
+def _scenarios(output_dir: str) -> dict:
+    """
+    Each scenario: its arguments to main.py, its overhead budget in ms, and
+    the heavy modules it must not import.
+    """
+    output_path = os.path.join(output_dir, 'logo.png')
+    return {
+        'help': {'args': ['--help'], 'budget_ms': 60, 'forbidden': HEAVY_MODULES},
+        'argument_error': {'args': ['--resize', 'x'], 'budget_ms': 60, 'forbidden': HEAVY_MODULES},
+        'grayscale': {'args': [SAMPLE, '-g', '-j', '1', '-o', output_path], 'budget_ms': 400, 'forbidden': ['numpy', 'requests']},
+    }
+
+def _time_command(command: list, repeat: int) -> float:
+    """Median wall time of `command` in ms."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+def _imported_modules(args: list) -> set:
+    """Modules `main.py args` imports, read from `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', MAIN] + args,
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.py startup time and imports.")
+    parser.add_argument('--repeat', type=int, default=10, help="Runs per scenario (default: 10).")
+    parser.add_argument('--budget-scale', type=float, default=1.0, metavar='X', help="Multiply every budget, e.g. on slow machines (default: 1.0).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    baseline = _time_command([sys.executable, '-c', 'pass'], args.repeat)
+    print(f"Interpreter startup: {baseline:.1f} ms")
+
+    results = {'interpreter_ms': round(baseline, 1), 'scenarios': {}}
+    failed = False
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, scenario in _scenarios(output_dir).items():
+            median = _time_command([sys.executable, MAIN] + scenario['args'], args.repeat)
+            overhead = median - baseline
+            budget = scenario['budget_ms'] * args.budget_scale
+            imported = sorted(set(scenario['forbidden']) & _imported_modules(scenario['args']))
+            ok = overhead <= budget and not imported
+            failed = failed or not ok
+
+            results['scenarios'][name] = {
+                'median_ms': round(median, 1),
+                'overhead_ms': round(overhead, 1),
+                'budget_ms': budget,
+                'unexpected_imports': imported,
+                'ok': ok,
+            }
+            status = "ok" if ok else "OVER BUDGET" if not imported else f"IMPORTS {', '.join(imported)}"
+            print(f"{name:<16} {median:8.1f} ms  (+{overhead:.1f} ms, budget {budget:.0f} ms)  {status}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmarks every image_ops operation and the full main.py pipeline on a
+synthetic corpus, and writes the results to JSON so runs can be compared.
+
+Each operation runs in a fresh interpreter over the whole corpus, one image
+after the other, so its per-image latency and peak RSS are measured on their
+own. The CLI scenarios run main.py on the corpus at each --jobs level. The
+remove.bg step talks to a local mock server instead of the real API.
+
+Metrics: images/s, MB/s (of source files read), p50/p95 per-image latency
+(operations only) and peak RSS.
+
+Usage:
+    python benchmarks/bench_suite.py [--count 12] [--sizes 512 2048] [--formats png jpg] [--alpha]
+                                     [--jobs 1 2 4] [--bg-latency 50] [--output results.json]
+                                     [--compare previous.json]
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+import PIL
+from PIL import Image, ImageDraw
+
+def _operations():
+    """Returns name -> callable(image_path, output_dir) running one operation on one file."""
+    from image_ops.convert import convert_format
+    from image_ops.effects import apply_grayscale
+    from image_ops.pipeline import Pipeline
+    from image_ops.resize import resize_image
+    from image_ops.rmbg import remove_background
+    from image_ops.vectorize import vectorize_image
+
+    def output(image_path, output_dir, ext):
+        return os.path.join(output_dir, f"{os.path.splitext(os.path.basename(image_path))[0]}.{ext}")
+
+    return {
+        'resize': lambda path, out: resize_image(path, 256, 256, custom_output_path=output(path, out, 'png')),
+        'grayscale': lambda path, out: apply_grayscale(path, custom_output_path=output(path, out, 'png')),
+        'convert_jpg': lambda path, out: convert_format(path, 'jpg', custom_output_path=output(path, out, 'jpg')),
+        'convert_ico': lambda path, out: convert_format(path, 'ico', custom_output_path=output(path, out, 'ico')),
+        'vectorize': lambda path, out: vectorize_image(path, custom_output_path=output(path, out, 'svg')),
+        'vectorize_colors': lambda path, out: vectorize_image(path, custom_output_path=output(path, out, 'svg'), colors=6),
+        'remove_bg': lambda path, out: remove_background(path, 'benchmark', custom_output_path=output(path, out, 'png')),
+        'pipeline': lambda path, out: Pipeline().resize(512, 512).grayscale().to_format('jpg').run(path, output(path, out, 'jpg')),
+    }
+
+OPERATIONS = ['resize', 'grayscale', 'convert_jpg', 'convert_ico', 'vectorize', 'vectorize_colors', 'remove_bg', 'pipeline']
+
+# name -> main.py arguments
+CLI_SCENARIOS = {
+    'resize_grayscale_jpg': ['-rs', '256', '256', '-g', '-f', 'jpg'],
+    'svg': ['--to-svg'],
+    'remove_bg_resize': ['-rb', '-rs', '256', '256'],
+}
+
+class _MockRemoveBg(BaseHTTPRequestHandler):
+    """A local remove.bg stand-in: waits `server.latency` seconds, then returns a small PNG."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _start_mock_server(latency: float) -> ThreadingHTTPServer:
+    """Starts the mock remove.bg server on a free local port and points REMOVE_BG_API_URL at it."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MockRemoveBg)
+    server.daemon_threads = True
+    server.latency = latency
+    buffer = io.BytesIO()
+    Image.new('RGBA', (64, 64), (255, 0, 0, 0)).save(buffer, format='PNG')
+    server.body = buffer.getvalue()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['REMOVE_BG_API_URL'] = f"http://127.0.0.1:{server.server_port}/v1.0/removebg"
+    os.environ['REMOVE_BG_API_KEY'] = 'benchmark'
+    return server
+
+def _peak_rss_mb(who: int) -> float:
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def make_corpus(directory: str, count: int, sizes: list, formats: list, alpha: bool) -> list:
+    """
+    Writes `count` synthetic logo-like images (gradients, noise and solid
+    shapes), cycling through `sizes` and `formats`.
+
+    Returns:
+        list[str]: The paths of the images.
+    """
+    paths = []
+    for index in range(count):
+        size = sizes[index % len(sizes)]
+        ext = formats[(index // len(sizes)) % len(formats)]
+
+        gradient = Image.linear_gradient('L').resize((size, size))
+        noise = Image.effect_noise((size, size), 8)
+        img = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.ROTATE_90)))
+        draw = ImageDraw.Draw(img)
+        for shape in range(4):
+            offset = size * (shape + 1) // 6
+            draw.ellipse((offset, offset, offset + size // 4, offset + size // 3), fill=(20 * shape, 40, 200 - 30 * shape))
+
+        if alpha and ext == 'png':
+            mask = Image.new('L', img.size, 0)
+            ImageDraw.Draw(mask).ellipse((size // 10, size // 10, size * 9 // 10, size * 9 // 10), fill=255)
+            img.putalpha(mask)
+
+        path = os.path.join(directory, f"image_{index:04d}_{size}.{ext}")
+        if ext == 'jpg':
+            img.save(path, quality=90)
+        else:
+            img.save(path)
+        paths.append(path)
+    return paths
+
+def _percentile(values: list, percent: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def _corpus_bytes(paths: list) -> int:
+    return sum(os.path.getsize(path) for path in paths)
+
+def _run_operation(name: str, corpus_dir: str, bg_latency: float) -> dict:
+    """Runs one operation over every image of the corpus in this process."""
+    if name == 'remove_bg':
+        _start_mock_server(bg_latency)
+    operation = _operations()[name]
+    paths = sorted(os.path.join(corpus_dir, file_name) for file_name in os.listdir(corpus_dir))
+
+    durations = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        for path in paths:
+            image_start = time.perf_counter()
+            operation(path, output_dir)
+            durations.append(time.perf_counter() - image_start)
+        total = time.perf_counter() - start
+
+    return {
+        'name': name,
+        'images': len(paths),
+        'seconds': round(total, 4),
+        'images_per_second': round(len(paths) / total, 2),
+        'mb_per_second': round(_corpus_bytes(paths) / (1024 * 1024) / total, 2),
+        'p50_ms': round(_percentile(durations, 50) * 1000, 2),
+        'p95_ms': round(_percentile(durations, 95) * 1000, 2),
+        'peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+    }
+
+def _run_cli(name: str, corpus_dir: str, jobs: int) -> dict:
+    """Runs main.py once on the corpus. The peak RSS is that of the largest process (main.py or a worker)."""
+    paths = os.listdir(corpus_dir)
+    with tempfile.TemporaryDirectory() as output_dir:
+        command = [sys.executable, os.path.join(ROOT, 'main.py'), '-i', corpus_dir, '-p', '*', '-o', output_dir, '-j', str(jobs)]
+        start = time.perf_counter()
+        subprocess.run(command + CLI_SCENARIOS[name], check=True, capture_output=True)
+        total = time.perf_counter() - start
+
+    return {
+        'name': name,
+        'jobs': jobs,
+        'images': len(paths),
+        'seconds': round(total, 4),
+        'images_per_second': round(len(paths) / total, 2),
+        'mb_per_second': round(_corpus_bytes([os.path.join(corpus_dir, path) for path in paths]) / (1024 * 1024) / total, 2),
+        'peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+
+def _in_child(*args) -> dict:
+    """Runs this script with `args` in a fresh interpreter and returns the JSON it prints."""
+    output = subprocess.run([sys.executable, __file__, *args], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def _compare(results: dict, previous_path: str):
+    """Prints the throughput change of every benchmark also found in `previous_path`."""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+
+    def index(section):
+        return {(row['name'], row.get('jobs')): row for row in section}
+
+    print(f"\n{'benchmark':<32} {'before img/s':>12} {'after img/s':>12} {'change':>8}")
+    for section in ('operations', 'cli'):
+        before = index(previous.get(section, []))
+        for key, row in index(results[section]).items():
+            if key not in before:
+                continue
+            old, new = before[key]['images_per_second'], row['images_per_second']
+            label = key[0] if key[1] is None else f"{key[0]} (-j {key[1]})"
+            print(f"{label:<32} {old:>12} {new:>12} {(new / old - 1) * 100 if old else 0:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image_ops operations and the main.py pipeline.")
+    parser.add_argument('--count', type=int, default=12, help="Images in the corpus (default: 12).")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 2048], metavar='PX', help="Square image sizes, cycled (default: 512 2048).")
+    parser.add_argument('--formats', nargs='+', default=['png', 'jpg'], choices=['png', 'jpg'], help="Source formats, cycled (default: png jpg).")
+    parser.add_argument('--alpha', action='store_true', help="Give PNG sources a transparent background.")
+    parser.add_argument('--jobs', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}), metavar='N', help="--jobs levels for the CLI runs (default: 1, 2 and the core count).")
+    parser.add_argument('--operations', nargs='+', default=OPERATIONS, choices=OPERATIONS, help="Operations to time (default: all).")
+    parser.add_argument('--scenarios', nargs='+', default=list(CLI_SCENARIOS), choices=list(CLI_SCENARIOS), help="CLI scenarios to time (default: all).")
+    parser.add_argument('--bg-latency', type=float, default=50, metavar='MS', help="Response time of the mock remove.bg server (default: 50).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', metavar='JSON', help="Compare throughput with a previous results file.")
+    parser.add_argument('--operation', choices=OPERATIONS, help=argparse.SUPPRESS)
+    parser.add_argument('--cli', choices=list(CLI_SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    bg_latency = args.bg_latency / 1000
+    if args.operation:
+        print(json.dumps(_run_operation(args.operation, args.corpus, bg_latency)))
+        return
+    if args.cli:
+        # The mock server runs here so its memory is not counted in the CLI's RSS
+        _start_mock_server(bg_latency)
+        print(json.dumps(_run_cli(args.cli, args.corpus, args.jobs[0])))
+        return
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'corpus': {'count': args.count, 'sizes': args.sizes, 'formats': args.formats, 'alpha': args.alpha},
+        'operations': [],
+        'cli': [],
+    }
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        make_corpus(corpus_dir, args.count, args.sizes, args.formats, args.alpha)
+        common = ['--corpus', corpus_dir, '--bg-latency', str(args.bg_latency)]
+
+        print(f"{'operation':<20} {'img/s':>8} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS (MB)':>14}")
+        for name in args.operations:
+            row = _in_child('--operation', name, *common)
+            results['operations'].append(row)
+            print(f"{name:<20} {row['images_per_second']:>8} {row['mb_per_second']:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['peak_rss_mb']:>14}")
+
+        print(f"\n{'CLI scenario':<24} {'jobs':>4} {'img/s':>8} {'MB/s':>8} {'peak RSS (MB)':>14}")
+        for name in args.scenarios:
+            for jobs in args.jobs:
+                row = _in_child('--cli', name, '--jobs', str(jobs), *common)
+                results['cli'].append(row)
+                print(f"{name:<24} {jobs:>4} {row['images_per_second']:>8} {row['mb_per_second']:>8} {row['peak_rss_mb']:>14}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        _compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import fnmatch
+import io
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+from .discovery import DEFAULT_PATTERNS
+
+# Archive types recognized by extension, longest first ('.tar.gz' before '.gz').
+ARCHIVE_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tar', '.zip')
+
+# Tar compression per extension, as used in tarfile modes (e.g., 'w|gz').
+_TAR_COMPRESSION = {'.tar.gz': 'gz', '.tgz': 'gz', '.tar.bz2': 'bz2', '.tar.xz': 'xz', '.tar': ''}
+
+def archive_extension(path: str) -> str:
+    """
+    Returns the archive extension of `path` (e.g., '.tar.gz'), or None if it
+    is not a tar or zip archive.
+    """
+    lower = path.lower()
+    for extension in ARCHIVE_EXTENSIONS:
+        if lower.endswith(extension):
+            return extension
+    return None
+
+def is_archive(path: str) -> bool:
+    """True when `path` names a tar or zip archive (judged by its extension)."""
+    return archive_extension(path) is not None
+
+def read_archive(archive_path: str, patterns: list = None):
+    """
+    Lazily reads the images of a tar or zip archive, one member at a time,
+    without extracting anything to disk. Tar archives (compressed or not) are
+    read as a stream in a single pass.
+
+    Members are matched by file name like discovery.discover_images; hidden
+    ones (starting with '.', e.g., '__MACOSX/._logo.png' metadata) are skipped.
+
+    Args:
+        archive_path (str): Path to the archive.
+        patterns (list[str], optional): File name patterns (e.g., "*.png").
+                                        Defaults to discovery.DEFAULT_PATTERNS.
+
+    Yields:
+        tuple[str, bytes]: (member name, data) for each matching image, in archive order.
+
+    Raises:
+        FileNotFoundError: If the archive does not exist.
+        ValueError: If `archive_path` is not a tar or zip archive.
+    """
+    if not os.path.exists(archive_path):
+        raise FileNotFoundError(f"The archive '{archive_path}' was not found.")
+    extension = archive_extension(archive_path)
+    if extension is None:
+        raise ValueError(f"'{archive_path}' is not a supported archive ({', '.join(ARCHIVE_EXTENSIONS)}).")
+    patterns = patterns or DEFAULT_PATTERNS
+
+    def matches(name):
+        base_name = posixpath.basename(name)
+        return not base_name.startswith('.') and any(fnmatch.fnmatch(base_name, pattern) for pattern in patterns)
+
+    if extension == '.zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and matches(info.filename):
+                    yield info.filename, archive.read(info)
+    else:
+        with tarfile.open(archive_path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and matches(member.name):
+                    yield member.name, archive.extractfile(member).read()
+
+def member_path(root: str, name: str) -> str:
+    """
+    Returns where the archive member `name` goes inside directory `root`.
+
+    Raises:
+        ValueError: If the name would escape `root` (absolute, or containing '..').
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or os.path.isabs(name):
+        raise ValueError(f"Unsafe archive member name '{name}'.")
+    return os.path.join(root, *parts)
+
+class ArchiveWriter:
+    """
+    Writes results into a tar or zip archive, one member at a time.
+
+    The archive is written next to its final path and moved there when the
+    writer is closed, so an interrupted run never leaves a truncated archive
+    in place. Zip members are stored uncompressed: image formats are already
+    compressed, so deflating them costs time for little gain.
+
+    Example:
+        with ArchiveWriter("icons.zip") as writer:
+            writer.write("16/logo.png", data)
+    """
+
+    def __init__(self, archive_path: str):
+        """
+        Args:
+            archive_path (str): Where to write the archive; its extension sets the type.
+
+        Raises:
+            ValueError: If `archive_path` is not a tar or zip archive.
+        """
+        extension = archive_extension(archive_path)
+        if extension is None:
+            raise ValueError(f"'{archive_path}' is not a supported archive ({', '.join(ARCHIVE_EXTENSIONS)}).")
+        self.archive_path = archive_path
+        self._partial_path = f"{archive_path}.part"
+        if extension == '.zip':
+            self._archive = zipfile.ZipFile(self._partial_path, 'w', compression=zipfile.ZIP_STORED)
+        else:
+            self._archive = tarfile.open(self._partial_path, f"w|{_TAR_COMPRESSION[extension]}")
+
+    def write(self, name: str, data: bytes):
+        """Adds one member named `name` holding `data`."""
+        if isinstance(self._archive, zipfile.ZipFile):
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def close(self, complete: bool = True):
+        """
+        Finishes the archive and moves it to its final path, or deletes it
+        when `complete` is False.
+        """
+        if self._archive is None:
+            return
+        self._archive.close()
+        self._archive = None
+        if complete:
+            os.replace(self._partial_path, self.archive_path)
+        else:
+            os.remove(self._partial_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close(complete=exc_type is None)
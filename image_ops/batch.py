@@ -0,0 +1,358 @@
+import collections
+import contextlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from . import instrument
+from .cache import ResultCache, fingerprint
+from .dedupe import Deduplicator
+from .instrument import RunReport
+from .pipeline import Pipeline
+from .writer import OutputWriter
+from .utils import get_extension
+
+def default_jobs() -> int:
+    """Returns the default number of CPU workers (the machine's core count)."""
+    return os.cpu_count() or 1
+
+def create_pools(workers: int, remote_workers: int) -> tuple:
+    """
+    Creates the pools run_batch uses: a process pool of `workers` for CPU-bound
+    segments (a single thread when `workers` is 1) and a thread pool of
+    `remote_workers` for remove.bg calls.
+
+    Returns:
+        tuple[Executor, Executor]: The (CPU, remote) pools.
+    """
+    cpu_pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+    return cpu_pool, ThreadPoolExecutor(max_workers=remote_workers)
+
+def _stage_signatures(segments: list) -> list:
+    """Returns the signature of the chain up to and including each segment."""
+    prefix = Pipeline()
+    signatures = []
+    for segment in segments:
+        prefix.steps.extend(segment.steps)
+        segment._copy_output_settings(prefix)
+        signatures.append(prefix.signature())
+    return signatures
+
+def _timed(func, args: tuple) -> tuple:
+    """Worker entry point: runs func(*args) and returns (result, CPU-seconds it used)."""
+    start = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - start
+
+def _lookup(cache: ResultCache, signatures: list, final_segment: Pipeline, image_path: str, output_path: str):
+    """
+    Worker entry point: fingerprints the input (see cache.fingerprint) and,
+    with a `cache`, finds the furthest cached stage. Final outputs are only
+    cached when they are a single file (not variants).
+
+    Returns:
+        tuple[int, str | bytes, list[str], tuple]: The index of the first
+        segment still to run (len(signatures) when the final output was
+        cached, then with the path it was copied to), the source for that
+        segment, the cache key of every stage (None without a cache), and the
+        input's fingerprint.
+    """
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"The file '{image_path}' was not found.")
+
+    source_fingerprint = fingerprint(image_path)
+    if cache is None:
+        return 0, image_path, None, source_fingerprint
+    digest = source_fingerprint[2]
+    keys = [cache.key(digest, signature) for signature in signatures]
+    # The final encoding also depends on the output extension when no format is set.
+    keys[-1] = cache.key(keys[-1], get_extension(output_path))
+
+    if len(final_segment.output_paths(output_path)) == 1:
+        target = output_path
+        if final_segment.auto_format is not None:
+            # The chosen format is stored next to the output
+            chosen = cache.get(cache.key(keys[-1], 'format'))
+            target = final_segment.auto_output_path(output_path, chosen.decode('utf-8')) if chosen else None
+        if target and cache.get_file(keys[-1], target):
+            return len(signatures), target, keys, source_fingerprint
+    for index in reversed(range(len(signatures) - 1)):
+        data = cache.get(keys[index])
+        if data is not None:
+            return index + 1, data, keys, source_fingerprint
+    return 0, image_path, keys, source_fingerprint
+
+def _process_segment(segment: Pipeline, source, cache: ResultCache = None, key: str = None) -> bytes:
+    """Worker entry point: runs an intermediate segment and returns PNG bytes."""
+    data = segment.process(source)
+    if cache is not None:
+        cache.put(key, data)
+    return data
+
+def _store_final(segment: Pipeline, cache: ResultCache, key: str, output_path: str, data: bytes = None):
+    """Caches a final output (from `data`, or else from its file) when it is a single file."""
+    if len(segment.output_paths(output_path)) != 1:
+        return
+    if data is not None:
+        cache.put(key, data)
+    else:
+        cache.put_file(key, output_path)
+    if segment.auto_format is not None:
+        cache.put(cache.key(key, 'format'), get_extension(output_path).encode('utf-8'))
+
+def _run_segment(segment: Pipeline, source, output_path: str, cache: ResultCache = None, key: str = None) -> str:
+    """Worker entry point: runs the final segment, writes the output file and returns its path."""
+    output_path = segment.run(source, output_path)
+    if cache is not None:
+        _store_final(segment, cache, key, output_path)
+    return output_path
+
+def _render_segment(segment: Pipeline, source, output_path: str, cache: ResultCache = None, key: str = None) -> tuple:
+    """
+    Worker entry point: runs the final segment and returns its output path and
+    the encoded files left for an OutputWriter (see Pipeline.render).
+    """
+    output_path, files = segment.render(source, output_path)
+    if cache is not None:
+        _store_final(segment, cache, key, output_path, files[0][1] if len(files) == 1 else None)
+    return output_path, files
+
+def run_batch(
+    pipeline: Pipeline,
+    jobs,
+    workers: int = None,
+    remote_workers: int = 4,
+    cache: ResultCache = None,
+    report: RunReport = None,
+    pools: tuple = None,
+    dedupe: Deduplicator = None,
+    writer: OutputWriter = None,
+    fingerprints: dict = None
+):
+    """
+    Runs `pipeline` over many images in parallel, yielding results as they finish.
+
+    CPU-bound segments (decode, resize, grayscale, encode, tracing) run in a
+    process pool of `workers`, while remove.bg calls run in a separate thread
+    pool of `remote_workers` since they are bound by network I/O. An image
+    moves from one pool to the next as each of its segments completes.
+
+    With a `cache`, `fingerprints` or `dedupe`, each image is first hashed in
+    the CPU pool. With a `cache`, it is then looked up: a cached final
+    output is copied into place, and otherwise the chain resumes after the
+    furthest cached intermediate stage (e.g., the background-removed image).
+    Every stage computed is stored. Hit and miss counts are kept on `cache`.
+
+    At most a few jobs per worker are in flight at once, so `jobs` may be a
+    lazy iterator over a very large batch.
+
+    With a `report`, every task records its stage durations and byte counts
+    (see instrument.stage), which are added to the report per image.
+
+    With `dedupe`, inputs with the same content as one whose hash came back
+    earlier (see Deduplicator) are not processed further: once that one
+    finishes, its outputs are copied, hard-linked or reflinked to theirs. The
+    remove.bg calls and CPU-seconds this saves are counted on `dedupe`.
+
+    With a `writer`, workers return encoded outputs instead of writing them,
+    and the writer puts them in place on its own threads (atomically, and
+    with its durability). A job is yielded once its files are in place; while
+    the writer is behind, no new results are accepted.
+
+    Args:
+        pipeline (Pipeline): The chain of operations to apply to every image.
+        jobs (Iterable[tuple[str, str]]): (image_path, output_path) pairs.
+        workers (int, optional): Size of the CPU process pool. Defaults to the
+                                 number of cores. With 1, everything runs in
+                                 a single worker thread.
+        remote_workers (int, optional): Size of the remove.bg thread pool. Defaults to 4.
+        cache (ResultCache, optional): Where to reuse and store results. Defaults to None.
+        report (RunReport, optional): Where to record per-image and per-stage
+                                      measurements. Defaults to None.
+        pools (tuple[Executor, Executor], optional): Existing (CPU, remote)
+                                                     pools to run on, left open
+                                                     afterwards. By default,
+                                                     pools are created for the
+                                                     run and shut down after it.
+        dedupe (Deduplicator, optional): Process identical inputs once. Defaults to None.
+        writer (OutputWriter, optional): Where outputs are written. By default,
+                                         workers write them directly.
+        fingerprints (dict, optional): Filled with the (size, mtime_ns, digest)
+                                       of each input, taken by the worker before
+                                       processing it (see cache.fingerprint),
+                                       under its image path. Defaults to None.
+
+    Yields:
+        tuple[str, str, Exception | None]: (image_path, output_path, error) for
+        each job, in completion order. `error` is None on success. With
+        automatic format selection, `output_path` has the chosen extension.
+    """
+    workers = workers or default_jobs()
+    if workers < 1 or remote_workers < 1:
+        raise ValueError("The number of workers must be a positive integer.")
+
+    segments = pipeline.split()
+    if pipeline.is_noop:
+        cache = None  # Plain copies are cheaper than a cache lookup
+        dedupe = None
+    signatures = _stage_signatures(segments) if cache is not None else None
+    max_in_flight = (workers + remote_workers) * 2
+    jobs = iter(jobs)
+
+    if pools is not None:
+        cpu_pool, remote_pool = pools
+        owned_pools = ()
+    else:
+        cpu_pool, remote_pool = create_pools(workers, remote_workers)
+        owned_pools = (cpu_pool, remote_pool)
+
+    # job -> [start time, Recorder, cache outcome], while the job is in flight
+    measurements = {}
+    # With dedupe: job -> [CPU-seconds, remove.bg calls] while in flight, then
+    # job -> (output path, error, CPU-seconds, remove.bg calls) once finished
+    costs = {}
+    outcomes = {}
+    # job -> its duplicates waiting for it to finish
+    waiting = {}
+    # Finished duplicates, to yield
+    ready = collections.deque()
+
+    def finished(job, error=None, output_path=None):
+        output_path = output_path or job[1]
+        if report is not None:
+            started, recorder, outcome = measurements.pop(job)
+            report.add_image(job[0], output_path, error, time.perf_counter() - started, recorder, outcome)
+        if job in costs:
+            seconds, calls = costs.pop(job)
+            outcomes[job] = (output_path, error, seconds, calls)
+            for duplicate in waiting.pop(job, ()):
+                ready.append(fan_out(duplicate, job))
+        return job[0], output_path, error
+
+    def fan_out(job, leader):
+        output_path, error, seconds, calls = outcomes[leader]
+        if error is not None:
+            return finished(job, error)
+        final_segment = segments[-1]
+        target = job[1]
+        if final_segment.auto_format is not None:
+            target = final_segment.auto_output_path(target, get_extension(output_path))
+        try:
+            for source, output in zip(final_segment.output_paths(output_path), final_segment.output_paths(target)):
+                dedupe.place(source, output)
+        except OSError as e:
+            return finished(job, e)
+        dedupe.cpu_seconds_saved += seconds
+        dedupe.remote_calls_saved += calls
+        return finished(job, output_path=target)
+
+    with contextlib.ExitStack() as stack:
+        for pool in owned_pools:
+            stack.enter_context(pool)
+        # future -> (job, segment index or None for a cache lookup, stage keys);
+        # while the writer has its files: (job, len(segments), output path)
+        pending = {}
+
+        def submit_task(pool, func, *args):
+            if dedupe is not None:
+                func, args = _timed, (func, args)
+            if report is None:
+                return pool.submit(func, *args)
+            return pool.submit(instrument.run_task, func, args, report.profile)
+
+        def submit(job, index, source, keys):
+            segment = segments[index]
+            pool = remote_pool if segment.is_remote else cpu_pool
+            key = keys[index] if keys else None
+            if index == len(segments) - 1:
+                run_final = _render_segment if writer is not None else _run_segment
+                future = submit_task(pool, run_final, segment, source, job[1], cache, key)
+            else:
+                future = submit_task(pool, _process_segment, segment, source, cache, key)
+            pending[future] = (job, index, keys)
+
+        def fill():
+            while len(pending) + len(ready) + sum(map(len, waiting.values())) < max_in_flight:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                if report is not None:
+                    measurements[job] = [time.perf_counter(), instrument.Recorder(), None]
+                if dedupe is not None:
+                    costs[job] = [0.0, 0]
+                if cache is not None or fingerprints is not None or dedupe is not None:
+                    future = submit_task(cpu_pool, _lookup, cache, signatures, segments[-1], job[0], job[1])
+                    pending[future] = (job, None, None)
+                else:
+                    submit(job, 0, job[0], None)
+
+        fill()
+        while pending or ready:
+            while ready:
+                yield ready.popleft()
+                fill()
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, index, keys = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield finished(job, e)
+                    continue
+                if index == len(segments):
+                    yield finished(job, output_path=keys)
+                    continue
+
+                if report is not None:
+                    result, recorder, stats = result
+                    measurements[job][1].merge(recorder)
+                    if stats is not None:
+                        report.add_stats(stats)
+                if dedupe is not None:
+                    result, seconds = result
+                    costs[job][0] += seconds
+                    if index is not None and segments[index].is_remote:
+                        costs[job][1] += 1
+
+                if index is None:
+                    start, source, keys, source_fingerprint = result
+                    if fingerprints is not None:
+                        fingerprints[job[0]] = source_fingerprint
+                    leader = None
+                    if dedupe is not None and start < len(segments):
+                        leader = dedupe.leader_of(job, source_fingerprint)
+                    if leader is not None:
+                        del costs[job]
+                        if report is not None:
+                            measurements[job][2] = 'duplicate'
+                        if leader in outcomes:
+                            yield fan_out(job, leader)
+                        else:
+                            waiting.setdefault(leader, []).append(job)
+                        continue
+                    if cache is None:
+                        submit(job, 0, source, None)
+                        continue
+                    outcome = 'hit' if start == len(segments) else 'partial' if start > 0 else 'miss'
+                    if report is not None:
+                        measurements[job][2] = outcome
+                    if outcome == 'hit':
+                        cache.hits += 1
+                        yield finished(job, output_path=source)
+                        continue
+                    if outcome == 'partial':
+                        cache.partial_hits += 1
+                    else:
+                        cache.misses += 1
+                    submit(job, start, source, keys)
+                elif index + 1 < len(segments):
+                    submit(job, index + 1, result, keys)
+                elif writer is not None and result[1]:
+                    pending[writer.submit(result[1])] = (job, len(segments), result[0])
+                else:
+                    yield finished(job, output_path=result[0] if writer is not None else result)
+            fill()
+
+    if report is not None:
+        report.finish(cache, dedupe)
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from . import instrument
+from .utils import atomic_path
+
+# Default upper bound for the cache directory: 1 GiB.
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+def hash_file(path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with instrument.stage('hash'), open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint(path: str) -> tuple:
+    """
+    Identifies the content of a file as it is about to be read: its size and
+    modification time, taken before its contents are hashed (so an edit made
+    meanwhile shows as a changed mtime later).
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        tuple[int, int, str]: The size, the mtime in nanoseconds and the hex
+        SHA-256 digest (see hash_file).
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, hash_file(path)
+
+class ResultCache:
+    """
+    A persistent, content-addressed store for processed images.
+
+    Entries are keyed by a hash of the input bytes plus a description of the
+    operations applied to them, so a result is reused only when both the
+    image and the settings are unchanged. Entries are written atomically and
+    the directory is kept under `max_bytes` by evicting the least recently
+    used entries. The cache is safe to share between worker processes.
+
+    Example:
+        cache = ResultCache("~/.cache/pixelhorizon")
+        key = cache.key(hash_file("logo.png"), "resize:256x256")
+        if not cache.get_file(key, "out.png"):
+            ...
+            cache.put_file(key, "out.png")
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Builds a cache key from an input digest and operation descriptions."""
+        return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _touch(self, path: str) -> bool:
+        """Marks an entry as recently used. Returns False if it does not exist."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, key: str) -> bytes:
+        """
+        Returns the cached bytes for `key`, or None on a miss.
+        """
+        path = self._path(key)
+        if not self._touch(path):
+            return None
+        try:
+            with instrument.stage('cache_read'), open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_file(self, key: str, output_path: str) -> bool:
+        """
+        Copies the cached entry for `key` to `output_path`.
+
+        Returns:
+            bool: True on a hit, False on a miss.
+        """
+        path = self._path(key)
+        if not self._touch(path):
+            return False
+        try:
+            with instrument.stage('cache_read'), atomic_path(output_path) as temp_path:
+                shutil.copyfile(path, temp_path)
+            instrument.count('bytes_written', os.path.getsize(output_path))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write(self, key: str, write):
+        """Writes an entry to a temporary file and renames it into place."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with instrument.stage('cache_write'), os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put(self, key: str, data: bytes):
+        """Stores `data` under `key`."""
+        self._write(key, lambda f: f.write(data))
+
+    def put_file(self, key: str, path: str):
+        """Stores a copy of the file at `path` under `key`."""
+        def write(f):
+            with open(path, 'rb') as src:
+                shutil.copyfileobj(src, f)
+        self._write(key, write)
+
+    def evict(self) -> int:
+        """
+        Deletes least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
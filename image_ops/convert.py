@@ -1,25 +1,92 @@
-from PIL import Image
+from PIL import Image, ImageChops, ImageStat, features
+from concurrent.futures import ThreadPoolExecutor
+import io
+import math
 import os
-from .utils import get_image_name
+from . import tiles
+from .utils import get_image_name, place_copy
+
+# Encoder settings per preset and Pillow format. All presets keep the same
+# visual quality; they trade encode time for file size.
+ENCODE_PRESETS = {
+    'fast': {
+        'PNG': {'compress_level': 1},
+        'JPEG': {'quality': 75, 'subsampling': '4:2:0'},
+        'WEBP': {'quality': 80, 'method': 0},
+        'AVIF': {'quality': 75, 'speed': 8},
+    },
+    'balanced': {
+        'PNG': {'compress_level': 6},
+        'JPEG': {'quality': 75, 'subsampling': '4:2:0', 'optimize': True},
+        'WEBP': {'quality': 80, 'method': 4},
+        'AVIF': {'quality': 75, 'speed': 6},
+    },
+    'smallest': {
+        'PNG': {'optimize': True},
+        'JPEG': {'quality': 75, 'subsampling': '4:2:0', 'optimize': True, 'progressive': True},
+        'WEBP': {'quality': 80, 'method': 6},
+        'AVIF': {'quality': 75, 'speed': 4},
+    },
+}
+DEFAULT_PRESET = 'balanced'
+
+# Candidates of choose_format, and the qualities it searches for lossy ones.
+AUTO_FORMATS = ('avif', 'webp', 'jpg', 'png')
+AUTO_QUALITIES = tuple(range(30, 100, 5))
+
+# Quality budget of choose_format when no budget is given, in dB of PSNR.
+DEFAULT_MIN_PSNR = 40.0
 
 # --- Internal Helper Functions ---
 
-def _to_jpg(img: Image.Image) -> Image.Image:
+def _to_jpg(img: Image.Image, strip_rows: int = None) -> Image.Image:
     """Converts a PIL Image to JPG format, handling transparency by adding a white background."""
     if img.mode == 'RGBA':
         background = Image.new("RGB", img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[3])
+        # An RGBA image is its own mask (its alpha band is used): one composite, no band copies
+        if strip_rows:
+            for box in tiles.strip_boxes(img.size, strip_rows):
+                strip = img.crop(box)
+                background.paste(strip, box, mask=strip)
+        else:
+            background.paste(img, mask=img)
         return background
+    if strip_rows:
+        return tiles.map_strips(img, 'RGB', lambda strip: strip.convert('RGB'), strip_rows)
     return img.convert('RGB')
 
-def _to_png(img: Image.Image) -> Image.Image:
+def _to_png(img: Image.Image, strip_rows: int = None) -> Image.Image:
     """Ensures the image is in a mode compatible with PNG (no-op for most common cases)."""
     return img
 
-def _to_ico(img: Image.Image) -> Image.Image:
+def _to_ico(img: Image.Image, strip_rows: int = None) -> Image.Image:
     """Ensures the image is in a mode compatible with ICO (no-op for most common cases)."""
     return img
 
+def _to_rgb(img: Image.Image, strip_rows: int = None) -> Image.Image:
+    """Converts a PIL Image to RGB, or to RGBA when it has transparency (what WebP and AVIF store)."""
+    if img.mode in ('RGB', 'RGBA'):
+        return img
+    mode = 'RGBA' if img.has_transparency_data else 'RGB'
+    if strip_rows:
+        return tiles.map_strips(img, mode, lambda strip: strip.convert(mode), strip_rows)
+    return img.convert(mode)
+
+def _require_codec(name: str):
+    """Raises a ValueError if this Pillow build cannot encode `name` (e.g., 'webp', 'avif')."""
+    if not features.check(name):
+        raise ValueError(f"{name.upper()} encoding is not available in this Pillow build.")
+
+def _to_webp(img: Image.Image, strip_rows: int = None) -> Image.Image:
+    """Converts a PIL Image to a mode WebP can store."""
+    _require_codec('webp')
+    return _to_rgb(img, strip_rows)
+
+def _to_avif(img: Image.Image, strip_rows: int = None) -> Image.Image:
+    """Converts a PIL Image to a mode AVIF can store."""
+    _require_codec('avif')
+    return _to_rgb(img, strip_rows)
+
 # --- Public API ---
 
 CONVERSIONS = {
@@ -27,20 +94,327 @@ CONVERSIONS = {
     'jpeg': _to_jpg,
     'png': _to_png,
     'ico': _to_ico,
+    'webp': _to_webp,
+    'avif': _to_avif,
 }
 
-def convert_format(image_path: str, output_format: str, custom_output_path: str = None) -> str:
+def pil_format(output_format: str) -> str:
+    """Returns Pillow's name for a format given as an extension (e.g., 'jpg' -> 'JPEG')."""
+    return Image.registered_extensions().get(f".{output_format.lower()}", output_format.upper())
+
+def extension_for(format_name: str) -> str:
+    """Returns the extension to save a Pillow format under (e.g., 'JPEG' -> 'jpg'), the inverse of pil_format."""
+    for output_format in CONVERSIONS:
+        if pil_format(output_format) == format_name:
+            return output_format
+    return format_name.lower()
+
+def encode_options(
+    output_format: str,
+    preset: str = None,
+    quality: int = None,
+    speed: int = None,
+    lossless: bool = False,
+    threads: int = None
+) -> dict:
+    """
+    Returns the Pillow save options of `preset` for a format, with overrides.
+
+    Args:
+        output_format (str): The target format (e.g., 'jpg', 'png', 'webp').
+        preset (str, optional): One of ENCODE_PRESETS ('fast', 'balanced',
+                                'smallest'). Defaults to 'balanced'.
+        quality (int, optional): Quality from 0 to 100 for JPEG, WebP and AVIF.
+        speed (int, optional): Encoder speed from 0 (slowest, smallest) to 10
+                               (fastest): the AVIF speed, the WebP method
+                               (6 to 0) and the PNG compression level (9 to 0).
+        lossless (bool, optional): Encode WebP losslessly (PNG always is). Defaults to False.
+        threads (int, optional): Threads the AVIF encoder may use.
+
+    Returns:
+        dict: Keyword arguments for Image.save (empty for formats without settings).
+
+    Raises:
+        ValueError: If the preset is unknown, a setting is out of range, or
+                    lossless encoding is asked of a lossy-only format.
+    """
+    preset = preset or DEFAULT_PRESET
+    if preset not in ENCODE_PRESETS:
+        raise ValueError(f"Unknown encode preset '{preset}'. Choose from: {', '.join(ENCODE_PRESETS)}.")
+    if quality is not None and not 0 <= quality <= 100:
+        raise ValueError("The quality must be between 0 and 100.")
+    if speed is not None and not 0 <= speed <= 10:
+        raise ValueError("The speed must be between 0 and 10.")
+
+    name = pil_format(output_format)
+    options = dict(ENCODE_PRESETS[preset].get(name, {}))
+    if quality is not None and name in ('JPEG', 'WEBP', 'AVIF'):
+        options['quality'] = quality
+    if speed is not None:
+        if name == 'PNG':
+            options.pop('optimize', None)
+            options['compress_level'] = round((10 - speed) * 0.9)
+        elif name == 'WEBP':
+            options['method'] = round((10 - speed) * 0.6)
+        elif name == 'AVIF':
+            options['speed'] = speed
+    if lossless:
+        if name == 'WEBP':
+            options['lossless'] = True
+        elif name != 'PNG':
+            raise ValueError("Lossless encoding is only available for PNG and WebP.")
+    if threads and name == 'AVIF':
+        options['max_threads'] = threads
+    return options
+
+def to_format(img: Image.Image, output_format: str, strip_rows: int = None) -> Image.Image:
+    """
+    Prepares an in-memory image for saving in a different format.
+
+    Args:
+        img (Image.Image): The decoded source image.
+        output_format (str): The target format (e.g., 'jpg', 'png', 'ico').
+        strip_rows (int, optional): Convert this many rows at a time (tiled
+                                    mode). Defaults to None.
+
+    Returns:
+        Image.Image: An image in a mode compatible with the target format.
+
+    Raises:
+        ValueError: If the requested output format is not supported.
+    """
+    output_format = output_format.lower()
+    if output_format not in CONVERSIONS:
+        raise ValueError(f"Conversion to format '{output_format}' is not supported.")
+
+    return CONVERSIONS[output_format](img, strip_rows)
+
+def save_ico(images: list, output_path: str) -> str:
+    """
+    Saves several sizes of an image into a single ICO file.
+
+    Args:
+        images (list[Image.Image]): The sizes to embed. Sizes above 256x256,
+                                    the ICO limit, are left out.
+        output_path (str | BinaryIO): The exact path to save the ICO file to,
+                                      or a writable binary stream.
+
+    Returns:
+        str | BinaryIO: `output_path`, where the ICO file was saved.
+
+    Raises:
+        ValueError: If no image fits in an ICO file.
+    """
+    images = sorted(
+        (_to_ico(img) for img in images if img.width <= 256 and img.height <= 256),
+        key=lambda img: img.width * img.height,
+        reverse=True
+    )
+    if not images:
+        raise ValueError("ICO files can only hold sizes up to 256x256.")
+
+    # Pillow takes the sizes from the first image and matches the others by size
+    images[0].save(
+        output_path,
+        format='ICO',
+        sizes=[img.size for img in images],
+        append_images=images[1:]
+    )
+    return output_path
+
+def encode(img: Image.Image, output_format: str, preset: str = None, **settings) -> bytes:
+    """
+    Converts an in-memory image and encodes it to bytes in the given format.
+
+    Args:
+        img (Image.Image): The decoded source image.
+        output_format (str): The target format (e.g., 'jpg', 'png', 'webp').
+        preset (str, optional): The encode preset (see encode_options). Defaults to 'balanced'.
+        **settings: Overrides of the preset (quality, speed, lossless, threads; see encode_options).
+
+    Returns:
+        bytes: The encoded image data.
+
+    Raises:
+        ValueError: If the requested output format, preset or settings are not supported.
+    """
+    options = encode_options(output_format, preset, **settings)
+    converted_img = to_format(img, output_format)
+    return _encode_converted(converted_img, output_format, options)
+
+def _encode_converted(img: Image.Image, output_format: str, options: dict) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format=pil_format(output_format), **options)
+    return buffer.getvalue()
+
+def _luma(img: Image.Image) -> Image.Image:
+    """The brightness of an image, premultiplied by its alpha (kept as a band) when it has one."""
+    if img.mode in ('RGBA', 'LA'):
+        alpha = img.getchannel('A')
+        return Image.merge('LA', (ImageChops.multiply(img.convert('L'), alpha), alpha))
+    return img.convert('L')
+
+def psnr(reference: Image.Image, candidate: Image.Image) -> float:
+    """
+    Returns the luma peak signal-to-noise ratio of `candidate` against
+    `reference`, in dB (infinite when they are identical). Fully transparent
+    pixels do not count. Around 40 dB, differences are hard to see; below
+    30 dB, artifacts are visible.
+    """
+    if candidate.mode != reference.mode:
+        candidate = candidate.convert(reference.mode)
+    rms = ImageStat.Stat(ImageChops.difference(_luma(reference), _luma(candidate))).rms
+    mse = sum(value ** 2 for value in rms) / len(rms)
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+def _smallest_encoding(
+    img: Image.Image, output_format: str, min_psnr: float, max_bytes: int, preset: str, quality: int, settings: dict
+) -> bytes:
+    """
+    Returns the smallest encoding of `img` in `output_format` meeting the
+    budgets (see choose_format), or None if none does. `quality` (or else
+    the preset's) is where a search within a size budget alone starts.
+    """
+    reference = to_format(img, output_format)
+
+    def encode_at(quality):
+        return _encode_converted(reference, output_format, encode_options(output_format, preset, quality=quality, **settings))
+
+    def fits(data):
+        return max_bytes is None or len(data) <= max_bytes
+
+    lossless = pil_format(output_format) == 'PNG' or settings.get('lossless')
+    if lossless:
+        data = encode_at(None)
+        return data if fits(data) else None
+
+    if min_psnr is not None:
+        # Lowest quality reaching the quality budget (PSNR grows with quality)
+        def reaches(data):
+            with Image.open(io.BytesIO(data)) as decoded:
+                return psnr(reference, decoded) >= min_psnr
+        found = _first_accepted(AUTO_QUALITIES, encode_at, reaches)
+    else:
+        # Highest quality, up to the requested one, fitting in the size budget
+        start = quality if quality is not None else encode_options(output_format, preset, **settings).get('quality', 75)
+        qualities = [start] + [quality for quality in reversed(AUTO_QUALITIES) if quality < start]
+        found = _first_accepted(qualities, encode_at, fits)
+    return found if found is not None and fits(found) else None
+
+def _first_accepted(qualities: list, encode_at, accept) -> bytes:
+    """
+    Binary search for the encoding at the first of `qualities` that `accept`
+    takes, assuming every quality after an accepted one is accepted too.
+    Returns None if none is.
+    """
+    found = None
+    low, high = 0, len(qualities) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        data = encode_at(qualities[middle])
+        if accept(data):
+            found, high = data, middle - 1
+        else:
+            low = middle + 1
+    return found
+
+def choose_format(
+    img: Image.Image,
+    formats: list = AUTO_FORMATS,
+    min_psnr: float = None,
+    max_bytes: int = None,
+    preset: str = None,
+    workers: int = 1,
+    **settings
+) -> tuple:
+    """
+    Encodes an image in every candidate format and returns the smallest
+    encoding meeting a quality budget, a size budget, or both.
+
+    With a quality budget, each lossy format is encoded at the lowest quality
+    (out of AUTO_QUALITIES) reaching `min_psnr` dB against the image; PNG and
+    lossless WebP always reach it. With only a size budget, each lossy format
+    is encoded at the highest quality, up to the preset's or `quality`, that
+    fits in `max_bytes`. JPG is left out for images with transparency.
+
+    Args:
+        img (Image.Image): The decoded image.
+        formats (list[str], optional): Candidate formats. Defaults to AUTO_FORMATS.
+        min_psnr (float, optional): Quality budget in dB. Defaults to
+                                    DEFAULT_MIN_PSNR when no budget is given.
+        max_bytes (int, optional): Size budget. Defaults to None.
+        preset (str, optional): The encode preset (see encode_options). Defaults to 'balanced'.
+        workers (int, optional): Formats encoded at once, on threads. Defaults to 1.
+        **settings: Overrides of the preset (speed, lossless, threads; see encode_options).
+
+    Returns:
+        tuple[str, bytes]: The chosen format and its encoded data.
+
+    Raises:
+        ValueError: If a format is not supported, or no encoding meets the budgets.
+    """
+    if min_psnr is None and max_bytes is None:
+        min_psnr = DEFAULT_MIN_PSNR
+    # The budgets set the quality; a requested one only bounds the size search
+    quality = settings.pop('quality', None)
+    if min_psnr is not None:
+        quality = None
+    for output_format in formats:
+        if output_format.lower() not in CONVERSIONS:
+            raise ValueError(f"Conversion to format '{output_format}' is not supported.")
+
+    candidates = []
+    for output_format in formats:
+        name = pil_format(output_format)
+        if name in ('WEBP', 'AVIF') and not features.check(name.lower()):
+            continue  # Not in this Pillow build
+        if name == 'JPEG' and (img.has_transparency_data or settings.get('lossless')):
+            continue
+        if name == 'AVIF' and settings.get('lossless'):
+            continue
+        candidates.append(output_format.lower())
+
+    def encode_candidate(output_format):
+        return _smallest_encoding(img, output_format, min_psnr, max_bytes, preset, quality, settings)
+
+    img.load()  # Decode once, before threads share the image
+    if workers > 1 and len(candidates) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(encode_candidate, candidates))
+    else:
+        results = [encode_candidate(output_format) for output_format in candidates]
+
+    found = [(len(data), index) for index, data in enumerate(results) if data is not None]
+    if not found:
+        budget = f"{min_psnr:g} dB" if min_psnr is not None else ""
+        if max_bytes is not None:
+            budget = f"{budget} and {max_bytes} bytes" if budget else f"{max_bytes} bytes"
+        raise ValueError(f"No format ({', '.join(candidates)}) meets the budget of {budget}.")
+    _, index = min(found)
+    return candidates[index], results[index]
+
+def convert_format(
+    image_path: str,
+    output_format: str,
+    custom_output_path: str = None,
+    preset: str = None,
+    **settings
+) -> str:
     """
     Converts an image file to a different format (e.g., PNG to JPG).
 
     If no custom output path is provided, a new path is generated in the same
     directory with the new format as the extension (e.g., 'logo.png' -> 'logo.jpg').
+    A source already in the target format is copied without being decoded,
+    unless a preset asks for it to be re-encoded.
 
     Args:
         image_path (str): Path to the source image file.
         output_format (str): The target format (e.g., 'jpg', 'png', 'ico').
         custom_output_path (str, optional): The exact path to save the new file to.
                                             Defaults to None.
+        preset (str, optional): The encode preset (see encode_options). Defaults to 'balanced'.
+        **settings: Overrides of the preset (quality, speed, lossless, threads; see encode_options).
 
     Returns:
         str: The path where the converted image was saved.
@@ -53,6 +427,7 @@ def convert_format(image_path: str, output_format: str, custom_output_path: str
     output_format = output_format.lower()
     if output_format not in CONVERSIONS:
         raise ValueError(f"Conversion to format '{output_format}' is not supported.")
+    options = encode_options(output_format, preset, **settings)
 
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"The file '{image_path}' was not found.")
@@ -67,13 +442,16 @@ def convert_format(image_path: str, output_format: str, custom_output_path: str
                 source_dir = os.path.dirname(image_path)
                 output_path = os.path.join(source_dir, f"{base_name}.{output_format}")
 
+            # Already in the target format: nothing to convert
+            if preset is None and not settings and img.format == pil_format(output_format):
+                return place_copy(image_path, output_path)
+
             # Get the correct conversion function and apply it
-            conversion_func = CONVERSIONS[output_format]
-            converted_img = conversion_func(img)
+            converted_img = to_format(img, output_format)
 
             # Save the final image
-            converted_img.save(output_path)
-            
+            converted_img.save(output_path, **options)
+
             return output_path
 
     except Exception as e:
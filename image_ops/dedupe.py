@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from .utils import clone_file, get_extension, place_copy
+
+# How the result of an image is given to its duplicates:
+#   'copy': a full copy.
+#   'link': a hard link (no data written; the outputs then share one file).
+#   'reflink': a copy-on-write clone where the filesystem supports it, else a copy.
+FAN_OUT_MODES = ('copy', 'link', 'reflink')
+
+class Deduplicator:
+    """
+    Finds inputs of a batch with identical content, so that batch.run_batch
+    processes each content once and places its result at the output path of
+    every copy.
+
+    Inputs are compared by the size and digest of their fingerprints (see
+    cache.fingerprint), which run_batch takes in its CPU pool, so no file is
+    read on the thread dispatching the batch. Inputs whose outputs have
+    different extensions are not duplicates, since their results are encoded
+    differently.
+
+    The counts of duplicates found, and of remove.bg calls and CPU-seconds
+    their processing would have cost, are kept on the instance.
+
+    Example:
+        dedupe = Deduplicator('reflink')
+        for image_path, output_path, error in run_batch(pipeline, jobs, dedupe=dedupe):
+            ...
+        print(dedupe.duplicates, dedupe.remote_calls_saved, dedupe.cpu_seconds_saved)
+    """
+
+    def __init__(self, fan_out: str = 'reflink'):
+        """
+        Args:
+            fan_out (str, optional): One of FAN_OUT_MODES. Defaults to 'reflink'.
+
+        Raises:
+            ValueError: If the fan-out mode is unknown.
+        """
+        if fan_out not in FAN_OUT_MODES:
+            raise ValueError(f"Unknown fan-out mode '{fan_out}'. Choose from: {', '.join(FAN_OUT_MODES)}.")
+        self.fan_out = fan_out
+        self.duplicates = 0
+        self.remote_calls_saved = 0
+        self.cpu_seconds_saved = 0.0
+        # Input path -> the paths of its duplicates
+        self.copies = {}
+        self._duplicate_paths = set()
+        # (size, output extension, digest) -> the first job seen with that content
+        self._by_content = {}
+
+    def leader_of(self, job: tuple, source_fingerprint: tuple) -> tuple:
+        """
+        Returns the earlier job whose input has the same content as `job`'s
+        (and whose output has the same extension), or None when `job` is the
+        first one seen with that content.
+
+        Args:
+            job (tuple[str, str]): An (image_path, output_path) pair.
+            source_fingerprint (tuple[int, int, str]): The (size, mtime_ns,
+                                                       digest) of its input.
+
+        Returns:
+            tuple[str, str] | None: The job whose result `job` can reuse.
+        """
+        size, _, digest = source_fingerprint
+        leader = self._by_content.setdefault((size, get_extension(job[1]), digest), job)
+        if leader is job:
+            return None
+        self.duplicates += 1
+        self.copies.setdefault(leader[0], []).append(job[0])
+        self._duplicate_paths.add(job[0])
+        return leader
+
+    def place(self, source_path: str, output_path: str) -> str:
+        """Puts the result at `source_path` at `output_path` too, with the fan-out mode."""
+        if self.fan_out == 'reflink':
+            return clone_file(source_path, output_path)
+        return place_copy(source_path, output_path, link=self.fan_out == 'link')
+
+    def is_duplicate(self, image_path: str) -> bool:
+        """True when `image_path` was found to be a copy of an earlier input."""
+        return image_path in self._duplicate_paths
+
+def dhash(image_path: str, hash_size: int = 8) -> int:
+    """
+    Computes the difference hash of an image: a perceptual fingerprint of
+    `hash_size`² bits that changes little when the image is resized,
+    re-encoded or slightly edited. Each bit tells whether a pixel of a tiny
+    grayscale thumbnail is brighter than its right-hand neighbour.
+
+    Args:
+        image_path (str): Path to the image.
+        hash_size (int, optional): Side of the thumbnail compared. Defaults to 8 (a 64-bit hash).
+
+    Returns:
+        int: The hash.
+    """
+    with Image.open(image_path) as img:
+        img.draft('L', (hash_size * 4, hash_size * 4))  # JPEG decodes at a reduced scale
+        thumbnail = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = thumbnail.tobytes()
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            index = row * (hash_size + 1) + column
+            value = value << 1 | (pixels[index] > pixels[index + 1])
+    return value
+
+def _dhash_or_none(image_path: str) -> int:
+    """Worker entry point: the dhash of an image, or None if it cannot be read."""
+    try:
+        return dhash(image_path)
+    except (OSError, ValueError):
+        return None
+
+def find_similar(image_paths: list, max_distance: int = 6, workers: int = 1) -> list:
+    """
+    Groups images whose perceptual hashes (see dhash) differ by at most
+    `max_distance` bits: likely the same picture at another size, quality or
+    format. Images that cannot be read are left out.
+
+    Rather than comparing every pair, each 64-bit hash is split into
+    `max_distance` + 1 bands; two hashes within the distance must have at
+    least one identical band, so only images sharing a band are compared.
+
+    Args:
+        image_paths (list[str]): The images to compare.
+        max_distance (int, optional): Bits that may differ, from 0 to 16. Defaults to 6.
+        workers (int, optional): Processes hashing the images. Defaults to 1.
+
+    Returns:
+        list[list[str]]: Groups of two or more similar images, in input order.
+
+    Raises:
+        ValueError: If `max_distance` is out of range.
+    """
+    if not 0 <= max_distance <= 16:
+        raise ValueError("The maximum distance must be between 0 and 16 bits.")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(_dhash_or_none, image_paths, chunksize=16))
+    else:
+        hashes = [_dhash_or_none(path) for path in image_paths]
+
+    parents = list(range(len(image_paths)))
+
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    bands = max_distance + 1
+    buckets = {}
+    for index, value in enumerate(hashes):
+        if value is None:
+            continue
+        for band in range(bands):
+            low, high = band * 64 // bands, (band + 1) * 64 // bands
+            key = (band, value >> low & ((1 << (high - low)) - 1))
+            for other in buckets.setdefault(key, []):
+                if root(other) != root(index) and bin(hashes[other] ^ value).count('1') <= max_distance:
+                    parents[root(index)] = root(other)
+            buckets[key].append(index)
+
+    groups = {}
+    for index, value in enumerate(hashes):
+        if value is not None:
+            groups.setdefault(root(index), []).append(image_paths[index])
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,74 @@
+import fnmatch
+import os
+
+# Patterns matched when none are given.
+DEFAULT_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.ico']
+
+def _matches_parts(parts: list, pattern_parts: list) -> bool:
+    """True when each path component matches the pattern component at the same depth."""
+    return len(parts) == len(pattern_parts) and all(fnmatch.fnmatch(part, pattern) for part, pattern in zip(parts, pattern_parts))
+
+def discover_images(root: str, patterns: list = None, recursive: bool = False, exclude: list = None):
+    """
+    Lazily finds image files in a directory, yielding paths as they are found.
+
+    Each directory is listed once with `os.scandir` and every entry is
+    matched against all patterns in the same pass. Entries are sorted within
+    a directory so the order is deterministic. Hidden files and directories
+    (starting with '.') are skipped, like `glob` does.
+
+    A pattern without '/' matches file names at any depth searched. A
+    pattern with a directory part (e.g., "icons/*.png") matches the path
+    relative to `root` one component at a time, like `glob`, and the
+    directories it names are searched even when not recursive.
+
+    Args:
+        root (str): The directory to search.
+        patterns (list[str], optional): File name or relative path patterns (e.g., "*.png").
+                                        Defaults to DEFAULT_PATTERNS.
+        recursive (bool, optional): Whether to descend into subdirectories. Defaults to False.
+        exclude (list[str], optional): Directories not to descend into (e.g.,
+                                       an output directory inside `root`).
+
+    Yields:
+        str: The path of each matching file.
+    """
+    patterns = patterns or DEFAULT_PATTERNS
+    name_patterns = [pattern for pattern in patterns if '/' not in pattern.replace(os.sep, '/')]
+    path_patterns = [pattern.replace(os.sep, '/').strip('/').split('/') for pattern in patterns if pattern not in name_patterns]
+    excluded = {os.path.abspath(path) for path in (exclude or [])}
+    directories = [root]
+
+    while directories:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            parts = os.path.relpath(entry.path, root).replace(os.sep, '/').split('/') if path_patterns else None
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    # Without recursion, only the directories named by a path pattern are searched
+                    wanted = recursive or any(
+                        _matches_parts(parts, pattern[:len(parts)]) for pattern in path_patterns if len(pattern) > len(parts)
+                    )
+                    if wanted and os.path.abspath(entry.path) not in excluded:
+                        subdirectories.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if any(fnmatch.fnmatch(entry.name, pattern) for pattern in name_patterns) or any(
+                _matches_parts(parts, pattern) for pattern in path_patterns
+            ):
+                yield entry.path
+
+        # Depth-first, in name order
+        directories.extend(reversed(subdirectories))
@@ -1,7 +1,291 @@
-from PIL import Image
+from PIL import Image, ImageFilter
 import os
 from .utils import get_image_name, get_extension
 
+# Effects of an effect chain, with the value each takes (see parse_effect):
+#   grayscale, sepia:       no value.
+#   brightness:F:           multiply every channel by F (1 leaves it unchanged).
+#   contrast:F:             scale the distance to mid-gray by F.
+#   gamma:G:                gamma correction (above 1 brightens mid-tones).
+#   threshold[:T]:          black and white, cut at luminance T (default 128).
+#   blur[:R]:               Gaussian blur of radius R (default 2).
+#   sharpen[:A]:            unsharp mask of strength A (default 1).
+#   matrix:M:               color matrix, 9 (3x3) or 12 (3x4, with offsets) comma-separated numbers.
+#   lut:FILE:               lookup table file of 256 (all channels) or 768 (R, G then B) values.
+EFFECTS = ('grayscale', 'sepia', 'brightness', 'contrast', 'gamma', 'threshold', 'blur', 'sharpen', 'matrix', 'lut')
+
+_OPTIONAL_VALUES = {'threshold': 128, 'blur': 2.0, 'sharpen': 1.0}
+
+# Pillow's ITU-R 601-2 luma weights, as used by convert('L').
+_GRAY = [[0.299, 0.587, 0.114, 0.0]]
+
+_SEPIA = [
+    [0.393, 0.769, 0.189, 0.0],
+    [0.349, 0.686, 0.168, 0.0],
+    [0.272, 0.534, 0.131, 0.0],
+]
+
+def parse_effect(spec: str) -> tuple:
+    """
+    Parses an effect spec into (name, params), reading LUT files.
+
+    Example:
+        parse_effect("gamma:2.2") -> ('gamma', {'value': 2.2})
+        parse_effect("sepia") -> ('sepia', {})
+
+    Args:
+        spec (str): 'NAME' or 'NAME:VALUE', with NAME one of EFFECTS.
+
+    Returns:
+        tuple[str, dict]: The effect name and its parameters.
+
+    Raises:
+        ValueError: If the effect is unknown or its value is missing or invalid.
+    """
+    name, _, value = spec.strip().partition(':')
+    name = name.lower()
+    if name not in EFFECTS:
+        raise ValueError(f"Unknown effect '{name}'. Choose from: {', '.join(EFFECTS)}.")
+    if name in ('grayscale', 'sepia'):
+        if value:
+            raise ValueError(f"The '{name}' effect takes no value.")
+        return name, {}
+    if not value:
+        if name not in _OPTIONAL_VALUES:
+            raise ValueError(f"The '{name}' effect needs a value, e.g. '{name}:{'FILE' if name == 'lut' else '1.2'}'.")
+        return name, {'value': _OPTIONAL_VALUES[name]}
+
+    if name == 'lut':
+        try:
+            with open(value, 'r', encoding='utf-8') as f:
+                table = [int(float(item)) for item in f.read().replace(',', ' ').split()]
+        except OSError as e:
+            raise ValueError(f"Cannot read the lookup table '{value}': {e}")
+        except ValueError:
+            raise ValueError(f"The lookup table '{value}' must hold numbers.")
+        if len(table) not in (256, 768) or not all(0 <= item <= 255 for item in table):
+            raise ValueError(f"The lookup table '{value}' must hold 256 or 768 values from 0 to 255.")
+        return name, {'value': table}
+
+    try:
+        if name == 'matrix':
+            parsed = [float(item) for item in value.split(',')]
+            if len(parsed) not in (9, 12):
+                raise ValueError
+        else:
+            parsed = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid value '{value}' for the '{name}' effect.")
+    if name == 'threshold' and not 0 <= parsed <= 255:
+        raise ValueError("The threshold must be between 0 and 255.")
+    if name in ('gamma', 'blur', 'sharpen') and parsed <= 0 or name in ('brightness', 'contrast') and parsed < 0:
+        raise ValueError(f"The '{name}' value must be positive.")
+    return name, {'value': parsed}
+
+def _table(function) -> list:
+    """A 256-entry lookup table of `function` over 0-255, rounded and clipped."""
+    return [min(255, max(0, int(function(level) + 0.5))) for level in range(256)]
+
+def _matrix_for(name: str, params: dict) -> list:
+    """The 3x4 color matrix of a matrix effect (sepia or matrix)."""
+    if name == 'sepia':
+        return _SEPIA
+    values = params['value']
+    if len(values) == 9:
+        return [values[0:3] + [0.0], values[3:6] + [0.0], values[6:9] + [0.0]]
+    return [values[0:4], values[4:8], values[8:12]]
+
+def _compose_tables(first: list, second: list) -> list:
+    """Per-channel tables applying `first` then `second`."""
+    return [[after[level] for level in before] for before, after in zip(first, second)]
+
+def _compose_matrices(first: list, second: list) -> list:
+    """The matrix applying `first` (out1 x in+1) then `second` (out2 x out1+1)."""
+    columns = len(first[0])
+    composed = []
+    for row in second:
+        composed.append([
+            sum(row[k] * first[k][j] for k in range(len(first))) + (row[-1] if j == columns - 1 else 0.0)
+            for j in range(columns)
+        ])
+    return composed
+
+def _keeps_range(matrix: list) -> bool:
+    """True when `matrix` maps every input in 0-255 inside 0-255, so nothing is clipped before a following matrix."""
+    for row in matrix:
+        low = row[-1] + 255 * sum(weight for weight in row[:-1] if weight < 0)
+        high = row[-1] + 255 * sum(weight for weight in row[:-1] if weight > 0)
+        if low < -0.5 or high > 255.5:
+            return False
+    return True
+
+class _Pass:
+    """
+    A fused run of point and color effects: an optional lookup table, an
+    optional color matrix, then an optional lookup table.
+    """
+
+    def __init__(self, channels: int):
+        self.channels_in = channels
+        self.channels_out = channels
+        self.before = None
+        self.matrix = None
+        self.after = None
+        self.drop_alpha = False
+
+    def add_table(self, tables: list):
+        if self.matrix is None:
+            self.before = tables if self.before is None else _compose_tables(self.before, tables)
+        else:
+            self.after = tables if self.after is None else _compose_tables(self.after, tables)
+
+    def add_matrix(self, matrix: list):
+        self.matrix = matrix if self.matrix is None else _compose_matrices(self.matrix, matrix)
+        self.channels_out = len(matrix)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.before is None and self.matrix is None and not self.drop_alpha
+
+def _compile(chain: list, channels: int) -> list:
+    """
+    Turns an effect chain into stages for an image with `channels` color
+    channels (1 or 3): _Pass objects, and ImageFilter filters for effects
+    that need neighbouring pixels (blur, sharpen).
+    """
+    stages = []
+    current = _Pass(channels)
+
+    def add_matrix(matrix):
+        nonlocal current
+        if current.after is not None or (current.matrix is not None and not _keeps_range(current.matrix)):
+            # A table, or clipping, must happen in between: start a new pass
+            stages.append(current)
+            current = _Pass(current.channels_out)
+        if current.channels_out == 1:
+            # Gray input: each output channel weighs the gray level by its row's sum
+            matrix = [[sum(row[:3]), row[3]] for row in matrix]
+        current.add_matrix(matrix)
+
+    for name, params in chain:
+        if name in ('grayscale', 'threshold'):
+            if current.channels_out == 3:
+                add_matrix(_GRAY)
+            current.drop_alpha = True
+            if name == 'threshold':
+                cut = params['value']
+                current.add_table([_table(lambda level: 255 if level >= cut else 0)])
+        elif name in ('sepia', 'matrix'):
+            add_matrix(_matrix_for(name, params))
+        elif name == 'lut':
+            table = params['value']
+            if len(table) == 768 and current.channels_out == 1:
+                add_matrix([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0]])
+            tables = [table[index * 256:(index + 1) * 256] for index in range(3)] if len(table) == 768 else [table] * current.channels_out
+            current.add_table(tables)
+        elif name in ('brightness', 'contrast', 'gamma'):
+            value = params['value']
+            if name == 'brightness':
+                function = lambda level: level * value
+            elif name == 'contrast':
+                function = lambda level: (level - 128) * value + 128
+            else:
+                function = lambda level: 255 * (level / 255) ** (1 / value)
+            current.add_table([_table(function)] * current.channels_out)
+        elif name in ('blur', 'sharpen'):
+            if not current.is_empty:
+                stages.append(current)
+            current = _Pass(current.channels_out)
+            if name == 'blur':
+                stages.append(ImageFilter.GaussianBlur(params['value']))
+            else:
+                stages.append(ImageFilter.UnsharpMask(radius=2, percent=round(params['value'] * 100), threshold=0))
+        else:
+            raise ValueError(f"Unknown effect '{name}'. Choose from: {', '.join(EFFECTS)}.")
+    if not current.is_empty:
+        stages.append(current)
+    return stages
+
+def _tables_for(img: Image.Image, tables: list) -> list:
+    """Flattens per-channel tables for Image.point, leaving an alpha band unchanged."""
+    identity = [list(range(256))] if img.mode.endswith('A') else []
+    return [level for table in tables + identity for level in table]
+
+def _run_pass(img: Image.Image, stage: _Pass) -> Image.Image:
+    """
+    Runs a pass with Pillow's vectorized C kernels: one table lookup
+    (Image.point) per table and one Image.convert per matrix, whatever the
+    number of effects fused into them. Alpha is set aside around the matrix.
+    """
+    if stage.before is not None:
+        img = img.point(_tables_for(img, stage.before))
+
+    if stage.matrix is not None or stage.drop_alpha:
+        alpha = img.getchannel('A') if img.mode.endswith('A') and not stage.drop_alpha else None
+        if stage.matrix is None or (stage.matrix == _GRAY and alpha is None):
+            img = img.convert('L')  # Pillow's exact grayscale
+        else:
+            matrix = stage.matrix
+            if stage.channels_in == 1:
+                matrix = [[row[0], 0.0, 0.0, row[1]] for row in matrix]  # Gray is replicated into RGB
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            img = img.convert('L' if len(matrix) == 1 else 'RGB', tuple(value for row in matrix for value in row))
+        if alpha is not None:
+            img.putalpha(alpha)
+
+    if stage.after is not None:
+        img = img.point(_tables_for(img, stage.after))
+    return img
+
+def apply_effects(img: Image.Image, chain: list) -> Image.Image:
+    """
+    Applies an ordered chain of effects to an in-memory image.
+
+    Consecutive point effects (brightness, contrast, gamma, threshold,
+    lookup tables) and color effects (grayscale, sepia, color matrices) are
+    fused: their lookup tables are composed and their matrices multiplied
+    (unless clipping must happen in between), so a run of them costs at most
+    a table lookup, a matrix and a table lookup over the pixels, each a
+    single vectorized C loop in Pillow. Blur and sharpen, which read
+    neighbouring pixels, run as Pillow filters between passes.
+
+    Alpha is preserved, except by grayscale and threshold, which give an
+    'L' image like Pillow's convert('L').
+
+    Args:
+        img (Image.Image): The decoded source image.
+        chain (list[tuple[str, dict]]): Effects in order, as returned by parse_effect.
+
+    Returns:
+        Image.Image: The processed image, in 'L', 'LA', 'RGB' or 'RGBA' mode.
+
+    Raises:
+        ValueError: If an effect is unknown.
+    """
+    if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        has_alpha = 'A' in img.mode or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+    for stage in _compile(chain, 1 if img.mode in ('L', 'LA') else 3):
+        if isinstance(stage, _Pass):
+            img = _run_pass(img, stage)
+        else:
+            img = img.filter(stage)
+    return img
+
+def grayscale(img: Image.Image) -> Image.Image:
+    """
+    Applies a grayscale filter to an in-memory image (see apply_effects).
+
+    Args:
+        img (Image.Image): The decoded source image.
+
+    Returns:
+        Image.Image: The grayscale image, in 'L' mode.
+    """
+    return apply_effects(img, [('grayscale', {})])
+
 def apply_grayscale(image_path: str, custom_output_path: str = None) -> str:
     """
     Applies a grayscale filter to an image.
@@ -36,7 +320,7 @@ def apply_grayscale(image_path: str, custom_output_path: str = None) -> str:
                 output_path = os.path.join(source_dir, f"{base_name}_grayscale.{ext}")
 
             # Convert to grayscale ('L' mode) and save
-            grayscale_img = img.convert('L')
+            grayscale_img = grayscale(img)
             grayscale_img.save(output_path)
             
             return output_path
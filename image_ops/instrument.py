@@ -0,0 +1,259 @@
+import contextlib
+import cProfile
+import json
+import math
+import os
+import pstats
+import tempfile
+import threading
+import time
+
+# Upper bounds (in seconds) of the latency histogram buckets.
+HISTOGRAM_BUCKETS = [0.001, 0.01, 0.1, 1.0, 10.0]
+
+_local = threading.local()
+_NOT_RECORDING = contextlib.nullcontext()
+
+class Recorder:
+    """Measurements taken while processing one image: stage durations and counters."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other: 'Recorder'):
+        """Adds the measurements of `other` (e.g., from another segment of the same image)."""
+        for name, seconds in other.stages.items():
+            self.add_stage(name, seconds)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+def _current() -> Recorder:
+    return getattr(_local, 'recorder', None)
+
+@contextlib.contextmanager
+def _timed(recorder: Recorder, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_stage(name, time.perf_counter() - start)
+
+def stage(name: str):
+    """
+    Times a block as stage `name` of the image being recorded on this thread.
+    Does nothing (and costs next to nothing) when no recording is active.
+
+    Example:
+        with instrument.stage('encode'):
+            img.save(output_path)
+    """
+    recorder = _current()
+    if recorder is None:
+        return _NOT_RECORDING
+    return _timed(recorder, name)
+
+def count(name: str, amount: int = 1):
+    """Adds `amount` to counter `name` (e.g., 'bytes_read', 'retries') of the image being recorded."""
+    recorder = _current()
+    if recorder is not None:
+        recorder.count(name, amount)
+
+@contextlib.contextmanager
+def recording():
+    """Records the stages and counters of the work done on this thread inside the block."""
+    previous = _current()
+    recorder = Recorder()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+def run_task(func, args: tuple, profile: bool = False):
+    """
+    Worker entry point: runs `func(*args)` while recording it, and profiling it with cProfile if asked.
+
+    Returns:
+        tuple[object, Recorder, dict | None]: The result, the measurements,
+        and the raw profiler statistics (None without `profile`).
+    """
+    profiler = cProfile.Profile() if profile else None
+    with recording() as recorder:
+        if profiler:
+            profiler.enable()
+        try:
+            result = func(*args)
+        finally:
+            if profiler:
+                profiler.disable()
+
+    stats = None
+    if profiler:
+        profiler.create_stats()
+        stats = profiler.stats
+    return result, recorder, stats
+
+class _CollectedStats:
+    """Wraps raw profiler statistics so pstats.Stats can load them."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def _distribution(values: list) -> dict:
+    """Summarizes durations (in seconds) with percentiles and a histogram."""
+    ordered = sorted(values)
+
+    def percentile(percent):
+        return ordered[max(1, math.ceil(percent / 100 * len(ordered))) - 1]
+
+    histogram = {}
+    lower = 0.0
+    for upper in HISTOGRAM_BUCKETS + [math.inf]:
+        label = f"<{upper * 1000:g}ms" if upper != math.inf else f">={lower * 1000:g}ms"
+        histogram[label] = sum(1 for value in ordered if lower <= value < upper)
+        lower = upper
+
+    return {
+        'count': len(ordered),
+        'total_seconds': round(sum(ordered), 6),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(percentile(50) * 1000, 3),
+        'p95_ms': round(percentile(95) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'histogram': histogram,
+    }
+
+class RunReport:
+    """
+    Collects per-image and per-stage measurements of a batch run.
+
+    Pass it to batch.run_batch, then write it with `save` (and `save_profile`
+    when profiling).
+
+    Example:
+        report = RunReport()
+        for image_path, output_path, error in run_batch(pipeline, jobs, report=report):
+            ...
+        report.save("report.json")
+    """
+
+    def __init__(self, profile: bool = False):
+        """
+        Args:
+            profile (bool, optional): Also profile every task with cProfile. Defaults to False.
+        """
+        self.profile = profile
+        self.images = []
+        self.cache = None
+        self.dedupe = None
+        self._stats = None
+        self._started = time.perf_counter()
+        self._finished = None
+
+    def add_image(self, image_path: str, output_path: str, error: Exception, seconds: float, recorder: Recorder, cache: str = None):
+        """
+        Records a finished image.
+
+        Args:
+            image_path (str): The source image.
+            output_path (str): Where its result was written.
+            error (Exception | None): The error it failed with, if any.
+            seconds (float): Time from its first task being queued to its last finishing.
+            recorder (Recorder): Its stage durations and counters.
+            cache (str, optional): 'hit', 'partial' or 'miss' when a cache was
+                                   used, or 'duplicate' when the result was
+                                   taken from an identical input.
+        """
+        self.images.append({
+            'image': image_path,
+            'output': output_path,
+            'error': str(error) if error is not None else None,
+            'seconds': round(seconds, 6),
+            'cache': cache,
+            'stages': {name: round(value, 6) for name, value in recorder.stages.items()},
+            'counters': dict(recorder.counters),
+        })
+
+    def add_stats(self, stats: dict):
+        """Adds the raw profiler statistics of one task."""
+        if self._stats is None:
+            self._stats = pstats.Stats(_CollectedStats(stats))
+        else:
+            self._stats.add(_CollectedStats(stats))
+
+    def finish(self, cache=None, dedupe=None):
+        """
+        Marks the end of the run and takes the counts of `cache` (a
+        ResultCache) and `dedupe` (a dedupe.Deduplicator), if any.
+        """
+        self._finished = time.perf_counter()
+        if cache is not None:
+            self.cache = {'hits': cache.hits, 'partial_hits': cache.partial_hits, 'misses': cache.misses}
+        if dedupe is not None:
+            self.dedupe = {
+                'duplicates': dedupe.duplicates,
+                'remote_calls_saved': dedupe.remote_calls_saved,
+                'cpu_seconds_saved': round(dedupe.cpu_seconds_saved, 6),
+            }
+
+    def to_dict(self) -> dict:
+        """Returns the report: run totals, per-stage distributions and per-image details."""
+        wall = (self._finished or time.perf_counter()) - self._started
+        stage_values = {}
+        totals = {}
+        for image in self.images:
+            for name, seconds in image['stages'].items():
+                stage_values.setdefault(name, []).append(seconds)
+            for name, amount in image['counters'].items():
+                totals[name] = totals.get(name, 0) + amount
+
+        return {
+            'run': {
+                'images': len(self.images),
+                'errors': sum(1 for image in self.images if image['error']),
+                'wall_seconds': round(wall, 6),
+                'images_per_second': round(len(self.images) / wall, 3) if wall else None,
+            },
+            'totals': totals,
+            'cache': self.cache,
+            'dedupe': self.dedupe,
+            'latency': _distribution([image['seconds'] for image in self.images]) if self.images else None,
+            'stages': {name: _distribution(values) for name, values in sorted(stage_values.items())},
+            'images': self.images,
+        }
+
+    def save(self, path: str):
+        """Writes the report as JSON, atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def save_profile(self, path: str) -> bool:
+        """
+        Writes the combined cProfile statistics of every task (pstats format,
+        readable with `python -m pstats`, snakeviz, or flameprof for a flame graph).
+
+        Returns:
+            bool: False if nothing was profiled.
+        """
+        if self._stats is None:
+            return False
+        self._stats.dump_stats(path)
+        return True
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+
+# File name of the journal kept in the output directory by default.
+JOURNAL_NAME = ".pixelhorizon-journal.jsonl"
+
+class Journal:
+    """
+    An append-only log of a batch run, one JSON line per event, from which
+    an interrupted run can be resumed.
+
+    Every image is logged when it starts ('start') and when it finishes
+    ('done' with its output files, or 'failed' with the error). Finishing
+    lines are flushed as they are written, so a run killed at any point
+    (out of memory, a quota error, a stopped container) leaves a journal
+    telling which images completed, which failed, and which were in flight.
+    Starting lines ride along with the next flush. A line cut short by the
+    crash is ignored when the journal is read back.
+
+    Example:
+        journal = Journal("./processed/.pixelhorizon-journal.jsonl", pipeline.signature(), resume=True)
+        jobs = [job for job in jobs if journal.needs_run(job[0])]
+        journal.start(image_path)
+        ...
+        journal.complete(image_path, output_paths)
+        journal.close()
+    """
+
+    def __init__(self, path: str, settings: str, resume: bool = False):
+        """
+        Args:
+            path (str): Where the journal is written.
+            settings (str): A description of the operations applied (see
+                            Pipeline.signature); a journal is only resumed
+                            with the same settings.
+            resume (bool, optional): Read the existing journal and keep
+                                     appending to it, instead of starting a
+                                     new one. Defaults to False.
+
+        Raises:
+            ValueError: If the journal to resume was written with other settings.
+        """
+        self.path = path
+        self.settings = settings
+        # Absolute source path -> its output files, as of the journal read
+        self.done = {}
+        # Absolute source path -> its error, kept up to date as images finish
+        self.failed = {}
+        # Sources started but never finished when the journal was last written
+        self.interrupted = set()
+
+        if resume and os.path.exists(path):
+            self._load()
+        self._compact()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _key(source: str) -> str:
+        return os.path.abspath(source)
+
+    def _load(self):
+        """Replays the events of an existing journal."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                kind, image = event.get('event'), event.get('image')
+                if kind == 'run':
+                    if event.get('settings') != self.settings:
+                        raise ValueError(f"The journal '{self.path}' was written with other settings; run without resuming to start over.")
+                elif kind == 'start':
+                    self.interrupted.add(image)
+                elif kind == 'done':
+                    self.done[image] = event['outputs']
+                    self.failed.pop(image, None)
+                    self.interrupted.discard(image)
+                elif kind == 'failed':
+                    self.failed[image] = event['error']
+                    self.done.pop(image, None)
+                    self.interrupted.discard(image)
+        # Failures of sources deleted since cannot be retried
+        self.failed = {image: error for image, error in self.failed.items() if os.path.exists(image)}
+
+    def _compact(self):
+        """Rewrites the journal with only the outcome of each image, atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'event': 'run', 'settings': self.settings}) + '\n')
+                for image, outputs in self.done.items():
+                    f.write(json.dumps({'event': 'done', 'image': image, 'outputs': outputs}) + '\n')
+                for image, error in self.failed.items():
+                    f.write(json.dumps({'event': 'failed', 'image': image, 'error': error}) + '\n')
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def needs_run(self, source: str, failures_only: bool = False) -> bool:
+        """
+        Checks whether `source` still has to be processed to finish the
+        journaled run: it did not complete (or one of its outputs is gone)
+        and did not fail.
+
+        Args:
+            source (str): Path to the source image file.
+            failures_only (bool, optional): Instead, only sources that failed
+                                            need to run. Defaults to False.
+
+        Returns:
+            bool: True if the source must be processed.
+        """
+        key = self._key(source)
+        if failures_only:
+            return key in self.failed
+        if key in self.failed:
+            return False
+        outputs = self.done.get(key)
+        return outputs is None or not all(os.path.exists(path) for path in outputs)
+
+    def _append(self, event: dict, flush: bool):
+        self._file.write(json.dumps(event) + '\n')
+        if flush:
+            self._file.flush()
+
+    def start(self, source: str):
+        """Logs that `source` was handed to the workers."""
+        self._append({'event': 'start', 'image': self._key(source)}, flush=False)
+
+    def complete(self, source: str, outputs: list):
+        """Logs that `source` was processed into `outputs`."""
+        self.failed.pop(self._key(source), None)
+        self._append({'event': 'done', 'image': self._key(source), 'outputs': [os.path.abspath(path) for path in outputs]}, flush=True)
+
+    def fail(self, source: str, error: Exception):
+        """Logs that processing `source` failed with `error`."""
+        self.failed[self._key(source)] = str(error)
+        self._append({'event': 'failed', 'image': self._key(source), 'error': str(error)}, flush=True)
+
+    def close(self, remove: bool = False):
+        """Flushes and closes the journal, deleting it when `remove` is True (e.g., after a complete run)."""
+        if self._file.closed:
+            return
+        self._file.close()
+        if remove:
+            os.remove(self.path)
@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+from .cache import fingerprint, hash_file
+
+# File name of the manifest kept in the output directory.
+MANIFEST_NAME = ".pixelhorizon-manifest.json"
+
+class Manifest:
+    """
+    Records which sources produced which outputs, for incremental runs.
+
+    Each entry stores a source's size, modification time and content hash
+    along with the output files it produced. A source is up to date when the
+    settings are unchanged and its size and mtime match, which needs only a
+    `stat`; the content hash is computed only when those differ, so touched
+    but unchanged files are not reprocessed either.
+
+    Example:
+        manifest = Manifest("./processed", pipeline.signature())
+        jobs = [job for job in jobs if not manifest.is_current(job[0], [job[1]])]
+        ...
+        manifest.record(image_path, [output_path])
+        manifest.save()
+    """
+
+    def __init__(self, output_dir: str, settings: str):
+        """
+        Args:
+            output_dir (str): The output directory the manifest lives in.
+            settings (str): A description of the operations applied (see
+                            Pipeline.signature). Entries recorded with other
+                            settings are treated as out of date.
+        """
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.settings = settings
+        self.entries = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data.get('entries', {})
+                if data.get('settings') != settings:
+                    # Outputs are still tracked (for pruning) but nothing is current.
+                    for entry in self.entries.values():
+                        entry['hash'] = None
+            except (ValueError, OSError):
+                self.entries = {}
+
+    @staticmethod
+    def _key(source: str) -> str:
+        return os.path.abspath(source)
+
+    def is_current(self, source: str, outputs: list) -> bool:
+        """
+        Checks whether `source` was already processed into `outputs`
+        with the current settings and has not changed since.
+
+        Args:
+            source (str): Path to the source image file.
+            outputs (list[str]): The files the result is written to.
+
+        Returns:
+            bool: True if the source can be skipped.
+        """
+        entry = self.entries.get(self._key(source))
+        outputs = [os.path.abspath(path) for path in outputs]
+        if not entry or not entry.get('hash') or entry.get('outputs') != outputs:
+            return False
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            return False
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+
+        # Size or mtime changed: only the content decides.
+        if stat.st_size == entry['size'] and hash_file(source) == entry['hash']:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def outputs_of(self, source: str) -> list:
+        """Returns the (absolute) output files last recorded for `source`, or an empty list."""
+        entry = self.entries.get(self._key(source))
+        return list(entry['outputs']) if entry else []
+
+    def record(self, source: str, outputs: list, source_fingerprint: tuple = None):
+        """
+        Records that `source` was processed into the files `outputs`.
+
+        Args:
+            source (str): Path to the source image file.
+            outputs (list[str]): The files the result was written to.
+            source_fingerprint (tuple[int, int, str], optional): The
+                (size, mtime_ns, digest) of the source as it was processed
+                (see cache.fingerprint, and the `fingerprints` of
+                batch.run_batch). By default, the source is stat'ed and hashed now.
+        """
+        size, mtime_ns, digest = source_fingerprint or fingerprint(source)
+        self.entries[self._key(source)] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': digest,
+            'outputs': [os.path.abspath(path) for path in outputs],
+        }
+
+    def prune(self) -> list:
+        """
+        Deletes the outputs of sources that no longer exist and forgets them.
+
+        Returns:
+            list[str]: The output paths that were removed.
+        """
+        removed = []
+        for source, entry in list(self.entries.items()):
+            if os.path.exists(source):
+                continue
+            for output_path in entry.get('outputs', []):
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                    removed.append(output_path)
+            del self.entries[source]
+        return removed
+
+    def save(self):
+        """Writes the manifest atomically."""
+        directory = os.path.dirname(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'settings': self.settings, 'entries': self.entries}, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
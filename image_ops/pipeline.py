@@ -0,0 +1,733 @@
+from PIL import Image
+import contextlib
+import io
+import json
+import os
+from . import convert, effects, instrument, resize, tiles
+from .plan import plan_steps, read_info
+from .utils import atomic_path, get_extension, place_copy
+
+@contextlib.contextmanager
+def _written(target):
+    """Yields where to write `target`: a temporary path renamed to it (see utils.atomic_path), or the stream itself."""
+    if isinstance(target, str):
+        with atomic_path(target) as temp_path:
+            yield temp_path
+    else:
+        yield target
+
+class Pipeline:
+    """
+    An ordered chain of image operations applied to a single decoded image.
+
+    The source file is decoded once, every step works on the in-memory image,
+    and the result is encoded once when it is written to its final path.
+    Steps are recorded by name so a pipeline can be inspected or rebuilt.
+
+    Example:
+        Pipeline().resize(256, 256).grayscale().to_format('jpg').run("logo.png", "logo.jpg")
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.output_format = None
+        self.svg_options = None
+        self.variants = None
+        self.memory_limit = None
+        self.encoding = {}
+        self.encode_workers = 1
+        self.auto_format = None
+        self.link_copies = False
+        self._planned = False
+
+    # --- Builder Methods ---
+
+    def resize(self, width: int, height: int, resample: str = None, preset: str = 'balanced') -> 'Pipeline':
+        """Adds a resize step to the chain (see resize.resize for `resample` and `preset`)."""
+        self.steps.append(('resize', {'width': width, 'height': height, 'resample': resample, 'preset': preset}))
+        return self
+
+    def grayscale(self) -> 'Pipeline':
+        """Adds a grayscale step to the chain."""
+        self.steps.append(('grayscale', {}))
+        return self
+
+    def effects(self, specs: list) -> 'Pipeline':
+        """
+        Adds an ordered chain of effects as one step, run as fused passes over
+        the pixels (see effects.apply_effects). Specs are parsed (and lookup
+        tables read) here, e.g. ["brightness:1.1", "sepia", "blur:2"].
+
+        Raises:
+            ValueError: If a spec is invalid (see effects.parse_effect).
+        """
+        chain = [list(effects.parse_effect(spec)) for spec in specs]
+        self.steps.append(('effects', {'chain': chain}))
+        return self
+
+    def remove_background(self, api_key: str, **client_options) -> 'Pipeline':
+        """
+        Adds a remove.bg background removal step to the chain.
+
+        `client_options` (e.g., requests_per_minute, max_concurrency, api_url)
+        configure the shared rmbg.RemoveBgClient used for the call.
+        """
+        self.steps.append(('remove_bg', {'api_key': api_key, 'options': client_options}))
+        return self
+
+    def to_format(self, output_format: str) -> 'Pipeline':
+        """Sets the format the result is encoded to (e.g., 'jpg', 'png', 'ico')."""
+        self.output_format = output_format.lower()
+        return self
+
+    def encode_with(
+        self,
+        preset: str = None,
+        quality: int = None,
+        speed: int = None,
+        lossless: bool = False,
+        workers: int = 1
+    ) -> 'Pipeline':
+        """
+        Sets the encoder preset ('fast', 'balanced' or 'smallest', see
+        convert.ENCODE_PRESETS) and its overrides (see convert.encode_options).
+        Without any, 'balanced' is used, and a source already in the target
+        format is copied instead of being re-encoded. `workers` only sets how
+        many threads encode one image (AVIF, and the candidates of to_auto_format).
+        """
+        settings = {'preset': preset, 'quality': quality, 'speed': speed, 'lossless': lossless or None}
+        self.encoding = {key: value for key, value in settings.items() if value is not None}
+        convert.encode_options('webp', **self.encoding)  # Validates the settings
+        self.encode_workers = workers
+        return self
+
+    def to_auto_format(self, formats: list = convert.AUTO_FORMATS, min_psnr: float = None, max_bytes: int = None) -> 'Pipeline':
+        """
+        Encodes each result in whichever of `formats` is smallest while meeting
+        a quality (`min_psnr`) or size (`max_bytes`) budget (see
+        convert.choose_format). The extension of the output path is replaced
+        by the chosen format's.
+        """
+        for output_format in formats:
+            if output_format.lower() not in convert.CONVERSIONS:
+                raise ValueError(f"Conversion to format '{output_format}' is not supported.")
+        self.auto_format = {'formats': [fmt.lower() for fmt in formats], 'min_psnr': min_psnr, 'max_bytes': max_bytes}
+        return self
+
+    def link_unchanged(self, enabled: bool = True) -> 'Pipeline':
+        """
+        Hard-links the output to the source, instead of copying it, when the
+        chain leaves the image unchanged (see utils.place_copy).
+        """
+        self.link_copies = enabled
+        return self
+
+    def to_svg(
+        self,
+        turd_size: int = 2,
+        color: str = '#000000',
+        backend: str = 'native',
+        colors: int = None,
+        workers: int = 1
+    ) -> 'Pipeline':
+        """
+        Traces the result into an SVG file instead of encoding a raster image
+        (see vectorize.vectorize). `workers` only sets how many color layers
+        are traced at once.
+        """
+        self.svg_options = {'turd_size': turd_size, 'color': color, 'backend': backend, 'colors': colors, 'workers': workers}
+        return self
+
+    def to_variants(
+        self,
+        variants: list,
+        name_template: str = "{name}_{width}x{height}.{ext}",
+        resample: str = None,
+        preset: str = 'balanced'
+    ) -> 'Pipeline':
+        """
+        Writes several sizes of the result instead of one (see resize.resize_variants).
+
+        Each variant is saved next to the output path, named with `name_template`
+        ({name}, {width}, {height} and {ext} are filled in). {width} and
+        {height} are the requested box, not the size written: a 'fit' variant
+        "128" of a 640x480 image is 128x96 but named with 128x128, so names
+        are known before the image is decoded (see output_paths). For ICO
+        output, all variants are embedded in the single output file instead.
+
+        Args:
+            variants (list[str]): Variant specs, e.g. ["1024", "256x256:fill"].
+            name_template (str, optional): File name of each variant.
+            resample (str, optional): Resampling filter name.
+            preset (str, optional): One of resize.RESIZE_PRESETS. Defaults to 'balanced'.
+
+        Raises:
+            ValueError: If a spec is invalid.
+        """
+        self.variants = {
+            'sizes': [list(resize.parse_variant(spec)) for spec in variants],
+            'name_template': name_template,
+            'resample': resample,
+            'preset': preset,
+        }
+        return self
+
+    def limit_memory(self, max_bytes: int = tiles.DEFAULT_MEMORY_LIMIT) -> 'Pipeline':
+        """
+        Processes images whose decoded size exceeds `max_bytes` in tiled mode:
+        format conversions and tracing run strip by strip instead of making
+        full-size temporary copies, and each intermediate image is released
+        as soon as the next one replaces it. Results are identical to the
+        untiled ones.
+        """
+        self.memory_limit = max_bytes
+        return self
+
+    def _strip_rows(self, img: Image.Image) -> int:
+        """Returns the strip height to use for `img`, or None if it is small enough to process whole."""
+        if self.memory_limit is not None and tiles.decoded_size(img) > self.memory_limit:
+            return tiles.strip_rows(img)
+        return None
+
+    def _copy_output_settings(self, other: 'Pipeline'):
+        """Gives `other` this chain's output format, SVG and variant settings."""
+        other.output_format = self.output_format
+        other.svg_options = self.svg_options
+        other.variants = self.variants
+        other.encoding = self.encoding
+        other.encode_workers = self.encode_workers
+        other.auto_format = self.auto_format
+        other.link_copies = self.link_copies
+
+    @property
+    def _has_output_settings(self) -> bool:
+        return (
+            self.output_format is not None or self.svg_options is not None
+            or self.variants is not None or bool(self.encoding) or self.auto_format is not None
+        )
+
+    def signature(self) -> str:
+        """
+        Describes what the chain does to an image, for use in cache keys.
+
+        Credentials and tuning (the remove.bg API key, rate limits, tracing and
+        encoding workers, hard-linking) are left out since they do not change the result.
+
+        Returns:
+            str: A stable JSON description of the steps and output settings.
+        """
+        steps = []
+        for name, params in self.steps:
+            if name == 'remove_bg':
+                params = {}
+            steps.append([name, params])
+        svg_options = self.svg_options
+        if svg_options is not None:
+            svg_options = {key: value for key, value in svg_options.items() if key != 'workers'}
+        return json.dumps(
+            [steps, self.output_format, svg_options, self.variants, self.encoding, self.auto_format], sort_keys=True
+        )
+
+    # --- Execution ---
+
+    def output_extension(self, image_path: str) -> str:
+        """
+        Returns the extension (without the dot) the result of `image_path` will have.
+
+        Args:
+            image_path (str): Path to the source image file.
+
+        Returns:
+            str: 'svg' when tracing, 'auto' with automatic format selection
+                 (replaced when the result is written, see auto_output_path),
+                 the target format if set, 'png' after background removal,
+                 otherwise the source extension.
+        """
+        if self.svg_options is not None:
+            return 'svg'
+        if self.auto_format is not None:
+            return 'auto'
+        if self.output_format:
+            return self.output_format
+        if any(name == 'remove_bg' for name, _ in self.steps):
+            return 'png'
+        return get_extension(image_path)
+
+    def output_paths(self, output_path: str) -> list:
+        """
+        Returns every file written for `output_path`: the path itself, or one
+        file per variant (next to it) unless they are bundled in an ICO file.
+        With automatic format selection, pass the path a run returned, which
+        has the chosen extension.
+        """
+        if self.variants is None or get_extension(output_path) == 'ico':
+            return [output_path]
+
+        base_name = os.path.splitext(os.path.basename(output_path))[0]
+        ext = get_extension(output_path)
+        paths = []
+        for width, height, _ in self.variants['sizes']:
+            file_name = self.variants['name_template'].format(name=base_name, width=width, height=height, ext=ext)
+            paths.append(os.path.join(os.path.dirname(output_path), file_name))
+        return paths
+
+    def auto_output_paths(self, output_path: str) -> list:
+        """
+        With automatic format selection, returns every path a run may write
+        for `output_path`, one per candidate format; otherwise an empty list.
+        """
+        if self.auto_format is None or self.svg_options is not None:
+            return []
+        return [self.auto_output_path(output_path, fmt) for fmt in self.auto_format['formats']]
+
+    @staticmethod
+    def auto_output_path(output_path: str, output_format: str) -> str:
+        """Returns `output_path` with its extension replaced by `output_format`."""
+        return f"{os.path.splitext(output_path)[0]}.{output_format}"
+
+    def apply(self, img: Image.Image, source_data: bytes = None, release: bool = False) -> Image.Image:
+        """
+        Runs every step of the chain on an in-memory image.
+
+        Args:
+            img (Image.Image): The decoded source image. May be None if
+                               `source_data` is given and the first step is
+                               background removal.
+            source_data (bytes, optional): The encoded source file. Sent as-is
+                                           to remove.bg when it is the first step,
+                                           avoiding a re-encode. Defaults to None.
+            release (bool, optional): Close each image, `img` included, as soon
+                                      as a step has replaced it, so at most two
+                                      full-size images are alive at once.
+                                      Defaults to False.
+
+        Returns:
+            Image.Image: The processed image.
+        """
+        if img is not None and not self._decodes_in_resize:
+            with instrument.stage('decode'):
+                img.load()
+
+        for index, (name, params) in enumerate(self.steps):
+            previous = img
+            if name == 'resize':
+                img = resize.resize(img, **params)
+            elif name == 'grayscale':
+                with instrument.stage('grayscale'):
+                    img = effects.grayscale(img)
+            elif name == 'effects':
+                with instrument.stage('effects'):
+                    img = effects.apply_effects(img, params['chain'])
+            elif name == 'remove_bg':
+                if index == 0 and source_data is not None:
+                    data = source_data
+                else:
+                    with instrument.stage('encode'):
+                        data = convert.encode(img, 'png')
+                from . import rmbg  # Loads requests only for chains that need it
+                result = rmbg.remove_background_data(data, params['api_key'], **params['options'])
+                img = Image.open(io.BytesIO(result))
+            if release and previous is not None and previous is not img:
+                previous.close()
+        return img
+
+    def _save(self, img: Image.Image, output_path: str, stream=None, buffers: dict = None) -> str:
+        """
+        Encodes the processed image to its final path, and returns that path.
+        With a `stream`, the result is written to it instead and `output_path`
+        only names it (its extension sets the format). With `buffers`, each
+        variant file is encoded into a BytesIO stored there under its path.
+        """
+        target = output_path if stream is None else stream
+        if self.svg_options is not None:
+            from . import vectorize
+            with _written(target) as path:
+                vectorize.vectorize(img, path, strip_rows=self._strip_rows(img), **self.svg_options)
+            instrument.count('bytes_written', stream.tell() if stream is not None else os.path.getsize(output_path))
+            return output_path
+
+        if self.auto_format is not None:
+            if self.variants is not None:
+                raise ValueError("Automatic format selection cannot be combined with variants.")
+            with instrument.stage('encode'):
+                output_format, data = convert.choose_format(
+                    img, workers=self.encode_workers, threads=self.encode_workers, **self.auto_format, **self.encoding
+                )
+            output_path = self.auto_output_path(output_path, output_format)
+            if stream is not None:
+                stream.write(data)
+            else:
+                with instrument.stage('write'), atomic_path(output_path) as temp_path, open(temp_path, 'wb') as f:
+                    f.write(data)
+            instrument.count('bytes_written', len(data))
+            return output_path
+
+        output_format = self.output_format or get_extension(output_path)
+        options = convert.encode_options(output_format, threads=self.encode_workers, **self.encoding)
+        if self.variants is None:
+            images, paths = [img], [target]
+        else:
+            images = resize.resize_variants(
+                img, self.variants['sizes'], resample=self.variants['resample'], preset=self.variants['preset']
+            )
+            if output_format == 'ico':
+                with instrument.stage('encode'), _written(target) as path:
+                    convert.save_ico(images, path)
+                instrument.count('bytes_written', stream.tell() if stream is not None else os.path.getsize(output_path))
+                return output_path
+            if stream is not None:
+                raise ValueError("Variants are written as separate files and need an output path (except in ICO files).")
+            paths = self.output_paths(output_path)
+            if buffers is not None:
+                paths = [buffers.setdefault(path, io.BytesIO()) for path in paths]
+
+        # Also for paths: they are written under a temporary name
+        options['format'] = convert.pil_format(output_format)
+        for image, path in zip(images, paths):
+            if output_format in convert.CONVERSIONS:
+                strip_rows = self._strip_rows(image)
+                with instrument.stage('convert'):
+                    converted = convert.to_format(image, output_format, strip_rows=strip_rows)
+                if strip_rows and converted is not image:
+                    image.close()  # Tiled mode: free the unconverted image before encoding
+                image = converted
+            with instrument.stage('encode'), _written(path) as written:
+                image.save(written, **options)
+        instrument.count('bytes_written', sum(path.tell() if hasattr(path, 'tell') else os.path.getsize(path) for path in paths))
+        return output_path
+
+    def _execute(self, source, finish):
+        """
+        Loads `source` (a path or encoded bytes), applies the chain and hands
+        the result to `finish`. The source is not decoded when the first step
+        is background removal, since remove.bg accepts the original bytes.
+        """
+        if isinstance(source, str) and not os.path.exists(source):
+            raise FileNotFoundError(f"The file '{source}' was not found.")
+
+        try:
+            if self.steps and self.steps[0][0] == 'remove_bg':
+                return finish(self.apply(None, source_data=self._read(source)))
+
+            if isinstance(source, bytes):
+                instrument.count('bytes_read', len(source))
+                source = io.BytesIO(source)
+            else:
+                instrument.count('bytes_read', os.path.getsize(source))
+            with Image.open(source) as img:
+                # Decided from the header, before anything is decoded
+                release = self._strip_rows(img) is not None
+                return finish(self.apply(img, release=release))
+
+        except (ValueError, IOError):
+            raise
+        except Exception as e:
+            raise IOError(f"An error occurred while processing the image: {e}")
+
+    @property
+    def _decodes_in_resize(self) -> bool:
+        """True when the first operation is a resize, which decodes the source itself (possibly in draft mode)."""
+        if self.steps:
+            return self.steps[0][0] == 'resize'
+        return self.variants is not None and self.svg_options is None
+
+    @property
+    def is_noop(self) -> bool:
+        """True when the chain has no steps and no output conversion."""
+        return not self.steps and not self._has_output_settings
+
+    def _is_unchanged(self, source) -> bool:
+        """
+        True when the result would be `source` itself: the chain has no steps,
+        and there is no output conversion or the source is already in the
+        target format (read from the header). An explicit preset re-encodes.
+        """
+        if self.is_noop:
+            return True
+        if self.steps or self.svg_options is not None or self.variants is not None or self.encoding or self.auto_format is not None:
+            return False
+        if isinstance(source, str) and not os.path.exists(source):
+            return False
+        try:
+            with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+                return img.format == convert.pil_format(self.output_format)
+        except Exception:
+            return False  # Not an image Pillow can read: let decoding report it
+
+    @property
+    def is_remote(self) -> bool:
+        """True when every step of the chain is a network call (I/O bound)."""
+        return bool(self.steps) and all(name == 'remove_bg' for name, _ in self.steps)
+
+    @property
+    def _is_single_remote(self) -> bool:
+        """True when the chain is exactly one remove.bg call."""
+        return len(self.steps) == 1 and self.is_remote
+
+    @staticmethod
+    def _read(source) -> bytes:
+        """Returns the encoded bytes of `source` (a path or bytes)."""
+        if isinstance(source, bytes):
+            data = source
+        elif not os.path.exists(source):
+            raise FileNotFoundError(f"The file '{source}' was not found.")
+        else:
+            with instrument.stage('read'), open(source, 'rb') as image_file:
+                data = image_file.read()
+        instrument.count('bytes_read', len(data))
+        return data
+
+    def split(self) -> list:
+        """
+        Splits the chain into consecutive segments so that network-bound steps
+        (remove.bg) are isolated from CPU-bound ones.
+
+        Only the last segment carries the output format, SVG or variant settings, so the
+        segments can be run one after the other with `process` and `run`.
+        A trailing remove.bg call with nothing after it stays the last segment,
+        so its response can be streamed straight to the output file.
+
+        Returns:
+            list[Pipeline]: The segments, in order. Never empty.
+        """
+        segments = []
+        for step in self.steps:
+            remote = step[0] == 'remove_bg'
+            if not segments or segments[-1].is_remote != remote:
+                segments.append(Pipeline())
+            segments[-1].steps.append(step)
+
+        if not segments or (segments[-1].is_remote and self._has_output_settings):
+            segments.append(Pipeline())
+        self._copy_output_settings(segments[-1])
+        for segment in segments:
+            segment.memory_limit = self.memory_limit
+        return segments
+
+    def plan(self, source) -> 'Pipeline':
+        """
+        Returns the chain to run for `source`, judged from its header without
+        decoding it (see plan.plan_steps): this chain when every step is
+        needed, otherwise a copy without the no-op steps. When no step is
+        left and the format is unchanged, running it copies the source.
+        `run`, `run_to_bytes` and `process` plan themselves.
+
+        Args:
+            source (str | bytes): Path to the source image file, or its encoded bytes.
+
+        Returns:
+            Pipeline: The chain to run.
+        """
+        if self._planned or not any(name in ('resize', 'grayscale') for name, _ in self.steps):
+            return self
+        try:
+            info = read_info(source)
+        except (ValueError, IOError):
+            return self  # Let the run report it
+        steps = plan_steps(self.steps, info)
+        if len(steps) == len(self.steps):
+            return self
+
+        planned = Pipeline()
+        planned.steps = steps
+        self._copy_output_settings(planned)
+        planned.memory_limit = self.memory_limit
+        planned._planned = True
+        instrument.count('steps_skipped', len(self.steps) - len(steps))
+        return planned
+
+    def route(self, source) -> str:
+        """
+        Names how the result of `source` will be produced, from its header
+        alone. Call it on a planned chain (see plan).
+
+        Returns:
+            str: 'copy' or 'link' when the source is left unchanged,
+                 'remove.bg' when the remote result is written as-is,
+                 'tiled' when the image is decoded strip by strip (see
+                 limit_memory), otherwise 'decode'.
+        """
+        if self._is_unchanged(source):
+            return 'link' if self.link_copies and isinstance(source, str) else 'copy'
+        if self._is_single_remote and not self._has_output_settings:
+            return 'remove.bg'
+        info = read_info(source)
+        decoded_size = info.width * info.height * tiles.bytes_per_pixel(info.mode)
+        if self.memory_limit is not None and decoded_size > self.memory_limit:
+            return 'tiled'
+        return 'decode'
+
+    def process(self, source) -> bytes:
+        """
+        Applies the chain to `source` and returns the result as PNG bytes,
+        for handing an intermediate image to the next segment. A chain with
+        nothing to do returns the source bytes as they are.
+
+        Args:
+            source (str | bytes): Path to the source image file, or its encoded bytes.
+
+        Returns:
+            bytes: The processed image, encoded as a PNG.
+
+        Raises:
+            ValueError: If a step has invalid parameters.
+            FileNotFoundError: If the source path does not exist.
+            IOError: If there is an error reading or processing the source.
+        """
+        planned = self.plan(source)
+        if planned is not self:
+            return planned.process(source)
+        if self.is_noop:
+            return self._read(source)
+        if self._is_single_remote:
+            # The remove.bg response is already a PNG: pass it through untouched.
+            params = self.steps[0][1]
+            from . import rmbg
+            return rmbg.remove_background_data(self._read(source), params['api_key'], **params['options'])
+
+        def encode(img):
+            with instrument.stage('encode'):
+                return convert.encode(img, 'png')
+
+        return self._execute(source, encode)
+
+    def run(self, source, output_path: str) -> str:
+        """
+        Decodes `source`, applies the chain and writes the result to `output_path`.
+
+        Steps that would not change the image are skipped (see plan). When
+        the chain leaves the image unchanged (no steps, and no target format
+        or the source is already in it), the source is copied (or
+        hard-linked, see link_unchanged) without being decoded.
+
+        Args:
+            source (str | bytes): Path to the source image file, or its encoded bytes.
+            output_path (str): The exact path to save the result to.
+
+        Returns:
+            str: The path where the result was saved. With automatic format
+                 selection, its extension is the chosen format's.
+
+        Raises:
+            ValueError: If a step has invalid parameters or the format is not supported.
+            FileNotFoundError: If the source path or Potrace cannot be found.
+            IOError: If there is an error reading the source or writing the output file.
+        """
+        if isinstance(source, str) and not os.path.exists(source):
+            raise FileNotFoundError(f"The file '{source}' was not found.")
+        planned = self.plan(source)
+        if planned is not self:
+            return planned.run(source, output_path)
+        if self._is_unchanged(source):
+            if isinstance(source, bytes):
+                with instrument.stage('copy'), atomic_path(output_path) as temp_path, open(temp_path, 'wb') as out_file:
+                    out_file.write(source)
+            else:
+                with instrument.stage('copy'):
+                    place_copy(source, output_path, link=self.link_copies)
+            instrument.count('bytes_written', os.path.getsize(output_path))
+            return output_path
+
+        if self._is_single_remote and not self._has_output_settings:
+            # Stream the remove.bg response straight to its final path.
+            params = self.steps[0][1]
+            from . import rmbg
+            client = rmbg.get_client(params['api_key'], **params['options'])
+            return client.remove_background_to_file(self._read(source), output_path)
+
+        return self._execute(source, lambda img: self._save(img, output_path))
+
+    def render(self, source, output_path: str) -> tuple:
+        """
+        Like run, but returns the encoded output files instead of writing
+        them, so that the caller can write them elsewhere (see
+        writer.OutputWriter). Results that need no encoding (copies, links,
+        remove.bg responses) and tiled images, which are encoded strip by
+        strip to bound memory, are still written by run, each under a
+        temporary name renamed into place; their file list is empty.
+
+        Args:
+            source (str | bytes): Path to the source image file, or its encoded bytes.
+            output_path (str): The exact path the result is meant for.
+
+        Returns:
+            tuple[str, list[tuple[str, bytes]]]: The output path (see run) and
+            the (path, data) of each file to write.
+
+        Raises:
+            ValueError: If a step has invalid parameters or the format is not supported.
+            FileNotFoundError: If the source path or Potrace cannot be found.
+            IOError: If there is an error reading the source or writing the output file.
+        """
+        planned = self.plan(source)
+        if planned is not self:
+            return planned.render(source, output_path)
+        try:
+            route = self.route(source)
+        except (FileNotFoundError, IOError):
+            route = None  # Let run report it
+        if route != 'decode':
+            return self.run(source, output_path), []
+
+        buffers = {}
+        if self.variants is None or self.svg_options is not None or (self.output_format or get_extension(output_path)) == 'ico':
+            stream = io.BytesIO()
+            output_path = self._execute(source, lambda img: self._save(img, output_path, stream))
+            buffers[output_path] = stream
+        else:
+            output_path = self._execute(source, lambda img: self._save(img, output_path, buffers=buffers))
+        return output_path, [(path, buffer.getvalue()) for path, buffer in buffers.items()]
+
+    def run_to_bytes(self, source, name: str = None) -> tuple:
+        """
+        Applies the chain to `source` and returns the encoded result instead of
+        writing a file, for streaming (e.g., stdin to stdout). Nothing is
+        written to disk; only a remove.bg step leaves the process.
+
+        Args:
+            source (str | bytes | BinaryIO): Path to the source image file, its
+                                             encoded bytes, or a readable binary stream.
+            name (str, optional): File name of the source. Its extension is kept
+                                  when no format is set; by default it is the
+                                  path of `source`, or read from the image header.
+
+        Returns:
+            tuple[bytes, str]: The encoded result and its extension (with
+            automatic format selection, the chosen format).
+
+        Raises:
+            ValueError: If a step has invalid parameters, the format is not
+                        supported, or variants would need several files.
+            FileNotFoundError: If the source path or Potrace cannot be found.
+            IOError: If there is an error reading or processing the source.
+        """
+        if hasattr(source, 'read'):
+            source = source.read()
+        elif isinstance(source, str):
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"The file '{source}' was not found.")
+            name = name or source
+        if not name or not get_extension(name):
+            name = f"image.{self._header_extension(source)}"
+        planned = self.plan(source)
+        if planned is not self:
+            return planned.run_to_bytes(source, name)
+
+        if self._is_unchanged(source):
+            return self._read(source), get_extension(name)
+        if self._is_single_remote and not self._has_output_settings:
+            return self.process(source), 'png'
+
+        stream = io.BytesIO()
+        output_path = f"image.{self.output_extension(name)}"
+        output_path = self._execute(source, lambda img: self._save(img, output_path, stream))
+        return stream.getvalue(), get_extension(output_path)
+
+    @staticmethod
+    def _header_extension(source) -> str:
+        """Returns the extension matching the format of `source` (a path or bytes), read from its header."""
+        try:
+            with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+                return convert.extension_for(img.format)
+        except Exception as e:
+            raise IOError(f"Cannot identify the image format: {e}")
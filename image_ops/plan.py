@@ -0,0 +1,90 @@
+import io
+import os
+from typing import NamedTuple
+from PIL import Image
+
+class ImageInfo(NamedTuple):
+    """What an image's header tells without decoding it."""
+    format: str
+    width: int
+    height: int
+    mode: str
+    has_alpha: bool
+    file_size: int
+
+    @property
+    def megapixels(self) -> float:
+        return self.width * self.height / 1_000_000
+
+def read_info(source) -> ImageInfo:
+    """
+    Reads the format, size, mode and alpha presence of an image from its
+    header only (a few KB), without decoding any pixels.
+
+    Args:
+        source (str | bytes): Path to the image file, or its encoded bytes.
+
+    Returns:
+        ImageInfo: The header information.
+
+    Raises:
+        FileNotFoundError: If the source path does not exist.
+        IOError: If the source is not an image Pillow can read.
+    """
+    if isinstance(source, bytes):
+        file_size = len(source)
+        source = io.BytesIO(source)
+    elif not os.path.exists(source):
+        raise FileNotFoundError(f"The file '{source}' was not found.")
+    else:
+        file_size = os.path.getsize(source)
+    try:
+        with Image.open(source) as img:
+            has_alpha = img.mode in ('RGBA', 'LA', 'PA', 'La', 'RGBa') or 'transparency' in img.info
+            return ImageInfo(img.format, img.width, img.height, img.mode, has_alpha, file_size)
+    except Exception as e:
+        raise IOError(f"Cannot read the image header: {e}")
+
+def plan_steps(steps: list, info: ImageInfo) -> list:
+    """
+    Drops the steps that would not change an image described by `info`, and
+    fuses those that can run as one, following the size and mode through
+    the chain:
+
+    - a resize immediately followed by another is dropped, so the image is
+      resampled once, straight to the final size;
+    - a resize to the size the image already has is dropped;
+    - grayscale on an image already in 'L' mode is dropped;
+    - an empty effect chain is dropped.
+
+    After remove.bg the size is no longer known (the service may scale the
+    result), so later resizes are kept.
+
+    Args:
+        steps (list[tuple[str, dict]]): The steps of a Pipeline.
+        info (ImageInfo): The header of the image entering the chain.
+
+    Returns:
+        list[tuple[str, dict]]: The steps to run, in order.
+    """
+    size, mode = (info.width, info.height), info.mode
+    planned = []
+    for index, (name, params) in enumerate(steps):
+        following = steps[index + 1][0] if index + 1 < len(steps) else None
+        if name == 'resize':
+            target = (params['width'], params['height'])
+            if following == 'resize' or target == size:
+                continue
+            size = target
+        elif name == 'grayscale':
+            if mode == 'L':
+                continue
+            mode = 'L'
+        elif name == 'effects':
+            if not params['chain']:
+                continue
+            mode = None  # Depends on the effects; not worth predicting
+        elif name == 'remove_bg':
+            size, mode = None, 'RGBA'
+        planned.append((name, params))
+    return planned
@@ -0,0 +1,197 @@
+import os
+import threading
+from .batch import create_pools, default_jobs, run_batch
+from .cache import ResultCache
+from .instrument import RunReport
+from .pipeline import Pipeline
+from .tiles import DEFAULT_MEMORY_LIMIT
+
+def build_pipeline(operations: dict, memory_limit: int = DEFAULT_MEMORY_LIMIT, layer_workers: int = 1) -> Pipeline:
+    """
+    Builds a Pipeline from a description of the operations, in the order the
+    CLI applies them: resize, grayscale and effects, background removal, then SVG tracing
+    or format conversion, then size variants.
+
+    Recognized keys (all optional):
+        resize ([int, int]): Target width and height.
+        resample (str), resize_preset (str): See resize.resize.
+        grayscale (bool): Apply a grayscale filter.
+        effects (list[str]): Effect chain, see Pipeline.effects. Grayscale
+                             runs as its first effect, in the same passes.
+        remove_bg (dict): Remove the background; holds 'api_key' and
+                          optionally 'max_concurrency' and 'requests_per_minute'.
+        svg (dict): Trace to SVG; holds any of 'turd_size', 'color',
+                    'backend' and 'colors'.
+        format (str): Target format, when not tracing.
+        encode_preset (str), quality (int), speed (int), lossless (bool):
+                Encoder settings, see Pipeline.encode_with.
+        auto_format (dict): Choose the smallest format per image; holds any of
+                            'formats', 'min_psnr' and 'max_bytes' (see
+                            Pipeline.to_auto_format).
+        link (bool): Hard-link unchanged outputs, see Pipeline.link_unchanged.
+        variants (list[str]), variant_name (str): See Pipeline.to_variants.
+
+    Example:
+        build_pipeline({'resize': [256, 256], 'grayscale': True, 'format': 'jpg'})
+
+    Args:
+        operations (dict): The operations to apply.
+        memory_limit (int, optional): See Pipeline.limit_memory. Defaults to DEFAULT_MEMORY_LIMIT.
+        layer_workers (int, optional): Processes tracing SVG color layers, or
+                                       threads encoding one image, at once. Defaults to 1.
+
+    Returns:
+        Pipeline: The chain of operations.
+
+    Raises:
+        ValueError: If an operation is unknown or has invalid parameters.
+    """
+    unknown = set(operations) - {
+        'resize', 'resample', 'resize_preset', 'grayscale', 'effects', 'remove_bg', 'svg', 'format', 'variants', 'variant_name',
+        'encode_preset', 'quality', 'speed', 'lossless', 'auto_format', 'link'
+    }
+    if unknown:
+        raise ValueError(f"Unknown operations: {', '.join(sorted(unknown))}.")
+
+    pipeline = Pipeline().limit_memory(memory_limit)
+    resample = operations.get('resample')
+    preset = operations.get('resize_preset', 'balanced')
+
+    if operations.get('resize'):
+        width, height = operations['resize']
+        pipeline.resize(width, height, resample=resample, preset=preset)
+    if operations.get('effects'):
+        pipeline.effects((['grayscale'] if operations.get('grayscale') else []) + list(operations['effects']))
+    elif operations.get('grayscale'):
+        pipeline.grayscale()
+    if operations.get('remove_bg'):
+        options = dict(operations['remove_bg'])
+        api_key = options.pop('api_key', None)
+        if not api_key:
+            raise ValueError("Background removal needs a remove.bg API key.")
+        pipeline.remove_background(api_key, **options)
+    if operations.get('svg') is not None:
+        pipeline.to_svg(workers=layer_workers, **operations['svg'])
+    elif operations.get('auto_format') is not None:
+        pipeline.to_auto_format(**operations['auto_format'])
+    elif operations.get('format'):
+        pipeline.to_format(operations['format'])
+    if operations.get('variants'):
+        pipeline.to_variants(
+            operations['variants'],
+            name_template=operations.get('variant_name', "{name}_{width}x{height}.{ext}"),
+            resample=resample,
+            preset=preset
+        )
+    encoding = {key: operations[key] for key in ('quality', 'speed', 'lossless') if operations.get(key) is not None}
+    if operations.get('encode_preset') or encoding or layer_workers > 1:
+        pipeline.encode_with(operations.get('encode_preset'), workers=layer_workers, **encoding)
+    if operations.get('link'):
+        pipeline.link_unchanged()
+    return pipeline
+
+def default_output_path(
+    pipeline: Pipeline, image_path: str, output_dir: str = None, relative_dir: str = '', create_dirs: bool = True
+) -> str:
+    """
+    Returns where the CLI writes the result of `image_path`: inside
+    `output_dir` (under `relative_dir`, mirroring the input tree) if given,
+    otherwise next to the source with a '_processed' suffix. The directory
+    is created unless `create_dirs` is False.
+    """
+    final_ext = pipeline.output_extension(image_path)
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+
+    if output_dir:
+        target_dir = os.path.normpath(os.path.join(output_dir, relative_dir))
+        if create_dirs:
+            os.makedirs(target_dir, exist_ok=True)
+        return os.path.join(target_dir, f"{base_name}.{final_ext}")
+    source_dir = os.path.dirname(image_path)
+    return os.path.join(source_dir, f"{base_name}_processed.{final_ext}")
+
+class BatchProcessor:
+    """
+    Runs pipelines over images while keeping worker state warm between calls.
+
+    The CPU process pool and remove.bg thread pool are created on first use
+    and reused by every later call, so each call costs only the image work:
+    worker processes keep their imports, pooled remove.bg sessions and the
+    resolved Potrace path, and the result cache stays open.
+
+    Example:
+        with BatchProcessor(workers=4) as processor:
+            pipeline = build_pipeline({'resize': [256, 256], 'format': 'jpg'})
+            for image_path, output_path, error in processor.run(pipeline, jobs):
+                ...
+            processor.process(pipeline, "logo.png", "logo.jpg")
+    """
+
+    def __init__(self, workers: int = None, remote_workers: int = 4, cache: ResultCache = None):
+        """
+        Args:
+            workers (int, optional): Size of the CPU process pool. Defaults to the number of cores.
+            remote_workers (int, optional): Size of the remove.bg thread pool. Defaults to 4.
+            cache (ResultCache, optional): Where to reuse and store results. Defaults to None.
+        """
+        self.workers = workers or default_jobs()
+        self.remote_workers = remote_workers
+        self.cache = cache
+        if self.workers < 1 or self.remote_workers < 1:
+            raise ValueError("The number of workers must be a positive integer.")
+        self._pools = None
+        self._lock = threading.Lock()
+
+    def _get_pools(self) -> tuple:
+        with self._lock:
+            if self._pools is None:
+                self._pools = create_pools(self.workers, self.remote_workers)
+            return self._pools
+
+    def run(self, pipeline: Pipeline, jobs, report: RunReport = None):
+        """
+        Runs `pipeline` over many images on the shared pools (see batch.run_batch).
+
+        Yields:
+            tuple[str, str, Exception | None]: (image_path, output_path, error)
+            for each job, in completion order.
+        """
+        yield from run_batch(
+            pipeline, jobs, workers=self.workers, remote_workers=self.remote_workers,
+            cache=self.cache, report=report, pools=self._get_pools()
+        )
+
+    def process(self, pipeline: Pipeline, image_path: str, output_path: str = None) -> list:
+        """
+        Processes a single image. Safe to call from several threads at once.
+
+        Args:
+            pipeline (Pipeline): The chain of operations to apply.
+            image_path (str): Path to the source image file.
+            output_path (str, optional): Where to write the result. Defaults to
+                                         next to the source (see default_output_path).
+
+        Returns:
+            list[str]: Every file written (several with size variants).
+
+        Raises:
+            Exception: The error the image failed with.
+        """
+        output_path = output_path or default_output_path(pipeline, image_path)
+        for _, written_path, error in self.run(pipeline, [(image_path, output_path)]):
+            if error is not None:
+                raise error
+        return pipeline.output_paths(written_path)
+
+    def close(self):
+        """Shuts the pools down."""
+        with self._lock:
+            pools, self._pools = self._pools, None
+        for pool in pools or ():
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,8 +1,191 @@
 from PIL import Image
+import math
 import os
+from . import instrument
 from .utils import get_image_name, get_extension
 
-def resize_image(image_path: str, width: int, height: int, custom_output_path: str = None) -> str:
+# Quality/speed presets for downscaling.
+#   draft_scale: JPEG sources are decoded at a reduced scale (DCT scaling) to at
+#                least this multiple of the target size. None disables it.
+#   reducing_gap: images are first shrunk by an integer factor with `reduce`
+#                 down to this multiple of the target size, then resampled.
+RESIZE_PRESETS = {
+    'fast': {'resample': Image.Resampling.BILINEAR, 'draft_scale': 1, 'reducing_gap': 1.0},
+    'balanced': {'resample': Image.Resampling.BICUBIC, 'draft_scale': 2, 'reducing_gap': 2.0},
+    'quality': {'resample': Image.Resampling.LANCZOS, 'draft_scale': None, 'reducing_gap': None},
+}
+
+RESAMPLE_FILTERS = {name.lower(): member for name, member in Image.Resampling.__members__.items()}
+
+def resize(img: Image.Image, width: int, height: int, resample: str = None, preset: str = 'balanced') -> Image.Image:
+    """
+    Resizes an in-memory image to specified dimensions.
+
+    When `img` is a JPEG that has not been decoded yet, decoding is done
+    directly at a reduced scale (draft mode) for large downscales, and other
+    images are shrunk in two stages (`reduce` then resample), as set by the preset.
+
+    Args:
+        img (Image.Image): The source image, as returned by `Image.open`.
+        width (int): The target width in pixels.
+        height (int): The target height in pixels.
+        resample (str, optional): Resampling filter name (e.g., 'lanczos', 'bilinear').
+                                  Defaults to the preset's filter.
+        preset (str, optional): One of RESIZE_PRESETS ('fast', 'balanced', 'quality').
+                                Defaults to 'balanced'.
+
+    Returns:
+        Image.Image: The resized image.
+
+    Raises:
+        ValueError: If width or height are not positive integers, or the
+                    filter or preset is unknown.
+    """
+    if not isinstance(width, int) or not isinstance(height, int) or width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+    if preset not in RESIZE_PRESETS:
+        raise ValueError(f"Unknown resize preset '{preset}'. Choose from: {', '.join(RESIZE_PRESETS)}.")
+    if resample is not None and resample.lower() not in RESAMPLE_FILTERS:
+        raise ValueError(f"Unknown resample filter '{resample}'. Choose from: {', '.join(RESAMPLE_FILTERS)}.")
+
+    settings = RESIZE_PRESETS[preset]
+    resample_filter = RESAMPLE_FILTERS[resample.lower()] if resample else settings['resample']
+
+    # Only applies to JPEGs that are not loaded yet; a no-op otherwise.
+    if settings['draft_scale'] is not None and width < img.width and height < img.height:
+        scale = settings['draft_scale']
+        img.draft(None, (width * scale, height * scale))
+
+    with instrument.stage('decode'):
+        img.load()
+    with instrument.stage('resize'):
+        return img.resize((width, height), resample_filter, reducing_gap=settings['reducing_gap'])
+
+# How a variant maps the source onto its box:
+#   exact: stretch to exactly WxH.
+#   fit:   scale to fit inside WxH, preserving the aspect ratio (never enlarges).
+#   fill:  scale to cover WxH, preserving the aspect ratio, then center-crop.
+VARIANT_MODES = ('exact', 'fit', 'fill')
+
+def parse_variant(spec: str) -> tuple:
+    """
+    Parses a variant spec into (width, height, mode).
+
+    Example:
+        parse_variant("256") -> (256, 256, 'fit')
+        parse_variant("512x256") -> (512, 256, 'exact')
+        parse_variant("512x256:fill") -> (512, 256, 'fill')
+
+    Args:
+        spec (str): 'N' (fit in a square), 'WxH' (exact) or 'WxH:MODE'.
+
+    Returns:
+        tuple[int, int, str]: The target width, height and one of VARIANT_MODES.
+
+    Raises:
+        ValueError: If the spec is malformed.
+    """
+    size, _, mode = spec.strip().lower().partition(':')
+    try:
+        if 'x' in size:
+            width, height = (int(value) for value in size.split('x'))
+            mode = mode or 'exact'
+        else:
+            width = height = int(size)
+            mode = mode or 'fit'
+    except ValueError:
+        raise ValueError(f"Invalid variant '{spec}'. Use N, WxH or WxH:{'|'.join(VARIANT_MODES)}.")
+
+    if width <= 0 or height <= 0 or mode not in VARIANT_MODES:
+        raise ValueError(f"Invalid variant '{spec}'. Use N, WxH or WxH:{'|'.join(VARIANT_MODES)}.")
+    return width, height, mode
+
+def resize_variants(img: Image.Image, variants: list, resample: str = None, preset: str = 'balanced') -> list:
+    """
+    Builds several sizes of an image from a single decode.
+
+    Variants are produced from largest to smallest, each one resampled from
+    the smallest aspect-preserving image already built that is still large
+    enough, so every level is a cheap downscale of the previous one rather
+    than of the full-size source.
+
+    Args:
+        img (Image.Image): The source image, as returned by `Image.open`.
+        variants (list[tuple[int, int, str]]): (width, height, mode) targets,
+                                               see parse_variant.
+        resample (str, optional): Resampling filter name. Defaults to the preset's filter.
+        preset (str, optional): One of RESIZE_PRESETS. Defaults to 'balanced'.
+
+    Returns:
+        list[Image.Image]: One image per variant, in the order given.
+
+    Raises:
+        ValueError: If a variant, the filter or the preset is invalid.
+    """
+    if preset not in RESIZE_PRESETS:
+        raise ValueError(f"Unknown resize preset '{preset}'. Choose from: {', '.join(RESIZE_PRESETS)}.")
+    if resample is not None and resample.lower() not in RESAMPLE_FILTERS:
+        raise ValueError(f"Unknown resample filter '{resample}'. Choose from: {', '.join(RESAMPLE_FILTERS)}.")
+
+    settings = RESIZE_PRESETS[preset]
+    resample_filter = RESAMPLE_FILTERS[resample.lower()] if resample else settings['resample']
+    source_width, source_height = img.size
+
+    # Work out the aspect-preserving size each variant has to be taken from
+    plans = []
+    for index, (width, height, mode) in enumerate(variants):
+        if mode not in VARIANT_MODES or width <= 0 or height <= 0:
+            raise ValueError(f"Invalid variant {(width, height, mode)}.")
+        if mode == 'fit':
+            scale = min(width / source_width, height / source_height, 1.0)
+            needed = (max(1, round(source_width * scale)), max(1, round(source_height * scale)))
+        elif mode == 'fill':
+            scale = max(width / source_width, height / source_height)
+            needed = (max(width, math.ceil(source_width * scale)), max(height, math.ceil(source_height * scale)))
+        else:
+            needed = (width, height)
+        plans.append((index, needed, (width, height), mode))
+
+    # Decode JPEGs directly at a scale that still covers the largest variant
+    largest = (max(plan[1][0] for plan in plans), max(plan[1][1] for plan in plans))
+    if settings['draft_scale'] is not None and largest[0] < source_width and largest[1] < source_height:
+        img.draft(None, (largest[0] * settings['draft_scale'], largest[1] * settings['draft_scale']))
+    with instrument.stage('decode'):
+        img.load()
+
+    with instrument.stage('resize'):
+        return _build_variants(img, plans, resample_filter, settings['reducing_gap'])
+
+def _build_variants(img: Image.Image, plans: list, resample_filter, reducing_gap: float) -> list:
+    """Resamples every planned variant, largest first, each from the smallest level that covers it."""
+    levels = [img]
+    results = [None] * len(plans)
+    for index, needed, size, mode in sorted(plans, key=lambda plan: plan[1][0] * plan[1][1], reverse=True):
+        large_enough = [level for level in levels if level.width >= needed[0] and level.height >= needed[1]]
+        source = min(large_enough, key=lambda level: level.width * level.height) if large_enough else img
+
+        if mode == 'exact':
+            results[index] = source.resize(size, resample_filter, reducing_gap=reducing_gap)
+            continue
+
+        scaled = source if source.size == needed else source.resize(needed, resample_filter, reducing_gap=reducing_gap)
+        levels.append(scaled)
+        if mode == 'fill':
+            left = (needed[0] - size[0]) // 2
+            top = (needed[1] - size[1]) // 2
+            scaled = scaled.crop((left, top, left + size[0], top + size[1]))
+        results[index] = scaled
+
+    return results
+
+def resize_image(
+    image_path: str,
+    width: int,
+    height: int,
+    custom_output_path: str = None,
+    resample: str = None,
+    preset: str = 'balanced'
+) -> str:
     """
     Resizes an image to specified dimensions.
 
@@ -15,6 +198,8 @@ def resize_image(image_path: str, width: int, height: int, custom_output_path: s
         height (int): The target height in pixels.
         custom_output_path (str, optional): The exact path to save the new file to.
                                             Defaults to None.
+        resample (str, optional): Resampling filter name. Defaults to the preset's filter.
+        preset (str, optional): One of RESIZE_PRESETS. Defaults to 'balanced'.
 
     Returns:
         str: The path where the resized image was saved.
@@ -42,7 +227,7 @@ def resize_image(image_path: str, width: int, height: int, custom_output_path: s
                 output_path = os.path.join(source_dir, f"{base_name}_resized.{ext}")
 
             # Resize and save the image
-            resized_img = img.resize((width, height))
+            resized_img = resize(img, width, height, resample=resample, preset=preset)
             resized_img.save(output_path)
             
             return output_path
@@ -1,6 +1,292 @@
 import requests
+import collections
 import os
-from .utils import get_image_name
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from . import instrument
+from .utils import atomic_path, get_image_name
+
+# The endpoint can be overridden with the REMOVE_BG_API_URL environment
+# variable, e.g. to point at a local stand-in server for tests.
+API_URL = "https://api.remove.bg/v1.0/removebg"
+
+# Status codes worth retrying: rate limiting and transient server errors.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class _RateLimiter:
+    """Spaces requests evenly to stay under a requests-per-minute budget, shared across threads."""
+
+    def __init__(self, requests_per_minute: float = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        """Blocks until the caller may send its next request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Holds back every thread for `seconds` (e.g., after a 429 response)."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+def _retry_after(response: requests.Response):
+    """Parses a Retry-After header (seconds or HTTP date) into a delay in seconds."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RemoveBgClient:
+    """
+    A thread-safe remove.bg client built for batches.
+
+    All requests share one `requests.Session` with a keep-alive connection pool
+    sized for `max_concurrency`, are spaced to respect `requests_per_minute`,
+    and are retried with exponential backoff on 429/5xx responses and
+    connection errors, honouring the server's Retry-After header.
+
+    Example:
+        with RemoveBgClient(api_key, max_concurrency=8, requests_per_minute=500) as client:
+            for image_path, output_path, error in client.remove_backgrounds(items):
+                ...
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = None,
+        max_concurrency: int = 4,
+        requests_per_minute: float = None,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 30
+    ):
+        """
+        Args:
+            api_key (str): Your API key for the remove.bg service.
+            api_url (str, optional): The endpoint to post to. Defaults to the
+                                     REMOVE_BG_API_URL environment variable, then API_URL.
+            max_concurrency (int, optional): Number of requests run at once. Defaults to 4.
+            requests_per_minute (float, optional): Request budget. Defaults to None (unlimited).
+            max_retries (int, optional): Retries per image on retryable errors. Defaults to 3.
+            backoff (float, optional): Base delay in seconds, doubled on each retry. Defaults to 1.0.
+            timeout (float, optional): Per-request timeout in seconds. Defaults to 30.
+
+        Raises:
+            ValueError: If the API key is missing or max_concurrency is not positive.
+        """
+        if not api_key:
+            raise ValueError("Remove.bg API key is missing. Please provide it via the API_KEY environment variable.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer.")
+
+        self.api_key = api_key
+        self.api_url = api_url or os.getenv("REMOVE_BG_API_URL") or API_URL
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+        self._limiter = _RateLimiter(requests_per_minute)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the pooled connections."""
+        self._session.close()
+
+    def _post(self, image_data: bytes, filename: str) -> requests.Response:
+        """Posts an image, retrying on retryable errors. Returns an open, streamed response."""
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            try:
+                response = self._session.post(
+                    self.api_url,
+                    files={'image_file': (filename, image_data)},
+                    data={'size': 'auto'},
+                    headers={'X-Api-Key': self.api_key},
+                    timeout=self.timeout,
+                    stream=True
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if not response.ok:
+                        response.close()
+                    response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
+                    return response
+                delay = _retry_after(response)
+                response.close()
+
+            if delay is None:
+                delay = self.backoff * (2 ** attempt)
+            self._limiter.pause(delay)
+            attempt += 1
+            instrument.count('retries')
+            with self._retries_lock:
+                self.retries += 1
+
+    def remove_background_data(self, image_data: bytes, filename: str = "image.png") -> bytes:
+        """
+        Removes the background from in-memory image data.
+
+        Args:
+            image_data (bytes): The encoded source image (e.g., PNG or JPG bytes).
+            filename (str, optional): The file name reported to the API. Defaults to "image.png".
+
+        Returns:
+            bytes: The processed image, encoded as a PNG with transparency.
+
+        Raises:
+            IOError: If there is a network error or the API returns an error.
+        """
+        try:
+            with instrument.stage('remove_bg'), self._post(image_data, filename) as response:
+                return response.content
+        except requests.exceptions.RequestException as e:
+            raise IOError(f"A network error occurred: {e}")
+
+    def remove_background_to_file(self, image_data: bytes, output_path: str, filename: str = "image.png") -> str:
+        """
+        Removes the background from in-memory image data, streaming the result
+        to disk. The response is streamed to a temporary file renamed into
+        place once complete, so a failed transfer leaves no truncated PNG.
+
+        Args:
+            image_data (bytes): The encoded source image (e.g., PNG or JPG bytes).
+            output_path (str): The exact path to save the PNG to.
+            filename (str, optional): The file name reported to the API. Defaults to "image.png".
+
+        Returns:
+            str: The path where the processed image was saved.
+
+        Raises:
+            IOError: If there is a network error, the API returns an error, or the file cannot be written.
+        """
+        try:
+            with instrument.stage('remove_bg'), self._post(image_data, filename) as response, atomic_path(output_path) as temp_path:
+                with open(temp_path, 'wb') as out_file:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        out_file.write(chunk)
+            instrument.count('bytes_written', os.path.getsize(output_path))
+            return output_path
+        except requests.exceptions.RequestException as e:
+            raise IOError(f"A network error occurred: {e}")
+
+    def remove_backgrounds(self, items):
+        """
+        Removes the background from many images concurrently. At most twice
+        `max_concurrency` images are read and queued at once, so `items` may
+        be a lazy iterator over a large batch.
+
+        Args:
+            items (Iterable[tuple[str, str]]): (image_path, output_path) pairs.
+
+        Yields:
+            tuple[str, str, Exception | None]: (image_path, output_path, error)
+            for each item, in input order. `error` is None on success.
+        """
+        def process(item):
+            image_path, output_path = item
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"The file '{image_path}' was not found.")
+            with open(image_path, 'rb') as image_file:
+                image_data = image_file.read()
+            return self.remove_background_to_file(image_data, output_path, filename=os.path.basename(image_path))
+
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # (future, item) in input order
+            pending = collections.deque()
+
+            def fill():
+                while len(pending) < self.max_concurrency * 2:
+                    item = next(items, None)
+                    if item is None:
+                        return
+                    pending.append((executor.submit(process, item), item))
+
+            fill()
+            while pending:
+                future, (image_path, output_path) = pending.popleft()
+                try:
+                    future.result()
+                    error = None
+                except Exception as e:
+                    error = e
+                fill()
+                yield image_path, output_path, error
+
+# Clients are shared per configuration so repeated calls reuse pooled connections.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key: str, **options) -> RemoveBgClient:
+    """
+    Returns a shared RemoveBgClient for this API key and set of options,
+    creating it on first use.
+
+    Args:
+        api_key (str): Your API key for the remove.bg service.
+        **options: Keyword arguments passed to RemoveBgClient.
+
+    Returns:
+        RemoveBgClient: The shared client.
+    """
+    key = (api_key, tuple(sorted(options.items())))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = RemoveBgClient(api_key, **options)
+        return _clients[key]
+
+def remove_background_data(image_data: bytes, api_key: str, filename: str = "image.png", **options) -> bytes:
+    """
+    Removes the background from in-memory image data using the remove.bg API.
+
+    Args:
+        image_data (bytes): The encoded source image (e.g., PNG or JPG bytes).
+        api_key (str): Your API key for the remove.bg service.
+        filename (str, optional): The file name reported to the API. Defaults to "image.png".
+        **options: Client options (see RemoveBgClient), e.g. requests_per_minute.
+
+    Returns:
+        bytes: The processed image, encoded as a PNG with transparency.
+
+    Raises:
+        ValueError: If the API key is missing.
+        IOError: If there is a network error or the API returns an error.
+    """
+    return get_client(api_key, **options).remove_background_data(image_data, filename=filename)
 
 def remove_background(image_path: str, api_key: str, custom_output_path: str = None) -> str:
     """
@@ -26,7 +312,7 @@ def remove_background(image_path: str, api_key: str, custom_output_path: str = N
     """
     if not api_key:
         raise ValueError("Remove.bg API key is missing. Please provide it via the API_KEY environment variable.")
-    
+
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"The file '{image_path}' was not found.")
 
@@ -41,22 +327,11 @@ def remove_background(image_path: str, api_key: str, custom_output_path: str = N
 
     try:
         with open(image_path, 'rb') as image_file:
-            response = requests.post(
-                'https://api.remove.bg/v1.0/removebg',
-                files={'image_file': image_file},
-                data={'size': 'auto'},
-                headers={'X-Api-Key': api_key},
-                timeout=30  # 30-second timeout for the request
-            )
-        
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-
-        with open(output_path, 'wb') as out_file:
-            out_file.write(response.content)
-        
-        return output_path
-            
-    except requests.exceptions.RequestException as e:
-        raise IOError(f"A network error occurred: {e}")
+            image_data = image_file.read()
+
+        return get_client(api_key).remove_background_to_file(image_data, output_path, filename=os.path.basename(image_path))
+
+    except IOError:
+        raise
     except Exception as e:
         raise IOError(f"An unexpected error occurred while processing the background removal: {e}")
@@ -0,0 +1,219 @@
+import collections
+import contextlib
+import io
+import posixpath
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from .batch import create_pools, default_jobs
+from .pipeline import Pipeline
+
+# How several images are framed on one stream:
+#   'frames': each image is a header line "<size> <name>\n" followed by <size> bytes.
+#   'tar': an uncompressed tar archive (compressed archives are accepted as input).
+FRAMINGS = ('frames', 'tar')
+
+def read_frames(infile):
+    """
+    Reads length-prefixed images from a binary stream (see FRAMINGS).
+
+    Args:
+        infile (BinaryIO): Where the frames are read from (e.g., sys.stdin.buffer).
+
+    Yields:
+        tuple[str, bytes]: (name, data) for each frame, in order.
+
+    Raises:
+        ValueError: If a header is invalid or the stream ends inside a frame.
+    """
+    while True:
+        header = infile.readline()
+        if not header:
+            return
+        if not header.strip():
+            continue
+        size, _, name = header.rstrip(b'\r\n').partition(b' ')
+        if not size.isdigit():
+            raise ValueError(f"Invalid frame header: {header[:80]!r}. Expected '<size> <name>'.")
+        data = infile.read(int(size))
+        if len(data) < int(size):
+            raise ValueError(f"The stream ended inside the frame '{name.decode('utf-8', 'replace')}'.")
+        yield name.decode('utf-8') or 'image', data
+
+def read_tar(infile):
+    """
+    Reads the files of a tar archive from a binary stream, without seeking.
+
+    Args:
+        infile (BinaryIO): Where the archive is read from.
+
+    Yields:
+        tuple[str, bytes]: (member name, data) for each regular file, in order.
+    """
+    with tarfile.open(fileobj=infile, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, archive.extractfile(member).read()
+
+def read_stream(infile, framing: str = 'frames'):
+    """
+    Reads images framed with `framing` (one of FRAMINGS) from a binary stream.
+
+    Yields:
+        tuple[str, bytes]: (name, data) for each image, in order.
+
+    Raises:
+        ValueError: If the framing is unknown.
+    """
+    if framing not in FRAMINGS:
+        raise ValueError(f"Unknown stream framing '{framing}'. Choose from: {', '.join(FRAMINGS)}.")
+    return read_tar(infile) if framing == 'tar' else read_frames(infile)
+
+class StreamWriter:
+    """
+    Writes images to a binary stream, framed like read_stream expects them.
+
+    Example:
+        with StreamWriter(sys.stdout.buffer, 'tar') as writer:
+            writer.write("logo.png", data)
+    """
+
+    def __init__(self, outfile, framing: str = 'frames'):
+        """
+        Args:
+            outfile (BinaryIO): Where the images are written (e.g., sys.stdout.buffer).
+            framing (str, optional): One of FRAMINGS. Defaults to 'frames'.
+
+        Raises:
+            ValueError: If the framing is unknown.
+        """
+        if framing not in FRAMINGS:
+            raise ValueError(f"Unknown stream framing '{framing}'. Choose from: {', '.join(FRAMINGS)}.")
+        self.outfile = outfile
+        self.framing = framing
+        self._archive = tarfile.open(fileobj=outfile, mode='w|') if framing == 'tar' else None
+
+    def write(self, name: str, data: bytes):
+        """Writes one image named `name`, and flushes it so readers get it right away."""
+        if self._archive is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+        else:
+            if '\n' in name:
+                raise ValueError("Frame names cannot contain line breaks.")
+            self.outfile.write(f"{len(data)} {name}\n".encode('utf-8'))
+            self.outfile.write(data)
+        self.outfile.flush()
+
+    def close(self):
+        """Ends the stream (writes the end of the tar archive)."""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        self.outfile.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def output_name(name: str, extension: str) -> str:
+    """Returns `name` with its extension replaced by `extension` (names use '/' like tar members)."""
+    return f"{posixpath.splitext(name)[0]}.{extension}"
+
+def process_stream(pipeline: Pipeline, images, workers: int = None, remote_workers: int = 4, pools: tuple = None):
+    """
+    Runs `pipeline` over in-memory images in parallel, like batch.run_batch
+    but without writing files: images come in as bytes (or paths) and results
+    come out as bytes (see Pipeline.run_to_bytes), in input order.
+
+    CPU-bound segments run in the process pool and remove.bg calls in the
+    thread pool. At most a few images per worker are held at once, so
+    `images` may be a lazy reader over an endless stream.
+
+    Args:
+        pipeline (Pipeline): The chain of operations to apply to every image.
+        images (Iterable[tuple[str, bytes | str]]): (name, data) pairs, e.g.
+                                                    from read_stream, where data
+                                                    may also be a file path.
+        workers (int, optional): Size of the CPU process pool. Defaults to the number of cores.
+        remote_workers (int, optional): Size of the remove.bg thread pool. Defaults to 4.
+        pools (tuple[Executor, Executor], optional): Existing (CPU, remote)
+                                                     pools to run on, left open
+                                                     afterwards. Defaults to None.
+
+    Yields:
+        tuple[str, str, bytes, Exception | None]: (name, output name, result,
+        error) for each image, in input order. On failure, the output name and
+        result are None.
+    """
+    workers = workers or default_jobs()
+    if workers < 1 or remote_workers < 1:
+        raise ValueError("The number of workers must be a positive integer.")
+
+    segments = pipeline.split()
+    max_in_flight = (workers + remote_workers) * 2
+    images = iter(images)
+
+    if pools is not None:
+        cpu_pool, remote_pool = pools
+        owned_pools = ()
+    else:
+        cpu_pool, remote_pool = create_pools(workers, remote_workers)
+        owned_pools = (cpu_pool, remote_pool)
+
+    with contextlib.ExitStack() as stack:
+        for pool in owned_pools:
+            stack.enter_context(pool)
+        # Images in input order: [name, segment index, result, error, done]
+        queue = collections.deque()
+        # future -> its queue entry
+        pending = {}
+
+        def submit(entry, index, source):
+            segment = segments[index]
+            pool = remote_pool if segment.is_remote else cpu_pool
+            entry[1] = index
+            if index == len(segments) - 1:
+                future = pool.submit(segment.run_to_bytes, source, entry[0])
+            else:
+                future = pool.submit(segment.process, source)
+            pending[future] = entry
+
+        def fill():
+            while len(queue) < max_in_flight:
+                image = next(images, None)
+                if image is None:
+                    return
+                entry = [image[0], 0, None, None, False]
+                queue.append(entry)
+                submit(entry, 0, image[1])
+
+        fill()
+        while queue:
+            while queue and queue[0][4]:
+                name, _, result, error, _ = queue.popleft()
+                if error is not None:
+                    yield name, None, None, error
+                else:
+                    data, extension = result
+                    yield name, output_name(name, extension), data, None
+                fill()
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    entry[3], entry[4] = e, True
+                    continue
+                if entry[1] + 1 < len(segments):
+                    submit(entry, entry[1] + 1, result)
+                else:
+                    entry[2], entry[4] = result, True
@@ -0,0 +1,77 @@
+import sys
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Decoded size above which images are processed tile by tile.
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# Working memory of one strip in tiled mode.
+STRIP_BYTES = 16 * 1024 * 1024
+
+def bytes_per_pixel(mode: str) -> int:
+    """Bytes Pillow uses per pixel for `mode` (3- and 4-band modes are stored in 32 bits)."""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+def decoded_size(img: Image.Image) -> int:
+    """
+    Estimates the memory a decoded image takes. Only the header is needed,
+    so this can be called on a freshly opened image before it is loaded.
+    """
+    return img.width * img.height * bytes_per_pixel(img.mode)
+
+def strip_rows(img: Image.Image, strip_bytes: int = STRIP_BYTES) -> int:
+    """Returns how many rows of `img` fit in a strip of `strip_bytes`."""
+    return max(1, strip_bytes // max(1, img.width * 4))
+
+def strip_boxes(size: tuple, rows: int):
+    """
+    Yields the (left, upper, right, lower) boxes of horizontal strips
+    covering an image of `size`, top to bottom.
+    """
+    width, height = size
+    for top in range(0, height, rows):
+        yield (0, top, width, min(top + rows, height))
+
+def map_strips(img: Image.Image, mode: str, func, rows: int) -> Image.Image:
+    """
+    Builds a new image of `mode` by applying `func` to each strip of `img`.
+
+    Only one strip's worth of temporary images exists at a time, on top of
+    the source and the result.
+
+    Args:
+        img (Image.Image): The source image.
+        mode (str): The mode of the result.
+        func (Callable[[Image.Image], Image.Image]): Maps a strip to a strip of `mode`.
+        rows (int): Height of each strip.
+
+    Returns:
+        Image.Image: The assembled result.
+    """
+    result = Image.new(mode, img.size)
+    for box in strip_boxes(img.size, rows):
+        result.paste(func(img.crop(box)), box[:2])
+    return result
+
+def peak_memory_mb() -> float:
+    """
+    Returns the peak resident memory in MB of this process or of its largest
+    finished child process (e.g., a worker pool that was shut down),
+    whichever is larger. Returns None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
@@ -0,0 +1,397 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+from . import tiles
+
+# Directions along pixel edges, clockwise in image coordinates (y points down).
+_EAST, _SOUTH, _WEST, _NORTH = 0, 1, 2, 3
+_STEPS = {_EAST: (1, 0), _SOUTH: (0, 1), _WEST: (-1, 0), _NORTH: (0, -1)}
+
+def bitmap_from_image(img: Image.Image, threshold: int = 128, strip_rows: int = None) -> np.ndarray:
+    """
+    Thresholds an image into a boolean bitmap where True marks dark (traced) pixels.
+
+    Transparent areas are treated as white background.
+
+    Args:
+        img (Image.Image): The source image.
+        threshold (int, optional): Luminance below which a pixel is traced. Defaults to 128.
+        strip_rows (int, optional): Threshold this many rows at a time (tiled
+                                    mode), so no full-size grayscale or
+                                    composited copy is made. Defaults to None.
+
+    Returns:
+        np.ndarray: A (height, width) boolean array.
+    """
+    if strip_rows:
+        bitmap = np.empty((img.height, img.width), dtype=bool)
+        for left, top, right, bottom in tiles.strip_boxes(img.size, strip_rows):
+            bitmap[top:bottom] = bitmap_from_image(img.crop((left, top, right, bottom)), threshold)
+        return bitmap
+
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, rgba)
+    return np.asarray(img.convert('L')) < threshold
+
+def _boundary_edges(bitmap: np.ndarray, strip_rows: int = 1024) -> dict:
+    """
+    Finds every pixel edge between a traced and an untraced pixel.
+
+    Edges are oriented clockwise around traced pixels, so outlines come out
+    clockwise and holes counter-clockwise. The bitmap is scanned in strips of
+    `strip_rows` rows so the temporary masks stay small on large images.
+
+    Returns:
+        dict[tuple[int, int], list[int]]: Outgoing edge directions per (x, y) vertex.
+    """
+    height = bitmap.shape[0]
+    edges = {}
+    for top in range(0, height, strip_rows):
+        bottom = min(top + strip_rows, height)
+        # The strip plus one row of context above and below, padded with background
+        padded = np.pad(bitmap[max(top - 1, 0):bottom + 1], ((1 if top == 0 else 0, 1 if bottom == height else 0), (1, 1)))
+        core = padded[1:-1, 1:-1]
+        sides = [
+            (_EAST, core & ~padded[:-2, 1:-1], (0, 0)),    # top side, from the top-left corner
+            (_SOUTH, core & ~padded[1:-1, 2:], (1, 0)),    # right side, from the top-right corner
+            (_WEST, core & ~padded[2:, 1:-1], (1, 1)),     # bottom side, from the bottom-right corner
+            (_NORTH, core & ~padded[1:-1, :-2], (0, 1)),   # left side, from the bottom-left corner
+        ]
+
+        for direction, mask, (dx, dy) in sides:
+            ys, xs = np.nonzero(mask)
+            for x, y in zip((xs + dx).tolist(), (ys + top + dy).tolist()):
+                edges.setdefault((x, y), []).append(direction)
+    return edges
+
+def _trace_outlines(bitmap: np.ndarray) -> list:
+    """
+    Links boundary edges into closed outlines.
+
+    Where two traced pixels touch only at a corner, the outline turns left,
+    which keeps diagonal strokes connected.
+
+    Returns:
+        list[np.ndarray]: One (n, 2) array of corner points per outline.
+    """
+    edges = _boundary_edges(bitmap)
+    outlines = []
+
+    while edges:
+        start = next(iter(edges))
+        start_direction = edges[start].pop()
+        if not edges[start]:
+            del edges[start]
+
+        vertex, direction = start, start_direction
+        points = [start]
+        while True:
+            dx, dy = _STEPS[direction]
+            vertex = (vertex[0] + dx, vertex[1] + dy)
+            outgoing = edges.get(vertex, [])
+            # Back at the start, the first edge competes with any other way out
+            candidates = outgoing + [start_direction] if vertex == start else outgoing
+            for candidate in ((direction + 3) % 4, direction, (direction + 1) % 4):
+                if candidate in candidates:
+                    break
+            if vertex == start and candidate == start_direction and start_direction not in outgoing:
+                break
+
+            outgoing.remove(candidate)
+            if not outgoing:
+                del edges[vertex]
+            if candidate != direction:
+                points.append(vertex)
+            direction = candidate
+
+        outlines.append(np.array(points, dtype=float))
+    return outlines
+
+def _area(points: np.ndarray) -> float:
+    """Signed area of a closed polygon (shoelace formula)."""
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def _simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of an open polyline, keeping both ends."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = end - start
+        length = np.hypot(*segment)
+        inner = points[first + 1:last]
+        if length == 0:
+            distances = np.hypot(*(inner - start).T)
+        else:
+            distances = np.abs(segment[0] * (inner[:, 1] - start[1]) - segment[1] * (inner[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+def _simplify_closed(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of a closed polygon."""
+    if len(points) <= 4:
+        return points
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    first_half = _simplify(points[:far + 1], tolerance)
+    second_half = _simplify(np.vstack([points[far:], points[:1]]), tolerance)
+    return np.vstack([first_half[:-1], second_half[:-1]])
+
+def _path_data(points: np.ndarray, corner_angle: float) -> str:
+    """
+    Fits a closed outline with quadratic Bezier curves.
+
+    Each vertex becomes the control point of a curve between the midpoints
+    of its two segments, except where the outline turns by more than
+    `corner_angle` degrees, where it is kept as a sharp corner.
+    """
+    previous = np.roll(points, 1, axis=0)
+    following = np.roll(points, -1, axis=0)
+    midpoints = (points + following) / 2
+
+    incoming = points - previous
+    outgoing = following - points
+    cosine = np.einsum('ij,ij->i', incoming, outgoing) / (
+        np.hypot(*incoming.T) * np.hypot(*outgoing.T) + 1e-12
+    )
+    corners = cosine < np.cos(np.radians(corner_angle))
+
+    def fmt(point):
+        return f"{point[0]:.2f},{point[1]:.2f}".replace('.00', '')
+
+    commands = [f"M{fmt(midpoints[-1])}"]
+    for point, midpoint, corner in zip(points, midpoints, corners):
+        if corner:
+            commands.append(f"L{fmt(point)}L{fmt(midpoint)}")
+        else:
+            commands.append(f"Q{fmt(point)} {fmt(midpoint)}")
+    commands.append("Z")
+    return "".join(commands)
+
+def trace_bitmap(bitmap: np.ndarray, turd_size: int = 2, tolerance: float = 1.0, corner_angle: float = 60.0) -> str:
+    """
+    Traces the True pixels of a bitmap into SVG path data.
+
+    Outlines are found along pixel edges, outlines enclosing `turd_size`
+    pixels or fewer are dropped (like Potrace's --turdsize), the pixel
+    staircase is simplified into polygons, and those are fitted with curves.
+
+    Args:
+        bitmap (np.ndarray): A (height, width) boolean array.
+        turd_size (int, optional): Maximum area of speckles to drop. Defaults to 2.
+        tolerance (float, optional): Simplification tolerance in pixels. Defaults to 1.0.
+        corner_angle (float, optional): Turns sharper than this (degrees) stay corners. Defaults to 60.
+
+    Returns:
+        str: Path data to be used with fill-rule="evenodd". Empty if nothing was traced.
+    """
+    paths = []
+    for outline in _trace_outlines(np.asarray(bitmap, dtype=bool)):
+        if abs(_area(outline)) <= turd_size:
+            continue
+        simplified = _simplify_closed(outline, tolerance)
+        if len(simplified) < 3:
+            simplified = outline
+        paths.append(_path_data(simplified, corner_angle))
+    return "".join(paths)
+
+def _nearest_center(pixels: np.ndarray, centers: np.ndarray, chunk_size: int = 1 << 20) -> np.ndarray:
+    """Index of the closest center for every pixel, computed in chunks to bound memory."""
+    center_norms = (centers ** 2).sum(axis=1)
+    labels = np.empty(len(pixels), dtype=np.int16)
+    for start in range(0, len(pixels), chunk_size):
+        chunk = pixels[start:start + chunk_size]
+        # |p - c|^2 without the |p|^2 term, which is the same for every center
+        distances = center_norms - 2 * chunk @ centers.T
+        labels[start:start + chunk_size] = np.argmin(distances, axis=1)
+    return labels
+
+def _strip_pixels(img: Image.Image, box: tuple):
+    """Returns the opaque mask and the opaque RGB pixels (float32) of one strip."""
+    rgba = np.asarray(img.crop(box).convert('RGBA'))
+    opaque = rgba[..., 3] >= 128
+    return opaque, rgba[..., :3][opaque].astype(np.float32)
+
+def quantize(
+    img: Image.Image,
+    colors: int = 8,
+    iterations: int = 10,
+    sample_size: int = 65536,
+    seed: int = 0,
+    strip_rows: int = None
+):
+    """
+    Reduces an image to at most `colors` colors with k-means.
+
+    Centers are seeded with k-means++ and refined on a random sample of
+    pixels, then every pixel is assigned to its nearest center in one
+    vectorized pass. Transparent pixels (alpha below 128) are left out.
+
+    Args:
+        img (Image.Image): The source image.
+        colors (int, optional): Maximum number of colors. Defaults to 8.
+        iterations (int, optional): k-means refinement rounds. Defaults to 10.
+        sample_size (int, optional): Pixels used to fit the centers. Defaults to 65536.
+        seed (int, optional): Random seed, so results are reproducible. Defaults to 0.
+        strip_rows (int, optional): Read pixels this many rows at a time (tiled
+                                    mode). The result is the same. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A (height, width) array of palette
+        indices (-1 for transparent pixels) and a (n, 3) uint8 RGB palette
+        sorted by pixel count, most common first.
+
+    Raises:
+        ValueError: If `colors` is less than 1.
+    """
+    if colors < 1:
+        raise ValueError("The number of colors must be a positive integer.")
+
+    boxes = list(tiles.strip_boxes(img.size, strip_rows or max(img.height, 1)))
+    labels = np.full((img.height, img.width), -1, dtype=np.int16)
+    # Strips are read in three passes (counting, sampling, labelling). Without
+    # strip_rows the whole image is one strip: convert it once, not per pass.
+    converted = {}
+
+    def read(box):
+        if strip_rows is not None:
+            return _strip_pixels(img, box)
+        if box not in converted:
+            converted[box] = _strip_pixels(img, box)
+        return converted[box]
+
+    offsets = [0]
+    for box in boxes:
+        offsets.append(offsets[-1] + int(read(box)[0].sum()))
+    total = offsets[-1]
+    if total == 0:
+        return labels, np.zeros((0, 3), dtype=np.uint8)
+
+    # Gather a random sample of opaque pixels, strip by strip
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(total, min(sample_size, total), replace=False)
+    sample = np.empty((len(chosen), 3), dtype=np.float32)
+    for box, start, end in zip(boxes, offsets, offsets[1:]):
+        in_strip = np.nonzero((chosen >= start) & (chosen < end))[0]
+        if len(in_strip):
+            sample[in_strip] = read(box)[1][chosen[in_strip] - start]
+
+    # k-means++ seeding: each new center is drawn far from the existing ones
+    centers = [sample[rng.integers(len(sample))]]
+    distances = ((sample - centers[0]) ** 2).sum(axis=1)
+    while len(centers) < colors and distances.sum() > 0:
+        center = sample[rng.choice(len(sample), p=distances / distances.sum())]
+        centers.append(center)
+        distances = np.minimum(distances, ((sample - center) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        assigned = _nearest_center(sample, centers)
+        counts = np.bincount(assigned, minlength=len(centers))
+        sums = np.stack([np.bincount(assigned, weights=sample[:, channel], minlength=len(centers)) for channel in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(updated, centers, atol=0.5):
+            break
+        centers = updated
+
+    counts = np.zeros(len(centers), dtype=np.int64)
+    for box in boxes:
+        opaque, pixels = read(box)
+        assigned = _nearest_center(pixels, centers)
+        labels[box[1]:box[3]][opaque] = assigned
+        counts += np.bincount(assigned, minlength=len(centers))
+
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    rank = np.full(len(centers) + 1, -1, dtype=np.int16)  # labels of -1 map to the last entry
+    rank[order] = np.arange(len(order))
+    labels = rank[labels]
+
+    palette = np.clip(np.rint(centers[order]), 0, 255).astype(np.uint8)
+    return labels, palette
+
+def stacked_masks(labels: np.ndarray, count: int) -> np.ndarray:
+    """
+    Builds one bitmap per palette color for stacked painting.
+
+    Mask `i` covers every pixel of color `i` or of a later color, so each
+    layer is painted over the previous ones without gaps between adjacent
+    shapes of different colors.
+
+    Returns:
+        np.ndarray: A (count, height, width) boolean array.
+    """
+    return labels[None, :, :] >= np.arange(count, dtype=labels.dtype)[:, None, None]
+
+def trace_colors(
+    img: Image.Image,
+    colors: int = 8,
+    turd_size: int = 2,
+    tolerance: float = 1.0,
+    corner_angle: float = 60.0,
+    workers: int = 1,
+    strip_rows: int = None
+) -> list:
+    """
+    Traces an image into stacked color layers.
+
+    Args:
+        img (Image.Image): The source image.
+        colors (int, optional): Maximum number of colors. Defaults to 8.
+        turd_size (int, optional): Maximum area of speckles to drop. Defaults to 2.
+        tolerance (float, optional): Simplification tolerance in pixels. Defaults to 1.0.
+        corner_angle (float, optional): Turns sharper than this (degrees) stay corners. Defaults to 60.
+        workers (int, optional): Processes tracing layers at once. Defaults to 1.
+        strip_rows (int, optional): Read pixels this many rows at a time and
+                                    build one mask at a time (tiled mode).
+                                    Defaults to None.
+
+    Returns:
+        list[tuple[str, str]]: (fill color, path data) pairs, in painting order.
+    """
+    labels, palette = quantize(img, colors, strip_rows=strip_rows)
+    options = [turd_size] * len(palette), [tolerance] * len(palette), [corner_angle] * len(palette)
+
+    if workers > 1 and len(palette) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(palette))) as pool:
+            paths = list(pool.map(trace_bitmap, stacked_masks(labels, len(palette)), *options))
+    elif strip_rows:
+        paths = list(map(trace_bitmap, (labels >= index for index in range(len(palette))), *options))
+    else:
+        paths = list(map(trace_bitmap, stacked_masks(labels, len(palette)), *options))
+
+    return [('#%02x%02x%02x' % tuple(color), data) for color, data in zip(palette.tolist(), paths)]
+
+def svg_document(width: int, height: int, layers: list) -> str:
+    """
+    Builds an SVG document from traced layers.
+
+    Args:
+        width (int): Canvas width in pixels.
+        height (int): Canvas height in pixels.
+        layers (list[tuple[str, str]]): (fill color, path data) pairs, painted in order.
+
+    Returns:
+        str: The SVG document.
+    """
+    paths = "".join(
+        f'<path fill="{color}" fill-rule="evenodd" d="{data}"/>\n'
+        for color, data in layers if data
+    )
+    return (
+        '<?xml version="1.0" standalone="no"?>\n'
+        f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">\n'
+        f'{paths}</svg>\n'
+    )
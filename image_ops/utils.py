@@ -1,4 +1,7 @@
+import contextlib
 import os
+import shutil
+import tempfile
 
 def get_image_name(image_path: str) -> str:
     """
@@ -29,3 +32,96 @@ def get_extension(image_path: str) -> str:
         str: The file extension.
     """
     return os.path.splitext(image_path)[1][1:].lower()
+
+_file_mode = None
+
+def default_file_mode() -> int:
+    """Returns the permissions of a newly created file: 0o666 less the process umask."""
+    global _file_mode
+    if _file_mode is None:
+        umask = os.umask(0)
+        os.umask(umask)
+        _file_mode = 0o666 & ~umask
+    return _file_mode
+
+@contextlib.contextmanager
+def atomic_path(path: str):
+    """
+    Yields a temporary path next to `path` to write to, and renames it to
+    `path` when the block succeeds (or deletes it when the block fails), so
+    `path` never holds a partly written file.
+
+    Example:
+        with atomic_path(output_path) as temp_path:
+            img.save(temp_path, format='PNG')
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.part')
+    os.close(fd)
+    try:
+        os.chmod(temp_path, default_file_mode())  # mkstemp creates files readable by their owner only
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def place_copy(source_path: str, output_path: str, link: bool = False) -> str:
+    """
+    Puts an unchanged copy of a file at `output_path`, replacing what is there
+    atomically (see atomic_path).
+
+    Args:
+        source_path (str): The file to copy.
+        output_path (str): Where the copy goes. Nothing is done if it is the source itself.
+        link (bool, optional): Hard-link instead of copying when the filesystem
+                               allows it (no data is written; both paths then
+                               share the same content). Defaults to False.
+
+    Returns:
+        str: The output path.
+    """
+    if os.path.exists(output_path) and os.path.samefile(source_path, output_path):
+        return output_path
+    with atomic_path(output_path) as temp_path:
+        if link:
+            try:
+                os.remove(temp_path)
+                os.link(source_path, temp_path)
+                return output_path
+            except OSError:
+                pass  # Another filesystem, or no hard links: copy instead
+        shutil.copy(source_path, temp_path)
+    return output_path
+
+# Linux ioctl asking the filesystem to share a file's blocks with another (btrfs, XFS, ...)
+_FICLONE = 0x40049409
+
+def clone_file(source_path: str, output_path: str) -> str:
+    """
+    Puts a copy of a file at `output_path` as a reflink when the filesystem
+    supports it: both files share the same blocks copy-on-write, so nothing is
+    written, yet each can change without affecting the other. Elsewhere, the
+    file is copied.
+
+    Args:
+        source_path (str): The file to copy.
+        output_path (str): Where the copy goes. Nothing is done if it is the source itself.
+
+    Returns:
+        str: The output path.
+    """
+    if os.path.exists(output_path) and os.path.samefile(source_path, output_path):
+        return output_path
+    with atomic_path(output_path) as temp_path:
+        try:
+            import fcntl
+            with open(source_path, 'rb') as source, open(temp_path, 'wb') as output:
+                fcntl.ioctl(output.fileno(), _FICLONE, source.fileno())
+            shutil.copymode(source_path, temp_path)
+            return output_path
+        except (ImportError, OSError):
+            pass  # Not Linux, or no reflinks on this filesystem: copy instead
+        shutil.copy(source_path, temp_path)
+    return output_path
@@ -1,18 +1,189 @@
+import functools
+import io
 import os
+import re
+import shutil
 import subprocess
 from PIL import Image
+from . import instrument
+
+# Tracing backends: 'native' traces in-process with NumPy, 'potrace' runs the Potrace executable.
+BACKENDS = ('native', 'potrace')
+
+_HEX_COLOR = re.compile(r'^#(?:[0-9a-fA-F]{3}){1,2}$')
+
+@functools.lru_cache(maxsize=None)
+def _locate_potrace() -> tuple:
+    """
+    Locates the Potrace executable for the current OS.
+
+    POTRACE_PATH takes precedence, then the project's bin directory, then the
+    system's PATH. The lookup runs once per process and is cached, including
+    when Potrace is missing, so a batch does not search again for every image.
+
+    Returns:
+        tuple[str | None, str | None]: The executable's path and None, or
+        None and why it was not found.
+    """
+    configured = os.getenv("POTRACE_PATH")
+    if configured:
+        if not os.access(configured, os.X_OK):
+            return None, f"POTRACE_PATH is set to '{configured}', which is not an executable file."
+        return configured, None
+
+    potrace_executable = "potrace.exe" if os.name == 'nt' else "potrace"
+
+    # Check for the executable in the project's bin directory first
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    local_potrace_path = os.path.join(project_root, "bin", potrace_executable)
+
+    if os.access(local_potrace_path, os.X_OK):
+        return local_potrace_path, None
+    # If not found locally, check the system's PATH
+    system_potrace_path = shutil.which(potrace_executable)
+    if system_potrace_path is None:
+        return None, f"'{potrace_executable}' not found in the project's 'bin' directory or in the system's PATH. Please install Potrace."
+    return system_potrace_path, None
+
+def _find_potrace() -> str:
+    """
+    Returns the path of the Potrace executable (see _locate_potrace).
+
+    Raises:
+        FileNotFoundError: If Potrace cannot be found.
+    """
+    path, error = _locate_potrace()
+    if path is None:
+        raise FileNotFoundError(error)
+    return path
+
+def _to_pbm(img: Image.Image) -> bytes:
+    """Encodes an image as a 1-bit PBM bitmap, the format Potrace reads natively."""
+    buffer = io.BytesIO()
+    img.convert('1').save(buffer, format='PPM')
+    return buffer.getvalue()
+
+def _write(output, data: bytes):
+    """Writes the SVG document to `output`: a file path, or a writable binary stream."""
+    if hasattr(output, 'write'):
+        output.write(data)
+    else:
+        with open(output, 'wb') as f:
+            f.write(data)
+
+def _vectorize_potrace(img: Image.Image, output_path: str, turd_size: int, color: str) -> str:
+    """
+    Traces an image with Potrace, streaming the bitmap over stdin and
+    reading the SVG from stdout so no temporary files are written.
+    """
+    command = [
+        _find_potrace(),
+        "-",
+        "--svg",
+        "-o", "-",
+        "--turdsize", str(turd_size),
+        "--color", color
+    ]
+    try:
+        with instrument.stage('convert'):
+            bitmap = _to_pbm(img)
+        with instrument.stage('potrace'):
+            result = subprocess.run(command, input=bitmap, check=True, capture_output=True)
+        with instrument.stage('encode'):
+            _write(output_path, result.stdout)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        error_message = e.stderr.decode(errors='replace').strip()
+        raise IOError(f"Potrace failed with error: {error_message}")
+    except FileNotFoundError:
+        raise  # Potrace (or the output directory) is missing: not a tracing error
+    except Exception as e:
+        raise IOError(f"An unexpected error occurred during vectorization: {e}")
+
+def _vectorize_native(
+    img: Image.Image, output_path: str, turd_size: int, color: str, colors: int, workers: int, strip_rows: int
+) -> str:
+    """Traces an image in-process and writes the SVG file."""
+    from . import trace
+
+    try:
+        with instrument.stage('trace'):
+            if colors:
+                layers = trace.trace_colors(img, colors, turd_size=turd_size, workers=workers, strip_rows=strip_rows)
+            else:
+                bitmap = trace.bitmap_from_image(img, strip_rows=strip_rows)
+                layers = [(color, trace.trace_bitmap(bitmap, turd_size=turd_size))]
+        with instrument.stage('encode'):
+            _write(output_path, trace.svg_document(img.width, img.height, layers).encode('utf-8'))
+        return output_path
+    except Exception as e:
+        raise IOError(f"An unexpected error occurred during vectorization: {e}")
+
+def vectorize(
+    img: Image.Image,
+    output_path: str,
+    turd_size: int = 2,
+    color: str = '#000000',
+    backend: str = 'native',
+    colors: int = None,
+    workers: int = 1,
+    strip_rows: int = None
+) -> str:
+    """
+    Traces an in-memory image into an SVG vector file.
+
+    By default the image is thresholded and traced as a single `color`
+    layer. With `colors`, it is quantized to that many colors instead and
+    each color is traced into its own layer, stacked in one SVG.
+
+    Args:
+        img (Image.Image): The decoded source image.
+        output_path (str | BinaryIO): The exact path to save the SVG file, or
+                                      a writable binary stream to write it to.
+        turd_size (int, optional): Parameter to control noise removal. Defaults to 2.
+        color (str, optional): Hex code for the vector color. Defaults to '#000000'.
+        backend (str, optional): 'native' to trace in-process, or 'potrace' to
+                                 run the Potrace executable. Defaults to 'native'.
+        colors (int, optional): Number of colors to trace, for a multi-color
+                                SVG ('native' backend only). Defaults to None.
+        workers (int, optional): Processes tracing color layers at once. Defaults to 1.
+        strip_rows (int, optional): Threshold this many rows at a time (tiled
+                                    mode, 'native' backend). Defaults to None.
+
+    Returns:
+        str | BinaryIO: `output_path`, where the SVG was written.
+
+    Raises:
+        ValueError: If the color format, the backend or `colors` is invalid.
+        FileNotFoundError: If the 'potrace' backend is used and Potrace cannot be found.
+        IOError: If tracing fails or if there's an issue with file operations.
+    """
+    if not _HEX_COLOR.match(color):
+        raise ValueError(f"Invalid color '{color}'. Use a hex code such as '#000000'.")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vectorization backend '{backend}'. Choose from: {', '.join(BACKENDS)}.")
+    if colors is not None and (colors < 1 or backend != 'native'):
+        raise ValueError("Color tracing needs a positive number of colors and the 'native' backend.")
+
+    if backend == 'native':
+        return _vectorize_native(img, output_path, turd_size, color, colors, workers, strip_rows)
+
+    return _vectorize_potrace(img, output_path, turd_size, color)
 
 def vectorize_image(
     input_path: str, 
     custom_output_path: str = None, 
     turd_size: int = 2, 
-    color: str = '#000000'
+    color: str = '#000000',
+    backend: str = 'native',
+    colors: int = None
 ) -> str:
     """
-    Converts a raster image (PNG, JPG, etc.) into an SVG vector file using Potrace.
+    Converts a raster image (PNG, JPG, etc.) into an SVG vector file.
 
-    This function requires 'potrace.exe' to be available in the system's PATH
-    or in the project's root directory.
+    The 'potrace' backend requires Potrace ('potrace.exe' on Windows) to be
+    available in the system's PATH, in the project's bin directory, or at
+    the path given by the POTRACE_PATH environment variable.
 
     Args:
         input_path (str): Path to the source raster image.
@@ -20,26 +191,19 @@ def vectorize_image(
                                             If None, a path is generated automatically.
         turd_size (int, optional): Parameter to control noise removal. Defaults to 2.
         color (str, optional): Hex code for the vector color. Defaults to '#000000'.
+        backend (str, optional): 'native' or 'potrace'. Defaults to 'native'.
+        colors (int, optional): Number of colors for a multi-color SVG. Defaults to None.
 
     Returns:
         str: The path where the converted SVG image was saved.
 
     Raises:
-        FileNotFoundError: If the input file or 'potrace.exe' cannot be found.
-        ValueError: If the color format is invalid.
-        IOError: If Potrace fails or if there's an issue with file operations.
+        FileNotFoundError: If the input file or Potrace cannot be found.
+        ValueError: If the color format or the backend is invalid.
+        IOError: If tracing fails or if there's an issue with file operations.
     """
-    potrace_executable = "potrace.exe"
-    
-    # Check for potrace.exe in the project's bin directory first
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    local_potrace_path = os.path.join(project_root, "bin", potrace_executable)
-
-    if os.path.exists(local_potrace_path):
-        potrace_executable = local_potrace_path
-    # If not found locally, check the system's PATH
-    elif not any(os.access(os.path.join(path, potrace_executable), os.X_OK) for path in os.environ["PATH"].split(os.pathsep)):
-        raise FileNotFoundError(f"'{potrace_executable}' not found in the project's 'bin' directory or in the system's PATH. Please install Potrace.")
+    if backend == 'potrace':
+        _find_potrace()
 
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"The input file '{input_path}' was not found.")
@@ -52,33 +216,10 @@ def vectorize_image(
         source_dir = os.path.dirname(input_path)
         output_path = os.path.join(source_dir, f"{base_name}.svg")
 
-    # Create a temporary BMP file for Potrace
-    temp_bmp_path = output_path + ".temp.bmp"
-
     try:
-        # Convert source image to a 1-bit BMP file
         with Image.open(input_path) as img:
-            img.convert('1').save(temp_bmp_path)
-
-        # Build and run the Potrace command
-        command = [
-            potrace_executable,
-            temp_bmp_path,
-            "--svg",
-            "-o", output_path,
-            "--turdsize", str(turd_size),
-            "--color", color
-        ]
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        
-        return output_path
-
-    except subprocess.CalledProcessError as e:
-        error_message = e.stderr.strip()
-        raise IOError(f"Potrace failed with error: {error_message}")
+            return vectorize(img, output_path, turd_size=turd_size, color=color, backend=backend, colors=colors)
+    except (ValueError, IOError):
+        raise
     except Exception as e:
         raise IOError(f"An unexpected error occurred during vectorization: {e}")
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_bmp_path):
-            os.remove(temp_bmp_path)
@@ -0,0 +1,119 @@
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .processor import BatchProcessor, build_pipeline
+
+def handle_request(processor: BatchProcessor, request: dict, api_key: str = None, memory_limit: int = None) -> dict:
+    """
+    Processes one job of the worker protocol.
+
+    A request is a JSON object:
+        {"id": 1, "input": "logo.png", "output": "logo.jpg",
+         "operations": {"resize": [256, 256], "format": "jpg"}}
+    "output" is optional (defaults to next to the input, like the CLI) and
+    "operations" uses the keys of processor.build_pipeline. "remove_bg" may be
+    `true` to use the worker's API key.
+
+    Returns:
+        dict: {"id", "ok": true, "outputs", "seconds"} on success, or
+              {"id", "ok": false, "error"} on failure.
+    """
+    request_id = request.get('id') if isinstance(request, dict) else None
+    start = time.perf_counter()
+    try:
+        if not isinstance(request, dict) or not request.get('input'):
+            raise ValueError("A request needs an 'input' image path.")
+
+        operations = dict(request.get('operations') or {})
+        if operations.get('remove_bg') is True:
+            operations['remove_bg'] = {'api_key': api_key}
+        options = {} if memory_limit is None else {'memory_limit': memory_limit}
+        pipeline = build_pipeline(operations, **options)
+
+        outputs = processor.process(pipeline, request['input'], request.get('output'))
+        return {'id': request_id, 'ok': True, 'outputs': outputs, 'seconds': round(time.perf_counter() - start, 6)}
+    except Exception as e:
+        return {'id': request_id, 'ok': False, 'error': str(e)}
+
+def _parse(line: str):
+    """Decodes a request line. Invalid JSON is returned as-is and rejected by handle_request."""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line
+
+def serve_stream(processor: BatchProcessor, infile, outfile, concurrency: int = None, **options):
+    """
+    Serves JSON-lines requests read from `infile` (e.g., stdin), writing one
+    JSON-lines response per request to `outfile` as each job finishes, so
+    responses may come out of order (match them by "id"). Returns at end of input.
+
+    Args:
+        processor (BatchProcessor): Runs the jobs.
+        infile (TextIO): Where requests are read from.
+        outfile (TextIO): Where responses are written to.
+        concurrency (int, optional): Jobs handled at once. Defaults to the
+                                     processor's CPU and remote workers combined.
+        **options: Passed to handle_request (api_key, memory_limit).
+    """
+    concurrency = concurrency or processor.workers + processor.remote_workers
+    write_lock = threading.Lock()
+
+    def respond(request):
+        response = handle_request(processor, request, **options)
+        with write_lock:
+            outfile.write(json.dumps(response) + "\n")
+            outfile.flush()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = threading.BoundedSemaphore(concurrency * 2)
+        for line in infile:
+            if not line.strip():
+                continue
+            in_flight.acquire()
+            future = pool.submit(respond, _parse(line))
+            future.add_done_callback(lambda _: in_flight.release())
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection: requests and responses in order, one JSON line each."""
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode('utf-8').strip()
+            if not line:
+                continue
+            response = handle_request(self.server.processor, _parse(line), **self.server.options)
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+def create_server(processor: BatchProcessor, address: str, **options) -> socketserver.BaseServer:
+    """
+    Creates a socket server for the worker protocol. Each connection is
+    served on its own thread, so clients wanting several jobs at once open
+    several connections.
+
+    Args:
+        processor (BatchProcessor): Runs the jobs.
+        address (str): 'HOST:PORT' for TCP, or a file path for a Unix socket.
+        **options: Passed to handle_request (api_key, memory_limit).
+
+    Returns:
+        socketserver.BaseServer: The server; call `serve_forever` on it.
+    """
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        server = socketserver.ThreadingTCPServer((host, int(port)), _RequestHandler)
+    else:
+        if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+            raise ValueError("Unix sockets are not available on this platform; use HOST:PORT.")
+        if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.remove(address)  # Left behind by a previous worker
+        server = socketserver.ThreadingUnixStreamServer(address, _RequestHandler)
+    server.daemon_threads = True
+    server.processor = processor
+    server.options = options
+    return server
@@ -0,0 +1,189 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from . import instrument
+from .utils import default_file_mode
+
+# How hard OutputWriter works to keep written files across a power loss:
+#   'none': no fsync. Files still appear atomically (whole or not at all) if the process dies.
+#   'batch': files are fsynced in groups, then renamed into place, then their directories fsynced once.
+#   'always': each file is fsynced, renamed and its directory fsynced before the next is reported.
+DURABILITY_LEVELS = ('none', 'batch', 'always')
+
+DEFAULT_MAX_PENDING_BYTES = 256 * 1024 * 1024
+
+def _fsync_directory(directory: str):
+    """Makes the renames in `directory` durable (a no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class OutputWriter:
+    """
+    Writes encoded results to disk on its own threads, so that slow storage
+    (e.g., a network filesystem) does not stall the processing workers.
+
+    Each file is written to a temporary name next to its final path and
+    renamed into place, so a crash never leaves a truncated output behind.
+    Writes are accepted until `max_pending_bytes` are waiting; `submit` then
+    blocks, so memory stays bounded when the disk is slower than the CPUs.
+
+    With 'batch' durability, files written while others are in progress are
+    committed together: fsynced, renamed, and each directory fsynced once.
+
+    Example:
+        with OutputWriter(workers=4, durability='batch') as writer:
+            future = writer.submit([("out/logo.png", data)])
+            future.result()  # Once the file is in place
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        durability: str = 'none',
+        max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+        batch_size: int = 64
+    ):
+        """
+        Args:
+            workers (int, optional): Files written concurrently. Defaults to 4.
+            durability (str, optional): One of DURABILITY_LEVELS. Defaults to 'none'.
+            max_pending_bytes (int, optional): Bytes accepted but not yet
+                                               written before `submit` blocks.
+                                               Defaults to 256 MB.
+            batch_size (int, optional): Most files committed together with
+                                        'batch' durability. Defaults to 64.
+
+        Raises:
+            ValueError: If a parameter is out of range.
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability '{durability}'. Choose from: {', '.join(DURABILITY_LEVELS)}.")
+        if workers < 1 or max_pending_bytes < 1 or batch_size < 1:
+            raise ValueError("The workers, pending bytes and batch size must be positive integers.")
+        self.durability = durability
+        self.max_pending_bytes = max_pending_bytes
+        self.batch_size = batch_size if durability == 'batch' else 1
+        self._mode = default_file_mode()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._condition = threading.Condition()
+        self._pending_bytes = 0
+        self._active = 0
+        # Written but not yet committed: (future, [(file descriptor, temporary path, final path)])
+        self._batch = []
+
+    def submit(self, files: list) -> Future:
+        """
+        Queues files for writing, blocking while too many bytes are waiting.
+
+        Args:
+            files (list[tuple[str, bytes]]): (path, data) pairs, committed together.
+
+        Returns:
+            Future: Resolves to the list of paths once every file is in place,
+            or to the error that prevented it. Each file is replaced
+            atomically, but not the files of a submission as a group: if
+            renaming one fails, those renamed before it stay in place and the
+            others are deleted.
+        """
+        size = sum(len(data) for _, data in files)
+        with self._condition:
+            # A single submission larger than the limit is let through alone
+            while self._pending_bytes and self._pending_bytes + size > self.max_pending_bytes:
+                self._condition.wait()
+            self._pending_bytes += size
+            self._active += 1
+        future = Future()
+        self._pool.submit(self._write, future, files, size)
+        return future
+
+    def _write(self, future: Future, files: list, size: int):
+        """Writer thread: writes the files to temporary names, then commits them when their batch is due."""
+        written = []
+        try:
+            for path, data in files:
+                directory = os.path.dirname(os.path.abspath(path))
+                fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.part')
+                written.append((fd, temp_path, path))
+                if hasattr(os, 'fchmod'):
+                    os.fchmod(fd, self._mode)  # mkstemp creates files readable by their owner only
+                with instrument.stage('write'):
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+            error = None
+        except BaseException as e:
+            error = e
+
+        with self._condition:
+            self._pending_bytes -= size
+            self._active -= 1
+            if error is None:
+                self._batch.append((future, written))
+            # Commit when the batch is full, or nothing else is being written to join it
+            due = len(self._batch) >= self.batch_size or self._active == 0
+            batch, self._batch = (self._batch, []) if due else ([], self._batch)
+            self._condition.notify_all()
+
+        if error is not None:
+            self._discard(written)
+            future.set_exception(error)
+        if batch:
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        """Fsyncs (as the durability asks), renames into place and fsyncs the directories of a batch."""
+        directories = set()
+        with instrument.stage('commit'):
+            for future, written in batch:
+                try:
+                    if self.durability != 'none':
+                        for fd, _, _ in written:
+                            os.fsync(fd)
+                except OSError as e:
+                    self._discard(written)
+                    future.set_exception(e)
+                    continue
+                for fd, _, _ in written:
+                    os.close(fd)
+                try:
+                    for _, temp_path, path in written:
+                        os.replace(temp_path, path)
+                        directories.add(os.path.dirname(os.path.abspath(path)))
+                except OSError as e:
+                    self._discard(written, close=False)
+                    future.set_exception(e)
+            if self.durability != 'none':
+                for directory in directories:
+                    _fsync_directory(directory)
+        instrument.count('files_committed', sum(len(written) for _, written in batch))
+        for future, written in batch:
+            if not future.done():
+                future.set_result([path for _, _, path in written])
+
+    @staticmethod
+    def _discard(written: list, close: bool = True):
+        """Closes (unless already closed) and deletes the temporary files of a failed submission."""
+        for fd, temp_path, _ in written:
+            if close:
+                os.close(fd)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def close(self):
+        """Waits for every queued file to be committed and stops the writer threads."""
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,26 +1,33 @@
 import argparse
+import contextlib
 import os
 import sys
-import glob
-import tempfile
-import shutil
-from dotenv import load_dotenv
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress
+import itertools
 
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from image_ops import convert, resize, rmbg, effects, vectorize
+# Only the standard library is imported above: rich, dotenv, Pillow and the
+# image_ops modules load after the arguments are parsed, so `--help` and
+# argument errors return without paying for them, and modules behind a flag
+# (requests for --remove-bg, NumPy for --to-svg) load only when it is used.
+# These mirror convert.CONVERSIONS, resize.RESAMPLE_FILTERS, resize.RESIZE_PRESETS,
+# convert.ENCODE_PRESETS, convert.AUTO_FORMATS, stream.FRAMINGS,
+# dedupe.FAN_OUT_MODES, writer.DURABILITY_LEVELS and tiles.DEFAULT_MEMORY_LIMIT,
+# which need Pillow to import.
+FORMAT_CHOICES = ['jpg', 'jpeg', 'png', 'ico', 'webp', 'avif']
+AUTO_FORMAT_CHOICES = ['avif', 'webp', 'jpg', 'png']
+RESAMPLE_CHOICES = ['nearest', 'box', 'bilinear', 'hamming', 'bicubic', 'lanczos']
+RESIZE_PRESET_CHOICES = ['fast', 'balanced', 'quality']
+ENCODE_PRESET_CHOICES = ['fast', 'balanced', 'smallest']
+STREAM_CHOICES = ['frames', 'tar']
+DEDUPE_CHOICES = ['copy', 'link', 'reflink']
+DURABILITY_CHOICES = ['none', 'batch', 'always']
+DEFAULT_MEMORY_LIMIT_MB = 512
 
-# Load environment variables
-load_dotenv()
-REMOVE_BG_API_KEY = os.getenv("REMOVE_BG_API_KEY")
-
-def main():
-    """Main function to parse arguments and call image operations."""
-    console = Console()
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the command-line parser."""
+    jobs = os.cpu_count() or 1
     parser = argparse.ArgumentParser(
         description="[bold cyan]PixelHorizon[/bold cyan]: A modern command-line tool for image manipulation.",
         epilog="Example: python main.py -i ./images -p '*.png' -g -o ./processed",
@@ -29,122 +36,599 @@ def main():
 
     # --- Input Arguments ---
     input_group = parser.add_argument_group('Input Options')
-    input_group.add_argument('image_paths', type=str, nargs='*', help='(Optional) One or more direct paths to image files.')
+    input_group.add_argument('image_paths', type=str, nargs='*', help="(Optional) One or more direct paths to image files, or '-' to read one image from stdin.")
     input_group.add_argument('-i', '--input-dir', type=str, help='Directory to search for images.')
     input_group.add_argument('-p', '--pattern', type=str, help='Pattern to match files (e.g., "*.png"). If not provided, matches all supported types.')
+    input_group.add_argument('-r', '--recursive', action='store_true', help='Also search subdirectories of --input-dir; outputs mirror the input tree.')
+    input_group.add_argument('--stream', type=str, choices=STREAM_CHOICES, metavar='FRAMING', help="Read many images from stdin and write the results to stdout, without temp files.\nFRAMING: 'frames' (each image is a '<size> <name>' line, then <size> bytes)\nor 'tar' (a tar archive).")
 
     # --- Operations ---
     op_group = parser.add_argument_group('Image Operations')
-    op_group.add_argument('-f', '--format', type=str, help='Convert image to a new format.', choices=['jpg', 'jpeg', 'png', 'ico'])
+    op_group.add_argument('-f', '--format', type=str, help='Convert image to a new format.', choices=FORMAT_CHOICES)
     op_group.add_argument('-rs', '--resize', type=int, nargs=2, metavar=('W', 'H'), help='Resize image.')
+    op_group.add_argument('--resample', type=str, choices=RESAMPLE_CHOICES, help="Resampling filter for --resize (default: set by the preset).")
+    op_group.add_argument('--resize-preset', type=str, default='balanced', choices=RESIZE_PRESET_CHOICES, help="Resize speed/quality trade-off (default: balanced).")
+    op_group.add_argument('--variants', type=str, nargs='+', metavar='SPEC', help="Write several sizes from one decode: N (fit in NxN), WxH (exact),\nor WxH:fit / WxH:fill. With -f ico, all sizes go in one .ico file.")
+    op_group.add_argument('--variant-name', type=str, default="{name}_{width}x{height}.{ext}", metavar='TEMPLATE', help="File name of each variant (default: {name}_{width}x{height}.{ext}).\n{width} and {height} are the requested box: fit variants may be smaller.")
     op_group.add_argument('-rb', '--remove-bg', action='store_true', help='Remove background.')
     op_group.add_argument('-g', '--grayscale', action='store_true', help='Apply grayscale filter.')
+    op_group.add_argument('--effects', type=str, nargs='+', metavar='EFFECT', help="Apply effects in order, fused into as few passes as possible:\ngrayscale, sepia, brightness:F, contrast:F, gamma:G, threshold[:T],\nblur[:R], sharpen[:A], matrix:M (9 or 12 comma-separated numbers),\nlut:FILE (256 or 768 values). With -g, grayscale runs first.")
     op_group.add_argument('--to-svg', action='store_true', help='Convert image to SVG.')
 
     # --- SVG Options ---
     svg_group = parser.add_argument_group('SVG Conversion Options')
     svg_group.add_argument('--svg-color', type=str, default='#000000', metavar='HEX', help="SVG vector color (default: #000000).")
     svg_group.add_argument('--svg-turd-size', type=int, default=2, metavar='N', help="Noise removal size for SVG (default: 2).")
+    svg_group.add_argument('--svg-colors', type=int, metavar='K', help="Trace in K colors (stacked layers) instead of one --svg-color layer.")
+    svg_group.add_argument('--svg-backend', choices=['native', 'potrace'], default='native', help="Tracer: 'native' runs in-process, 'potrace' uses the Potrace executable (default: native).")
 
     # --- Output Options ---
     out_group = parser.add_argument_group('Output Options')
-    out_group.add_argument('-o', '--output', type=str, help='Specify an output file path or directory.')
+    out_group.add_argument('-o', '--output', type=str, help="Specify an output file path or directory, or '-' to write a single image to stdout.")
+    out_group.add_argument('--encode-preset', type=str, choices=ENCODE_PRESET_CHOICES, help="Encoder speed/size trade-off at the same quality (default: balanced).\nWithout it, images left unchanged are copied rather than re-encoded.")
+    out_group.add_argument('--quality', type=int, metavar='Q', help="JPEG, WebP and AVIF quality from 0 to 100 (default: set by the preset).")
+    out_group.add_argument('--speed', type=int, metavar='S', help="Encoder speed from 0 (slowest, smallest) to 10 (fastest) for AVIF, WebP\nand PNG (default: set by the preset).")
+    out_group.add_argument('--lossless', action='store_true', help="Encode WebP losslessly.")
+    out_group.add_argument('--auto-format', type=str, nargs='*', choices=AUTO_FORMAT_CHOICES, metavar='FMT', help="Write each image in the smallest format meeting --min-psnr or --max-size,\nout of FMT (default: avif webp jpg png). The extension follows the format.")
+    out_group.add_argument('--min-psnr', type=float, metavar='DB', help="Quality budget of --auto-format, in dB of luma PSNR (default: 40\nunless --max-size is given).")
+    out_group.add_argument('--max-size', type=int, metavar='KB', help="Size budget of --auto-format, in KB.")
+    out_group.add_argument('--link', action='store_true', help="Hard-link outputs left unchanged (no operation, same format) to their source\ninstead of copying them.")
+    out_group.add_argument('--durability', type=str, default='none', choices=DURABILITY_CHOICES, help="Outputs are always written to a temporary name and renamed into place.\n'batch' also fsyncs them in groups before the rename, 'always' one by one,\nso they survive a power loss (default: none).")
+    out_group.add_argument('--incremental', action='store_true', help='Only process images added or changed since the last run into the output directory.')
+    out_group.add_argument('--resume', action='store_true', help="Continue an interrupted run: skip images it completed or that failed, and\nprocess the rest (including those in flight when it stopped).")
+    out_group.add_argument('--retry-failed', action='store_true', help="Process only the images that failed in the previous run.")
+    out_group.add_argument('--journal', type=str, metavar='JSONL', help="Where the run is journaled for --resume and --retry-failed (default:\n.pixelhorizon-journal.jsonl in the output directory; without one, runs are only journaled with\n--journal).")
+    out_group.add_argument('--prune', action='store_true', help='With --incremental, delete outputs whose source images were deleted.')
+
+    # --- Performance Options ---
+    perf_group = parser.add_argument_group('Performance Options')
+    perf_group.add_argument('-j', '--jobs', type=int, default=jobs, metavar='N', help=f"Number of images processed in parallel (default: {jobs}, the core count).")
+    perf_group.add_argument('--bg-jobs', type=int, default=4, metavar='N', help="Number of concurrent remove.bg requests (default: 4).")
+    perf_group.add_argument('--write-jobs', type=int, default=4, metavar='N', help="Number of outputs written to disk concurrently (default: 4).")
+    perf_group.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT_MB, metavar='MB', help=f"Decoded image size above which images are processed in tiles, bounding memory (default: {DEFAULT_MEMORY_LIMIT_MB}).")
+    perf_group.add_argument('--dedupe', type=str, default='reflink', choices=DEDUPE_CHOICES, help="How the result of an image is given to inputs with identical content, which\nare processed once: 'copy', 'link' (hard link) or 'reflink' (copy-on-write\nclone, or a copy where unsupported) (default: reflink).")
+    perf_group.add_argument('--no-dedupe', action='store_true', help="Process every input, even those with identical content.")
+    perf_group.add_argument('--bg-rpm', type=float, metavar='N', help="Maximum remove.bg requests per minute (default: unlimited).")
+
+    # --- Diagnostics Options ---
+    diag_group = parser.add_argument_group('Diagnostics Options')
+    diag_group.add_argument('--report', type=str, metavar='JSON', help="Write per-image and per-stage timings, byte counts and cache/retry counts to this file.")
+    diag_group.add_argument('--dry-run', action='store_true', help="Print the plan for each image (header info, steps left after skipping no-ops,\nhow it is produced, output path) and the estimated work, without writing anything.")
+    diag_group.add_argument('--near-duplicates', type=int, nargs='?', const=6, metavar='BITS', help="After the run, list groups of similar (not identical) inputs, whose\nperceptual hashes differ by at most BITS of 64 (default: 6).")
+    diag_group.add_argument('--profile', type=str, metavar='PROF', help="Profile the processing with cProfile and write the statistics to this file (view with snakeviz or flameprof).")
+
+    # --- Worker Options ---
+    worker_group = parser.add_argument_group('Worker Options')
+    worker_group.add_argument('--serve', action='store_true', help="Run as a long-lived worker reading JSON-lines jobs from stdin\nand writing one JSON-lines result per job to stdout.")
+    worker_group.add_argument('--socket', type=str, metavar='ADDRESS', help="Run as a long-lived worker on a Unix socket path or HOST:PORT.")
+
+    # --- Cache Options ---
+    cache_group = parser.add_argument_group('Cache Options')
+    cache_group.add_argument('--cache-dir', type=str, metavar='DIR', help="Reuse results of unchanged images from this directory across runs.")
+    cache_group.add_argument('--cache-size', type=int, default=1024, metavar='MB', help="Maximum cache size before least recently used entries are evicted (default: 1024).")
+    return parser
+
+def stream_images(args, operations: dict, console):
+    """
+    Processes images read from stdin and/or written to stdout, in memory:
+    one image with '-' as input or output, or a framed stream of many with
+    --stream. Exits with status 1 if any image fails.
+    """
+    from image_ops.processor import build_pipeline
+    from image_ops.utils import atomic_path
+
+    memory_limit = args.memory_limit * 1024 * 1024
+    failed = 0
+    if args.stream:
+        from image_ops.stream import StreamWriter, process_stream, read_stream
+        pipeline = build_pipeline(operations, memory_limit=memory_limit)
+        images = read_stream(sys.stdin.buffer, args.stream)
+        with StreamWriter(sys.stdout.buffer, args.stream) as writer:
+            try:
+                for name, output_name, data, error in process_stream(pipeline, images, workers=args.jobs, remote_workers=args.bg_jobs):
+                    if error is not None:
+                        console.print(f"[red]Error processing {name}: {error}[/red]")
+                        failed += 1
+                    else:
+                        writer.write(output_name, data)
+            except ValueError as e:  # A malformed stream
+                console.print(f"[red]Error reading the input stream: {e}[/red]")
+                failed += 1
+    else:
+        # A single image traces its SVG color layers and encodes in parallel
+        pipeline = build_pipeline(operations, memory_limit=memory_limit, layer_workers=args.jobs)
+        source = args.image_paths[0]
+        destination = args.output or ('-' if source == '-' else None)
+        try:
+            data, extension = pipeline.run_to_bytes(sys.stdin.buffer if source == '-' else source)
+            if destination == '-':
+                sys.stdout.buffer.write(data)
+                sys.stdout.buffer.flush()
+            else:
+                if pipeline.auto_format is not None:
+                    destination = pipeline.auto_output_path(destination, extension)
+                with atomic_path(destination) as temp_path, open(temp_path, 'wb') as out_file:
+                    out_file.write(data)
+        except Exception as e:
+            console.print(f"[red]Error processing {'stdin' if source == '-' else os.path.basename(source)}: {e}[/red]")
+            failed += 1
+    if failed:
+        sys.exit(1)
+
+def process_archives(args, inputs: list, operations: dict, console):
+    """
+    Processes images read from tar/zip archives and/or writes the results
+    into an archive, without extracting members or writing one file per
+    result. Inputs may mix archives, directories and image files; results go
+    to the -o archive or directory (by member name), or by default to an
+    '_processed' archive next to a single input archive.
+    """
+    from rich.progress import Progress
+    from image_ops.archive import ArchiveWriter, archive_extension, is_archive, member_path, read_archive
+    from image_ops.discovery import discover_images
+    from image_ops.processor import build_pipeline
+    from image_ops.stream import process_stream
+    from image_ops.utils import atomic_path
+
+    for path in inputs:
+        if not os.path.exists(path):
+            console.print(f"[red]Error: Input path '{path}' not found.[/red]")
+            return
+
+    output_archive = None
+    output_dir = None
+    if args.output and is_archive(args.output):
+        output_archive = args.output
+    elif args.output and (os.path.isdir(args.output) or '.' not in os.path.basename(args.output)):
+        output_dir = args.output
+    elif args.output:
+        console.print("[red]Error: With archives, -o must be an archive (.zip, .tar, .tar.gz, ...) or a directory.[/red]")
+        return
+    elif len(inputs) == 1:
+        extension = archive_extension(inputs[0])
+        output_archive = f"{inputs[0][:-len(extension)]}_processed{extension}"
+    else:
+        console.print("[red]Error: Archive input from several sources needs an output archive or directory (-o).[/red]")
+        return
+
+    patterns = [args.pattern] if args.pattern else None
 
+    def images():
+        """Yields (name, source): archive members as bytes, other images as paths named relative to their directory."""
+        for path in inputs:
+            if is_archive(path):
+                yield from read_archive(path, patterns)
+            elif os.path.isdir(path):
+                for image_path in discover_images(path, patterns, recursive=args.recursive, exclude=[args.output] if args.output else None):
+                    yield os.path.relpath(image_path, path).replace(os.sep, '/'), image_path
+            else:
+                yield os.path.basename(path), path
+
+    pipeline = build_pipeline(operations, memory_limit=args.memory_limit * 1024 * 1024)
+    failed = 0
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(ArchiveWriter(output_archive)) if output_archive else None
+        progress = stack.enter_context(Progress(console=console))
+        task = progress.add_task("[cyan]Processing...", total=None)
+        for name, output_name, data, error in process_stream(pipeline, images(), workers=args.jobs, remote_workers=args.bg_jobs):
+            progress.update(task, advance=1, description=f"Processing [bold]{name}[/bold]")
+            if error is None:
+                try:
+                    if writer:
+                        writer.write(output_name, data)
+                    else:
+                        output_path = member_path(output_dir, output_name)
+                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                        with atomic_path(output_path) as temp_path, open(temp_path, 'wb') as out_file:
+                            out_file.write(data)
+                except (ValueError, OSError) as e:
+                    error = e
+            if error is not None:
+                console.print(f"\n[red]Error processing {name}: {error}[/red]")
+                failed += 1
+
+    console.print(f"Results written to [cyan]{output_archive or output_dir}[/cyan]")
+    if failed:
+        console.print(f"[yellow]{failed} images failed.[/yellow]")
+    console.print("[bold green]All tasks complete![/bold green]")
+
+def print_plan(pipeline, jobs, console):
+    """
+    Prints what a run would do to each image, read from headers only, and
+    the estimated work: images copied rather than re-encoded, megapixels
+    decoded and remove.bg calls. Nothing is decoded or written.
+    """
+    from collections import Counter
+    from rich.markup import escape
+    from image_ops.plan import read_info
+
+    routes = Counter()
+    megapixels = 0.0
+    remote_calls = 0
+    skipped_steps = 0
+    for image_path, output_path in jobs:
+        try:
+            info = read_info(image_path)
+        except (ValueError, IOError) as e:
+            console.print(f"[red]{escape(image_path)}: {escape(str(e))}[/red]")
+            routes['unreadable'] += 1
+            continue
+        planned = pipeline.plan(image_path)
+        route = planned.route(image_path)
+        routes[route] += 1
+        skipped = len(pipeline.steps) - len(planned.steps)
+        skipped_steps += skipped
+        if route in ('decode', 'tiled'):
+            megapixels += info.megapixels
+        remote_calls += sum(name == 'remove_bg' for name, _ in planned.steps)
+
+        header = f"{info.format} {info.width}x{info.height} {info.mode}{' alpha' if info.has_alpha else ''}"
+        steps = ', '.join(name for name, _ in planned.steps) or 'none'
+        note = f" ({skipped} no-op skipped)" if skipped else ""
+        console.print(f"{escape(image_path)} ({header}) -> {escape(output_path)}: [cyan]{route}[/cyan], steps: {steps}{note}")
+
+    total = sum(routes.values())
+    counts = ', '.join(f"{count} {route}" for route, count in routes.most_common())
+    console.print(f"\n[bold]Plan:[/bold] {total} images ({counts or 'none'}).")
+    console.print(f"Estimated work: [cyan]{megapixels:.1f} MP[/cyan] decoded, [cyan]{remote_calls}[/cyan] remove.bg calls, [green]{skipped_steps}[/green] no-op steps skipped.")
+
+def main():
+    """Main function to parse arguments and call image operations."""
+    parser = build_parser()
     args = parser.parse_args()
 
-    # --- File Discovery ---
-    files_to_process = list(args.image_paths)
-    if args.input_dir:
-        if os.path.isfile(args.input_dir):
-            files_to_process.append(args.input_dir)
-        elif os.path.isdir(args.input_dir):
-            if args.pattern:
-                search_path = os.path.join(args.input_dir, args.pattern)
-                files_to_process.extend(glob.glob(search_path))
+    if args.jobs < 1 or args.bg_jobs < 1 or args.write_jobs < 1:
+        parser.error("--jobs, --bg-jobs and --write-jobs must be positive integers.")
+    if args.memory_limit < 1:
+        parser.error("--memory-limit must be a positive number of MB.")
+    if args.variants and args.to_svg:
+        parser.error("--variants cannot be combined with --to-svg.")
+    if args.auto_format is not None and (args.format or args.to_svg or args.variants):
+        parser.error("--auto-format cannot be combined with --format, --to-svg or --variants.")
+    if (args.min_psnr is not None or args.max_size is not None) and args.auto_format is None:
+        parser.error("--min-psnr and --max-size need --auto-format.")
+    if args.quality is not None and not 0 <= args.quality <= 100:
+        parser.error("--quality must be between 0 and 100.")
+    if args.speed is not None and not 0 <= args.speed <= 10:
+        parser.error("--speed must be between 0 and 10.")
+    if args.near_duplicates is not None and not 0 <= args.near_duplicates <= 16:
+        parser.error("--near-duplicates must be between 0 and 16 bits.")
+    if args.svg_colors is not None and (args.svg_colors < 1 or args.svg_backend != 'native'):
+        parser.error("--svg-colors must be a positive integer and needs --svg-backend native.")
+    # Images read from stdin or written to stdout never touch disk
+    streaming = bool(args.stream) or '-' in args.image_paths or args.output == '-'
+    if args.stream and (args.image_paths or args.input_dir or args.output):
+        parser.error("--stream reads from stdin and writes to stdout; it takes no input paths, --input-dir or -o.")
+    if '-' in args.image_paths and (len(args.image_paths) > 1 or args.input_dir):
+        parser.error("'-' (stdin) must be the only input; use --stream for several images.")
+    if args.output == '-' and (len(args.image_paths) != 1 or args.input_dir):
+        parser.error("-o - (stdout) needs a single input image; use --stream for several images.")
+    if args.variants and (args.stream or args.output == '-') and args.format != 'ico':
+        parser.error("--variants writes one file per size; it cannot be used with stdout unless -f ico bundles them.")
+    if streaming and (args.incremental or args.cache_dir or args.report or args.profile):
+        parser.error("--incremental, --cache-dir, --report and --profile work on files; they cannot be used with stdin/stdout.")
+    from image_ops.archive import is_archive
+    inputs = args.image_paths + ([args.input_dir] if args.input_dir else [])
+    archives = any(is_archive(path) for path in inputs) or bool(args.output and is_archive(args.output))
+    if (args.resume or args.retry_failed or args.journal) and (streaming or archives or args.dry_run):
+        parser.error("--resume, --retry-failed and --journal journal runs over image files; they cannot be used with\nstdin/stdout, archives or --dry-run.")
+    if args.dry_run and (streaming or archives or args.serve or args.socket):
+        parser.error("--dry-run plans runs over image files; it cannot be used with stdin/stdout, archives or worker mode.")
+    if archives and args.variants and args.format != 'ico':
+        parser.error("--variants writes one file per size; it cannot be used with archives unless -f ico bundles them.")
+    if archives and (streaming or args.incremental or args.cache_dir or args.report or args.profile):
+        parser.error("Archive input or output cannot be combined with stdin/stdout, --incremental, --cache-dir, --report or --profile.")
+    if args.effects:
+        from image_ops.effects import parse_effect
+        try:
+            for spec in args.effects:
+                parse_effect(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.variants:
+        from image_ops.resize import parse_variant
+        try:
+            for spec in args.variants:
+                parse_variant(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    from dotenv import load_dotenv
+    from rich.console import Console
+    from image_ops.cache import ResultCache
+    from image_ops.processor import BatchProcessor, build_pipeline, default_output_path
+
+    # Load environment variables
+    load_dotenv()
+    remove_bg_api_key = os.getenv("REMOVE_BG_API_KEY")
+    # stdout carries the images when streaming, and the responses in worker mode
+    console = Console(stderr=streaming or args.serve or bool(args.socket))
+
+    cache = ResultCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024) if args.cache_dir else None
+
+    # --- Worker Mode ---
+    if args.serve or args.socket:
+        from image_ops import worker
+        options = {'api_key': remove_bg_api_key, 'memory_limit': args.memory_limit * 1024 * 1024}
+        with BatchProcessor(workers=args.jobs, remote_workers=args.bg_jobs, cache=cache) as processor:
+            if args.serve:
+                worker.serve_stream(processor, sys.stdin, sys.stdout, **options)
             else:
-                # Default patterns if none provided
-                default_patterns = ['*.png', '*.jpg', '*.jpeg', '*.ico']
-                for pattern in default_patterns:
-                    search_path = os.path.join(args.input_dir, pattern)
-                    files_to_process.extend(glob.glob(search_path))
+                server = worker.create_server(processor, args.socket, **options)
+                console.print(f"Worker listening on [cyan]{args.socket}[/cyan]")
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.server_close()
+        return
+
+    # --- Operation Chaining ---
+    operations = {'resample': args.resample, 'resize_preset': args.resize_preset}
+    if args.resize:
+        operations['resize'] = args.resize
+    if args.grayscale:
+        operations['grayscale'] = True
+    if args.effects:
+        operations['effects'] = args.effects
+    if args.remove_bg:
+        if not remove_bg_api_key:
+            console.print("[yellow]Warning: REMOVE_BG_API_KEY not set. Skipping background removal.[/yellow]")
         else:
-            console.print(f"[red]Error: Input path '{args.input_dir}' not found.[/red]")
-            return
+            operations['remove_bg'] = {'api_key': remove_bg_api_key, 'max_concurrency': args.bg_jobs, 'requests_per_minute': args.bg_rpm}
+    if args.to_svg:
+        operations['svg'] = {'turd_size': args.svg_turd_size, 'color': args.svg_color, 'backend': args.svg_backend, 'colors': args.svg_colors}
+    elif args.auto_format is not None:
+        operations['auto_format'] = {
+            'formats': args.auto_format or AUTO_FORMAT_CHOICES,
+            'min_psnr': args.min_psnr,
+            'max_bytes': args.max_size * 1024 if args.max_size is not None else None,
+        }
+    elif args.format:
+        operations['format'] = args.format
+    if args.variants:
+        operations['variants'] = args.variants
+        operations['variant_name'] = args.variant_name
+    if args.encode_preset:
+        operations['encode_preset'] = args.encode_preset
+    if args.quality is not None:
+        operations['quality'] = args.quality
+    if args.speed is not None:
+        operations['speed'] = args.speed
+    if args.lossless:
+        operations['lossless'] = True
+    if args.link:
+        operations['link'] = True
+
+    # --- Streaming (stdin/stdout) ---
+    if streaming:
+        stream_images(args, operations, console)
+        return
+
+    # --- Archives (tar/zip) ---
+    if archives:
+        process_archives(args, inputs, operations, console)
+        return
+
+    # --- File Discovery ---
+    if args.input_dir and not os.path.exists(args.input_dir):
+        console.print(f"[red]Error: Input path '{args.input_dir}' not found.[/red]")
+        return
 
-    if not files_to_process:
+    def discover():
+        """Yields (image_path, relative_dir) pairs lazily, as files are found."""
+        for image_path in args.image_paths:
+            yield image_path, ''
+        if args.input_dir:
+            if os.path.isfile(args.input_dir):
+                yield args.input_dir, ''
+                return
+            patterns = [args.pattern] if args.pattern else None
+            exclude = [args.output] if args.output else None
+            from image_ops.discovery import discover_images
+            for image_path in discover_images(args.input_dir, patterns, recursive=args.recursive, exclude=exclude):
+                yield image_path, os.path.relpath(os.path.dirname(image_path), args.input_dir)
+
+    # Peek at the first two files: enough to tell a single image from a batch
+    files = discover()
+    first_files = list(itertools.islice(files, 2))
+    if not first_files:
         console.print("[yellow]No image files found to process.[/yellow]")
         return
+    files = itertools.chain(first_files, files)
 
     # --- Output Handling ---
     output_dir = None
     output_file_path = None
     if args.output:
-        if os.path.isdir(args.output) or ('.' not in os.path.basename(args.output) and len(files_to_process) > 1):
+        if os.path.isdir(args.output) or ('.' not in os.path.basename(args.output) and len(first_files) > 1):
              output_dir = args.output
-             if not os.path.exists(output_dir):
+             if not os.path.exists(output_dir) and not args.dry_run:
                 os.makedirs(output_dir)
                 console.print(f"Created output directory: [cyan]{output_dir}[/cyan]")
-        elif len(files_to_process) == 1:
+        elif len(first_files) == 1:
             output_file_path = args.output
         else:
             console.print("[red]Error: Custom file output (-o) can only be used with a single input image.[/red]")
             return
 
-    # --- Processing Loop ---
-    with Progress(console=console) as progress:
-        task = progress.add_task("[cyan]Processing...", total=len(files_to_process))
+    if args.incremental and not output_dir:
+        console.print("[red]Error: --incremental requires an output directory (-o).[/red]")
+        return
 
-        for image_path in files_to_process:
-            progress.update(task, advance=1, description=f"Processing [bold]{os.path.basename(image_path)}[/bold]")
-            
-            with tempfile.TemporaryDirectory() as temp_dir:
-                try:
-                    current_path = image_path
-                    
-                    # --- Operation Chaining ---
-                    if args.resize:
-                        width, height = args.resize
-                        temp_output = os.path.join(temp_dir, os.path.basename(current_path))
-                        current_path = resize.resize_image(current_path, width, height, custom_output_path=temp_output)
-                    
-                    if args.grayscale:
-                        temp_output = os.path.join(temp_dir, os.path.basename(current_path))
-                        current_path = effects.apply_grayscale(current_path, custom_output_path=temp_output)
-
-                    if args.remove_bg:
-                        if not REMOVE_BG_API_KEY:
-                            console.print("[yellow]Warning: REMOVE_BG_API_KEY not set. Skipping background removal.[/yellow]")
+    # A single image traces its SVG color layers and encodes in parallel; a batch already uses every core
+    layer_workers = args.jobs if len(first_files) == 1 else 1
+    pipeline = build_pipeline(operations, memory_limit=args.memory_limit * 1024 * 1024, layer_workers=layer_workers)
+
+    # --- Output Paths ---
+    def output_path_for(image_path, relative_dir):
+        if output_file_path:
+            return output_file_path
+        # Mirrors the input tree inside the output directory, or saves alongside the original
+        return default_output_path(pipeline, image_path, output_dir, relative_dir, create_dirs=not args.dry_run)
+
+    jobs = ((image_path, output_path_for(image_path, relative_dir)) for image_path, relative_dir in files)
+
+    # --- Incremental Runs ---
+    manifest = None
+    skipped = 0
+    if args.incremental:
+        from image_ops.manifest import Manifest
+        manifest = Manifest(output_dir, pipeline.signature())
+        if args.prune and not args.dry_run:
+            for removed_path in manifest.prune():
+                console.print(f"Removed [cyan]{removed_path}[/cyan] (source deleted)")
+
+        def changed_only(jobs):
+            nonlocal skipped
+            for job in jobs:
+                outputs = pipeline.output_paths(job[1])
+                candidates = [os.path.abspath(path) for path in pipeline.auto_output_paths(job[1])]
+                if candidates:
+                    # The format is chosen per image: expect the file recorded, if it is one of them
+                    recorded = manifest.outputs_of(job[0])
+                    outputs = recorded if len(recorded) == 1 and recorded[0] in candidates else outputs
+                if manifest.is_current(job[0], outputs):
+                    skipped += 1
+                else:
+                    yield job
+
+        jobs = changed_only(jobs)
+
+    # --- Journal (resumable runs) ---
+    journal = None
+    resumed = 0
+    if not args.dry_run:
+        from image_ops.journal import JOURNAL_NAME, Journal
+        # Only written where outputs go, or where asked: never into the source tree
+        journal_path = args.journal or (os.path.join(output_dir, JOURNAL_NAME) if output_dir else None)
+        if journal_path is None and (args.resume or args.retry_failed):
+            console.print("[red]Error: --resume and --retry-failed need --journal when there is no output directory.[/red]")
+            return
+        if journal_path is not None:
+            try:
+                journal = Journal(journal_path, pipeline.signature(), resume=args.resume or args.retry_failed)
+            except ValueError as e:
+                console.print(f"[red]Error: {e}[/red]")
+                return
+            if args.resume or args.retry_failed:
+                console.print(
+                    f"Journal: [green]{len(journal.done)}[/green] done, [red]{len(journal.failed)}[/red] failed, "
+                    f"[yellow]{len(journal.interrupted)}[/yellow] interrupted"
+                )
+
+                def unfinished(jobs):
+                    nonlocal resumed
+                    for job in jobs:
+                        if journal.needs_run(job[0], failures_only=args.retry_failed):
+                            yield job
                         else:
-                            temp_output = os.path.join(temp_dir, os.path.splitext(os.path.basename(current_path))[0] + ".png")
-                            current_path = rmbg.remove_background(current_path, REMOVE_BG_API_KEY, custom_output_path=temp_output)
-                    
-                    # --- Final Conversion/Output ---
-                    final_ext = args.format if args.format else os.path.splitext(current_path)[1][1:]
-                    if args.to_svg:
-                        final_ext = 'svg'
-
-                    # Determine final output path
-                    if output_file_path:
-                        final_path = output_file_path
-                    elif output_dir:
-                        base_name = os.path.splitext(os.path.basename(image_path))[0]
-                        final_path = os.path.join(output_dir, f"{base_name}.{final_ext}")
-                    else: # Default: save alongside original
-                        base_name = os.path.splitext(os.path.basename(image_path))[0]
-                        source_dir = os.path.dirname(image_path)
-                        final_path = os.path.join(source_dir, f"{base_name}_processed.{final_ext}")
-
-                    # Execute final operation (SVG or format conversion)
-                    if args.to_svg:
-                        vectorize.vectorize_image(current_path, custom_output_path=final_path, turd_size=args.svg_turd_size, color=args.svg_color)
-                    elif args.format:
-                        convert.convert_format(current_path, args.format, custom_output_path=final_path)
-                    else:
-                        # If no final conversion, just move the last processed file
-                        shutil.copy(current_path, final_path)
+                            resumed += 1
+
+                jobs = unfinished(jobs)
+
+            def journaled(jobs):
+                for job in jobs:
+                    journal.start(job[0])
+                    yield job
+
+            jobs = journaled(jobs)
+
+    if args.dry_run:
+        print_plan(pipeline, jobs, console)
+        if manifest:
+            console.print(f"Would skip [green]{skipped}[/green] unchanged images.")
+        return
+
+    report = None
+    if args.report or args.profile:
+        from image_ops.instrument import RunReport
+        report = RunReport(profile=bool(args.profile))
+
+    from image_ops.dedupe import Deduplicator
+    dedupe = None if args.no_dedupe else Deduplicator(args.dedupe)
+    # Inputs processed, for --near-duplicates
+    processed = []
+
+    # --- Processing Loop ---
+    from rich.progress import Progress
+    from image_ops.batch import run_batch
+    from image_ops.tiles import peak_memory_mb
+    from image_ops.writer import OutputWriter
+    # Each input's size, mtime and hash, taken by the worker that processes it, for the manifest
+    fingerprints = {} if manifest else None
+    completed = False
+    try:
+        # Encoded outputs are written off the workers, atomically; the writer is closed once all are in place
+        with Progress(console=console) as progress, OutputWriter(workers=args.write_jobs, durability=args.durability) as writer:
+            # The total is unknown until discovery finishes; work starts right away
+            task = progress.add_task("[cyan]Processing...", total=None)
+
+            def counted(jobs):
+                found = 0
+                for job in jobs:
+                    found += 1
+                    yield job
+                progress.update(task, total=found)
+
+            # Decode once, run the whole chain in memory, encode once; images run in parallel
+            for image_path, final_path, error in run_batch(pipeline, counted(jobs), workers=args.jobs, remote_workers=args.bg_jobs, cache=cache, report=report, dedupe=dedupe, writer=writer, fingerprints=fingerprints):
+                progress.update(task, advance=1, description=f"Processing [bold]{os.path.basename(image_path)}[/bold]")
+                if args.near_duplicates is not None and not (dedupe and dedupe.is_duplicate(image_path)):
+                    processed.append(image_path)
+                if error is not None:
+                    console.print(f"\n[red]Error processing {os.path.basename(image_path)}: {error}[/red]")
+                    if fingerprints is not None:
+                        fingerprints.pop(image_path, None)
+                    if journal:
+                        journal.fail(image_path, error)
+                    continue
+                if journal:
+                    journal.complete(image_path, pipeline.output_paths(final_path))
+                if manifest:
+                    manifest.record(image_path, pipeline.output_paths(final_path), fingerprints.pop(image_path, None))
+        completed = True
+    finally:
+        # Keep what was completed even if the run is interrupted
+        if manifest:
+            manifest.save()
+        if journal:
+            # An interrupted run, or one with failures (now or left from before), keeps its journal
+            # for --resume or --retry-failed
+            journal.close(remove=completed and not journal.failed)
+        if report and args.report:
+            report.save(args.report)
+        if report and args.profile and report.save_profile(args.profile):
+            console.print(f"Profile written to [cyan]{args.profile}[/cyan]")
+
+    if manifest:
+        console.print(f"Skipped [green]{skipped}[/green] unchanged images.")
+    if resumed:
+        console.print(f"Skipped [green]{resumed}[/green] images finished by the previous run.")
+    if journal and journal.failed:
+        console.print(f"[yellow]{len(journal.failed)} images failed; run again with --retry-failed to process only those.[/yellow]")
+
+    if cache:
+        cache.evict()
+        console.print(f"Cache: [green]{cache.hits} hits[/green], [cyan]{cache.partial_hits} partial hits[/cyan], [yellow]{cache.misses} misses[/yellow]")
+
+    if dedupe and dedupe.duplicates:
+        console.print(
+            f"Duplicates: [green]{dedupe.duplicates}[/green] inputs reused an identical image's result, saving "
+            f"[green]{dedupe.remote_calls_saved}[/green] remove.bg credits and [green]{dedupe.cpu_seconds_saved:.1f}[/green] CPU-seconds"
+        )
+
+    if args.near_duplicates is not None:
+        from image_ops.dedupe import find_similar
+        groups = find_similar(processed, args.near_duplicates, workers=args.jobs)
+        for group in groups:
+            console.print(f"[yellow]Similar images:[/yellow] {', '.join(group)}")
+        console.print(f"Near-duplicates: [yellow]{len(groups)}[/yellow] groups of similar images")
 
-                except (ValueError, FileNotFoundError, IOError) as e:
-                    console.print(f"\n[red]Error processing {os.path.basename(image_path)}: {e}[/red]")
+    peak = peak_memory_mb()
+    if peak is not None:
+        console.print(f"Peak memory: [cyan]{peak:.0f} MB[/cyan] (largest process)")
 
     console.print("[bold green]All tasks complete![/bold green]")
 
@@ -0,0 +1,55 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.archive import ArchiveWriter, archive_extension, member_path, read_archive
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.output_dir = tempfile.mkdtemp()
+        self.members = [("logo.png", b"png data"), ("icons/small.jpg", b"jpg data"), ("notes.txt", b"text"), ("icons/.hidden.png", b"x")]
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Test that written members are read back in order, keeping only visible images."""
+        for file_name in ("images.zip", "images.tar", "images.tar.gz"):
+            archive_path = os.path.join(self.output_dir, file_name)
+            with ArchiveWriter(archive_path) as writer:
+                for name, data in self.members:
+                    writer.write(name, data)
+            self.assertFalse(os.path.exists(f"{archive_path}.part"))
+
+            self.assertEqual(list(read_archive(archive_path)), self.members[:2])
+            self.assertEqual(list(read_archive(archive_path, ["*.txt"])), [("notes.txt", b"text")])
+
+    def test_interrupted_write_leaves_nothing(self):
+        """Test that an archive is only put in place when it was completely written."""
+        archive_path = os.path.join(self.output_dir, "images.zip")
+        with self.assertRaises(RuntimeError):
+            with ArchiveWriter(archive_path) as writer:
+                writer.write("logo.png", b"png data")
+                raise RuntimeError("interrupted")
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_names(self):
+        """Test archive extension detection and that member names cannot escape the output directory."""
+        self.assertEqual(archive_extension("icons.TAR.GZ"), ".tar.gz")
+        self.assertIsNone(archive_extension("logo.png"))
+        with self.assertRaises(ValueError):
+            ArchiveWriter(os.path.join(self.output_dir, "images.rar"))
+
+        self.assertEqual(member_path("out", "./icons/small.png"), os.path.join("out", "icons", "small.png"))
+        for name in ("../escape.png", "/etc/passwd", "icons/../../escape.png"):
+            with self.assertRaises(ValueError):
+                member_path("out", name)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.batch import run_batch
+from image_ops.pipeline import Pipeline
+from image_ops.utils import get_image_name
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = os.path.dirname(__file__)
+        self.test_image_name = get_image_name(self.input_image_path)
+        self.output_files = []
+
+    def tearDown(self):
+        """Clean up after each test."""
+        for file_path in self.output_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_run_batch_parallel(self):
+        """Test running a pipeline over several images with a process pool."""
+        jobs = []
+        for index in range(3):
+            output_path = os.path.join(self.output_dir, f"{self.test_image_name}_batch{index}.jpg")
+            self.output_files.append(output_path)
+            jobs.append((self.input_image_path, output_path))
+        missing = os.path.join(self.output_dir, "missing.png")
+        jobs.append((missing, os.path.join(self.output_dir, "missing.jpg")))
+
+        pipeline = Pipeline().resize(32, 32).to_format('jpg')
+        results = {output_path: error for _, output_path, error in run_batch(pipeline, jobs, workers=2)}
+
+        self.assertEqual(len(results), 4)
+        self.assertIsInstance(results.pop(os.path.join(self.output_dir, "missing.jpg")), FileNotFoundError)
+        for output_path, error in results.items():
+            self.assertIsNone(error)
+            with Image.open(output_path) as img:
+                self.assertEqual(img.size, (32, 32))
+
+    def test_split_isolates_remote_steps(self):
+        """Test that remove.bg steps are split into their own segment."""
+        pipeline = Pipeline().resize(32, 32).remove_background("key").grayscale().to_format('jpg')
+        segments = pipeline.split()
+
+        self.assertEqual([segment.is_remote for segment in segments], [False, True, False])
+        self.assertEqual(segments[-1].output_format, 'jpg')
+        self.assertIsNone(segments[0].output_format)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.batch import run_batch
+from image_ops.cache import ResultCache, hash_file
+from image_ops.pipeline import Pipeline
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh cache directory."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.temp_dir, 'cache'), max_bytes=250)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_put_and_get(self):
+        """Test storing and reading back an entry."""
+        key = self.cache.key(hash_file(self.input_image_path), "grayscale")
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, b"result")
+        self.assertEqual(self.cache.get(key), b"result")
+
+    def test_evicts_least_recently_used(self):
+        """Test that eviction removes the oldest entries first."""
+        for index, name in enumerate(["old", "recent", "new"]):
+            self.cache.put(name, b"x" * 100)
+            os.utime(self.cache._path(name), (time.time() + index, time.time() + index))
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual(self.cache.get("new"), b"x" * 100)
+
+    def test_batch_reuses_results(self):
+        """Test that a second identical batch is served from the cache."""
+        cache = ResultCache(os.path.join(self.temp_dir, 'cache'))
+        output_path = os.path.join(self.temp_dir, "logo.jpg")
+        pipeline = Pipeline().resize(32, 32).to_format('jpg')
+
+        for _ in range(2):
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            errors = [error for _, _, error in run_batch(pipeline, [(self.input_image_path, output_path)], workers=1, cache=cache)]
+            self.assertEqual(errors, [None])
+            self.assertTrue(os.path.exists(output_path))
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_batch_reuses_auto_format_results(self):
+        """Test that the format chosen for an image is cached along with its output."""
+        cache = ResultCache(os.path.join(self.temp_dir, 'cache'))
+        output_path = os.path.join(self.temp_dir, "logo.auto")
+        pipeline = Pipeline().resize(32, 32).to_auto_format(['webp', 'png'])
+
+        written = []
+        for _ in range(2):
+            for path in pipeline.auto_output_paths(output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            for _, path, error in run_batch(pipeline, [(self.input_image_path, output_path)], workers=1, cache=cache):
+                self.assertIsNone(error)
+                written.append(path)
+            self.assertTrue(os.path.exists(written[-1]))
+
+        self.assertEqual(written[0], written[1])
+        self.assertIn(os.path.splitext(written[0])[1], ('.webp', '.png'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
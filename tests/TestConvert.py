@@ -1,11 +1,12 @@
 import sys
 import os
+import io
 import unittest
 from PIL import Image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from image_ops.convert import convert_format
+from image_ops.convert import choose_format, convert_format, encode, encode_options, psnr, save_ico, to_format
 from image_ops.utils import get_image_name
 
 class TestImageConversion(unittest.TestCase):
@@ -58,6 +59,97 @@ class TestImageConversion(unittest.TestCase):
         self.assertTrue(os.path.exists(result_path))
         self.assertEqual(result_path, expected_path)
 
+    def test_save_ico_embeds_all_sizes(self):
+        """Test that several sizes are bundled into a single ICO file."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_sizes.ico")
+        self.output_files.append(output_path)
+
+        with Image.open(self.input_image_path) as img:
+            images = [img.resize((size, size)) for size in (512, 64, 32, 16)]
+        save_ico(images, output_path)
+
+        with Image.open(output_path) as img:
+            self.assertEqual(img.ico.sizes(), {(64, 64), (32, 32), (16, 16)})
+
+    def test_encode_presets(self):
+        """Test that presets trade size for time without changing the pixels."""
+        with Image.open(self.input_image_path) as img:
+            img.load()
+            sizes = {preset: len(encode(img, 'png', preset)) for preset in ('fast', 'balanced', 'smallest')}
+            with Image.open(io.BytesIO(encode(img, 'png', 'smallest'))) as smallest:
+                self.assertEqual(smallest.tobytes(), img.tobytes())
+        self.assertLess(sizes['smallest'], sizes['fast'])
+        with self.assertRaises(ValueError):
+            encode(Image.new('RGB', (4, 4)), 'png', 'tiny')
+
+    def test_jpg_flatten_on_white(self):
+        """Test that transparent pixels are flattened onto white in a single composite."""
+        img = Image.new('RGBA', (4, 2), (255, 0, 0, 255))
+        img.putpixel((0, 0), (0, 0, 0, 0))
+        img.putpixel((1, 0), (0, 0, 0, 128))
+        flattened = to_format(img, 'jpg')
+        self.assertEqual(flattened.mode, 'RGB')
+        self.assertEqual(flattened.getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(flattened.getpixel((1, 0)), (127, 127, 127))
+        self.assertEqual(flattened.getpixel((2, 0)), (255, 0, 0))
+        self.assertEqual(to_format(img, 'jpg', strip_rows=1).tobytes(), flattened.tobytes())
+
+    def test_same_format_is_copied(self):
+        """Test that converting to the source's own format copies it unless a preset is given."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_same.png")
+        self.output_files.append(output_path)
+
+        convert_format(self.input_image_path, 'png', custom_output_path=output_path)
+        with open(self.input_image_path, 'rb') as src, open(output_path, 'rb') as dst:
+            self.assertEqual(src.read(), dst.read())
+
+        convert_format(self.input_image_path, 'png', custom_output_path=output_path, preset='fast')
+        self.assertNotEqual(os.path.getsize(output_path), os.path.getsize(self.input_image_path))
+
+    def test_convert_format_to_webp_and_avif(self):
+        """Test converting a file to the WebP and AVIF formats, lossy and lossless."""
+        for output_format, pil_format in (('webp', 'WEBP'), ('avif', 'AVIF')):
+            output_path = os.path.join(self.output_dir, f"{self.test_image_name}_converted.{output_format}")
+            self.output_files.append(output_path)
+            convert_format(self.input_image_path, output_format, custom_output_path=output_path, quality=60, speed=8)
+            with Image.open(output_path) as img:
+                self.assertEqual(img.format, pil_format)
+
+        with Image.open(self.input_image_path) as img:
+            img.load()
+            with Image.open(io.BytesIO(encode(img, 'webp', lossless=True))) as decoded:
+                self.assertEqual(psnr(img, decoded), float('inf'))
+        with self.assertRaises(ValueError):
+            encode_options('jpg', lossless=True)
+        with self.assertRaises(ValueError):
+            encode_options('avif', speed=11)
+
+    def test_choose_format_meets_budgets(self):
+        """Test that the smallest encoding meeting the quality or size budget is picked."""
+        with Image.open(self.input_image_path) as img:
+            img.load()
+            output_format, data = choose_format(img, ['webp', 'png'], min_psnr=35)
+            with Image.open(io.BytesIO(data)) as decoded:
+                self.assertGreaterEqual(psnr(img, decoded), 35)
+            self.assertEqual(output_format, 'webp')
+
+            output_format, data = choose_format(img, ['jpg', 'webp'], max_bytes=60000)
+            self.assertEqual(output_format, 'webp')  # JPG cannot keep the transparency
+            self.assertLessEqual(len(data), 60000)
+
+            with self.assertRaises(ValueError):
+                choose_format(img, ['png'], max_bytes=1000)
+
+    def test_choose_format_size_budget_with_quality(self):
+        """Test that a requested quality caps the search within a size budget."""
+        with Image.open(self.input_image_path) as img:
+            img = img.convert('RGB')
+        output_format, data = choose_format(img, ['jpg'], max_bytes=1000000, quality=60)
+        self.assertEqual(output_format, 'jpg')
+        self.assertEqual(data, encode(img, 'jpg', quality=60))
+
+        output_format, small = choose_format(img, ['jpg'], max_bytes=len(data) - 1, quality=60)
+        self.assertLess(len(small), len(data))
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
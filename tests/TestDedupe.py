@@ -0,0 +1,102 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.batch import run_batch
+from image_ops.cache import fingerprint
+from image_ops.dedupe import Deduplicator, find_similar
+from image_ops.instrument import RunReport
+from image_ops.pipeline import Pipeline
+
+class TestDedupe(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.other_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'simple-logo.png'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _copy_input(self, name):
+        path = os.path.join(self.output_dir, name)
+        shutil.copy(self.input_image_path, path)
+        return path
+
+    def test_leader_of(self):
+        """Test that only inputs with the same content and output extension are duplicates."""
+        copy_path = self._copy_input('copy.png')
+        dedupe = Deduplicator()
+        first = (self.input_image_path, 'a.png')
+
+        self.assertIsNone(dedupe.leader_of(first, fingerprint(self.input_image_path)))
+        self.assertIsNone(dedupe.leader_of((self.other_image_path, 'b.png'), fingerprint(self.other_image_path)))
+        self.assertIs(dedupe.leader_of((copy_path, 'c.png'), fingerprint(copy_path)), first)
+        self.assertIsNone(dedupe.leader_of((copy_path, 'd.jpg'), fingerprint(copy_path)))
+        self.assertEqual(dedupe.duplicates, 1)
+        self.assertTrue(dedupe.is_duplicate(copy_path))
+
+        with self.assertRaises(ValueError):
+            Deduplicator('symlink')
+
+    def test_run_batch_processes_duplicates_once(self):
+        """Test that identical inputs are processed once and the result fanned out to each output."""
+        inputs = [self.input_image_path] + [self._copy_input(f"copy{index}.png") for index in range(3)]
+        jobs = [(path, os.path.join(self.output_dir, f"out{index}.jpg")) for index, path in enumerate(inputs)]
+        jobs.append((self.other_image_path, os.path.join(self.output_dir, "other.jpg")))
+
+        for fan_out in ('copy', 'link', 'reflink'):
+            dedupe = Deduplicator(fan_out)
+            report = RunReport()
+            pipeline = Pipeline().resize(32, 32).to_format('jpg')
+            results = list(run_batch(pipeline, jobs, workers=1, report=report, dedupe=dedupe))
+
+            self.assertEqual(sorted(output_path for _, output_path, _ in results), sorted(job[1] for job in jobs))
+            self.assertTrue(all(error is None for _, _, error in results))
+            self.assertEqual(dedupe.duplicates, 3)
+            self.assertGreater(dedupe.cpu_seconds_saved, 0)
+            self.assertEqual(dedupe.remote_calls_saved, 0)
+            with open(jobs[0][1], 'rb') as f:
+                expected = f.read()
+            for _, output_path in jobs[1:4]:
+                with open(output_path, 'rb') as f:
+                    self.assertEqual(f.read(), expected)
+            self.assertEqual(report.to_dict()['dedupe']['duplicates'], 3)
+            self.assertEqual([image['cache'] for image in report.images].count('duplicate'), 3)
+
+    def test_failed_input_fails_its_duplicates(self):
+        """Test that duplicates of an input that fails report its error."""
+        broken = os.path.join(self.output_dir, 'broken.png')
+        with open(broken, 'wb') as f:
+            f.write(b"not an image")
+        copy_path = os.path.join(self.output_dir, 'broken_copy.png')
+        shutil.copy(broken, copy_path)
+        jobs = [(broken, os.path.join(self.output_dir, 'a.jpg')), (copy_path, os.path.join(self.output_dir, 'b.jpg'))]
+
+        results = list(run_batch(Pipeline().resize(32, 32).to_format('jpg'), jobs, workers=1, dedupe=Deduplicator()))
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(error is not None for _, _, error in results))
+
+    def test_find_similar(self):
+        """Test that a resized, re-encoded copy is grouped with its original, and other images are not."""
+        resized_path = os.path.join(self.output_dir, 'resized.jpg')
+        with Image.open(self.input_image_path) as img:
+            img.convert('RGB').resize((200, 200)).save(resized_path, quality=80)
+        other_path = os.path.join(self.output_dir, 'other.png')
+        Image.linear_gradient('L').save(other_path)
+
+        groups = find_similar([self.input_image_path, other_path, resized_path, 'missing.png'])
+
+        self.assertEqual(groups, [[self.input_image_path, resized_path]])
+        with self.assertRaises(ValueError):
+            find_similar([], max_distance=17)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
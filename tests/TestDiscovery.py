@@ -0,0 +1,49 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.discovery import discover_images
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        """Create a small directory tree of empty image files."""
+        self.root = tempfile.mkdtemp()
+        for relative_path in ["b.png", "a.jpg", "notes.txt", ".hidden.png", "sub/c.ico", "sub/deep/d.jpeg", "out/e.png"]:
+            path = os.path.join(self.root, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'wb').close()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.root)
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.root).replace(os.sep, '/') for path in paths]
+
+    def test_top_level_only(self):
+        """Test that all default patterns are matched in a single, sorted pass."""
+        self.assertEqual(self.relative(discover_images(self.root)), ["a.jpg", "b.png"])
+
+    def test_recursive_with_exclude(self):
+        """Test descending into subdirectories, skipping excluded ones."""
+        found = discover_images(self.root, recursive=True, exclude=[os.path.join(self.root, "out")])
+        self.assertEqual(self.relative(found), ["a.jpg", "b.png", "sub/c.ico", "sub/deep/d.jpeg"])
+
+    def test_custom_pattern(self):
+        """Test matching a user-provided pattern."""
+        found = discover_images(self.root, patterns=["*.png"], recursive=True)
+        self.assertEqual(self.relative(found), ["b.png", "out/e.png"])
+
+    def test_pattern_with_directory(self):
+        """Test that a pattern with a directory part matches the path relative to the root, like glob."""
+        for recursive in (False, True):
+            self.assertEqual(self.relative(discover_images(self.root, patterns=["sub/*.ico"], recursive=recursive)), ["sub/c.ico"])
+            self.assertEqual(self.relative(discover_images(self.root, patterns=["*/deep/*.jpeg"], recursive=recursive)), ["sub/deep/d.jpeg"])
+        self.assertEqual(self.relative(discover_images(self.root, patterns=["sub/*"])), ["sub/c.ico"])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
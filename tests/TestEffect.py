@@ -5,7 +5,7 @@ from PIL import Image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from image_ops.effects import apply_grayscale
+from image_ops.effects import apply_effects, apply_grayscale, parse_effect
 from image_ops.utils import get_image_name
 
 class TestImageEffects(unittest.TestCase):
@@ -35,5 +35,41 @@ class TestImageEffects(unittest.TestCase):
             self.assertEqual(img.mode, 'L')
         self.assertEqual(result_path, output_path)
 
+    def test_parse_effect(self):
+        """Test effect specs, their default values and invalid ones."""
+        self.assertEqual(parse_effect("gamma:2.2"), ('gamma', {'value': 2.2}))
+        self.assertEqual(parse_effect("threshold"), ('threshold', {'value': 128}))
+        self.assertEqual(parse_effect("sepia"), ('sepia', {}))
+        self.assertEqual(parse_effect("matrix:1,0,0,0,1,0,0,0,1")[1]['value'], [1, 0, 0, 0, 1, 0, 0, 0, 1])
+
+        lut_path = os.path.join(self.output_dir, "invert.lut")
+        self.output_files.append(lut_path)
+        with open(lut_path, 'w') as f:
+            f.write(" ".join(str(255 - level) for level in range(256)))
+        self.assertEqual(parse_effect(f"lut:{lut_path}")[1]['value'][:2], [255, 254])
+
+        for spec in ("blurry", "gamma", "gamma:0", "sepia:2", "threshold:300", "matrix:1,2", f"lut:{lut_path}.missing"):
+            with self.assertRaises(ValueError):
+                parse_effect(spec)
+
+    def test_fused_chain_matches_effects_one_at_a_time(self):
+        """Test that fusing effects into passes gives the same pixels as applying them one by one."""
+        specs = ["brightness:1.2", "contrast:1.1", "gamma:0.8", "sepia", "matrix:1,0,0,0,0.5,0,0,0,1", "blur:1", "threshold:100"]
+        chain = [parse_effect(spec) for spec in specs]
+        with Image.open(self.input_image_path) as img:
+            for mode in ('RGBA', 'RGB', 'L'):
+                source = img.convert(mode)
+                for length in (3, 5, len(chain)):
+                    expected = source
+                    for effect in chain[:length]:
+                        expected = apply_effects(expected, [effect])
+                    result = apply_effects(source, chain[:length])
+                    self.assertEqual(result.mode, expected.mode)
+                    self.assertEqual(result.tobytes(), expected.tobytes())
+
+            # Alpha is kept by color effects, and dropped by grayscale like convert('L')
+            self.assertEqual(apply_effects(img, [parse_effect("sepia")]).mode, 'RGBA')
+            self.assertEqual(apply_effects(img, [parse_effect("grayscale")]).tobytes(), img.convert('L').tobytes())
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
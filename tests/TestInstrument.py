@@ -0,0 +1,65 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops import instrument
+from image_ops.batch import run_batch
+from image_ops.instrument import RunReport
+from image_ops.pipeline import Pipeline
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_stages_only_recorded_when_active(self):
+        """Test that stages and counters are kept while recording and ignored otherwise."""
+        with instrument.stage('decode'):
+            pass
+        instrument.count('bytes_read', 10)
+
+        with instrument.recording() as recorder:
+            with instrument.stage('decode'):
+                pass
+            instrument.count('bytes_read', 10)
+            instrument.count('bytes_read', 5)
+        self.assertIn('decode', recorder.stages)
+        self.assertEqual(recorder.counters, {'bytes_read': 15})
+
+    def test_batch_report(self):
+        """Test that a batch run reports per-image stages, byte counts, errors and a profile."""
+        output_path = os.path.join(self.output_dir, "logo.jpg")
+        missing_path = os.path.join(self.output_dir, "missing.png")
+        jobs = [(self.input_image_path, output_path), (missing_path, os.path.join(self.output_dir, "missing.jpg"))]
+        pipeline = Pipeline().resize(64, 64).grayscale().to_format('jpg')
+
+        report = RunReport(profile=True)
+        list(run_batch(pipeline, jobs, workers=1, report=report))
+
+        data = report.to_dict()
+        self.assertEqual(data['run']['images'], 2)
+        self.assertEqual(data['run']['errors'], 1)
+        for name in ('decode', 'resize', 'grayscale', 'convert', 'encode'):
+            self.assertEqual(data['stages'][name]['count'], 1)
+        self.assertEqual(data['totals']['bytes_read'], os.path.getsize(self.input_image_path))
+        self.assertEqual(data['totals']['bytes_written'], os.path.getsize(output_path))
+        self.assertEqual(sum(data['latency']['histogram'].values()), 2)
+
+        report_path = os.path.join(self.output_dir, "report.json")
+        report.save(report_path)
+        with open(report_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['run']['images'], 2)
+        self.assertTrue(report.save_profile(os.path.join(self.output_dir, "run.prof")))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
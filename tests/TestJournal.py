@@ -0,0 +1,95 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.journal import Journal
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.output_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.output_dir, 'journal.jsonl')
+        self.output_path = os.path.join(self.output_dir, 'a.png')
+        with open(self.output_path, 'wb') as f:
+            f.write(b"result")
+        self.sources = {}
+        for name in ('a.png', 'b.png', 'c.png', 'd.png'):
+            self.sources[name] = os.path.join(self.output_dir, 'in', name)
+        os.makedirs(os.path.join(self.output_dir, 'in'))
+        for path in self.sources.values():
+            with open(path, 'wb') as f:
+                f.write(b"source")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _interrupted_run(self):
+        """Journals a run that completed a.png, failed b.png and was killed while c.png was in flight."""
+        journal = Journal(self.journal_path, 'settings')
+        for name in ('a.png', 'b.png', 'c.png'):
+            journal.start(self.sources[name])
+        journal.complete(self.sources['a.png'], [self.output_path])
+        journal.fail(self.sources['b.png'], IOError("quota exceeded"))
+        journal.close()
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"event": "done", "ima')  # Cut short by the crash
+
+    def test_resume(self):
+        """Test that resuming skips completed and failed images and runs the rest."""
+        self._interrupted_run()
+        journal = Journal(self.journal_path, 'settings', resume=True)
+
+        self.assertEqual(journal.interrupted, {os.path.abspath(self.sources['c.png'])})
+        self.assertFalse(journal.needs_run(self.sources['a.png']))
+        self.assertFalse(journal.needs_run(self.sources['b.png']))
+        self.assertTrue(journal.needs_run(self.sources['c.png']))
+        self.assertTrue(journal.needs_run(self.sources['d.png']))
+        self.assertEqual(journal.failed[os.path.abspath(self.sources['b.png'])], "quota exceeded")
+
+        os.remove(self.output_path)
+        self.assertTrue(journal.needs_run(self.sources['a.png']))
+        journal.close()
+
+    def test_deleted_failures_are_dropped(self):
+        """Test that failures of sources deleted since are not kept for retrying."""
+        self._interrupted_run()
+        os.remove(self.sources['b.png'])
+        journal = Journal(self.journal_path, 'settings', resume=True)
+        self.assertEqual(journal.failed, {})
+        journal.close()
+
+    def test_retry_failed(self):
+        """Test that only failures need to run with failures_only, until they succeed."""
+        self._interrupted_run()
+        journal = Journal(self.journal_path, 'settings', resume=True)
+        self.assertEqual([name for name in ('a.png', 'b.png', 'c.png') if journal.needs_run(self.sources[name], failures_only=True)], ['b.png'])
+        journal.start(self.sources['b.png'])
+        journal.complete(self.sources['b.png'], [self.output_path])
+        journal.close()
+
+        journal = Journal(self.journal_path, 'settings', resume=True)
+        self.assertFalse(journal.needs_run(self.sources['b.png'], failures_only=True))
+        self.assertFalse(journal.needs_run(self.sources['b.png']))
+        journal.close(remove=True)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_new_run_and_other_settings(self):
+        """Test that a run without resuming starts over, and other settings cannot resume."""
+        self._interrupted_run()
+        with self.assertRaises(ValueError):
+            Journal(self.journal_path, 'other settings', resume=True)
+
+        journal = Journal(self.journal_path, 'other settings')
+        self.assertTrue(journal.needs_run(self.sources['a.png']))
+        journal.close()
+        journal = Journal(self.journal_path, 'other settings', resume=True)
+        self.assertTrue(journal.needs_run(self.sources['a.png']))
+        journal.close()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.batch import run_batch
+from image_ops.manifest import Manifest
+from image_ops.pipeline import Pipeline
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        """Set up a source image and an output directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "logo.png")
+        shutil.copy(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png')), self.source)
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.output_dir)
+        self.output = os.path.join(self.output_dir, "logo.png")
+        shutil.copy(self.source, self.output)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_unchanged_source_is_current(self):
+        """Test that a recorded source is skipped, even after a touch."""
+        manifest = Manifest(self.output_dir, "settings")
+        self.assertFalse(manifest.is_current(self.source, [self.output]))
+        manifest.record(self.source, [self.output])
+        manifest.save()
+
+        reloaded = Manifest(self.output_dir, "settings")
+        os.utime(self.source, (0, 0))
+        self.assertTrue(reloaded.is_current(self.source, [self.output]))
+
+    def test_changed_source_or_settings(self):
+        """Test that modified content or new settings require reprocessing."""
+        manifest = Manifest(self.output_dir, "settings")
+        manifest.record(self.source, [self.output])
+        manifest.save()
+
+        self.assertFalse(Manifest(self.output_dir, "other settings").is_current(self.source, [self.output]))
+
+        with open(self.source, 'ab') as f:
+            f.write(b"\0")
+        self.assertFalse(Manifest(self.output_dir, "settings").is_current(self.source, [self.output]))
+
+    def test_prune_removes_orphaned_outputs(self):
+        """Test that outputs of deleted sources are removed."""
+        manifest = Manifest(self.output_dir, "settings")
+        manifest.record(self.source, [self.output])
+        os.remove(self.source)
+
+        self.assertEqual(manifest.prune(), [self.output])
+        self.assertFalse(os.path.exists(self.output))
+        self.assertEqual(manifest.entries, {})
+
+    def test_record_uses_the_fingerprint_processed(self):
+        """Test that a source edited after being processed is recorded as it was, so it is not current."""
+        fingerprints = {}
+        output = os.path.join(self.output_dir, "logo_small.png")
+        results = list(run_batch(Pipeline().resize(32, 32), [(self.source, output)], workers=1, fingerprints=fingerprints))
+        self.assertIsNone(results[0][2])
+        self.assertEqual(fingerprints[self.source][0], os.path.getsize(self.source))
+
+        with open(self.source, 'ab') as f:
+            f.write(b"\0")  # Edited after processing, before recording
+        manifest = Manifest(self.output_dir, "settings")
+        manifest.record(self.source, [output], fingerprints.pop(self.source))
+        self.assertFalse(manifest.is_current(self.source, [output]))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
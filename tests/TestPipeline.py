@@ -0,0 +1,116 @@
+import sys
+import os
+import io
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.pipeline import Pipeline
+from image_ops.utils import get_image_name
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = os.path.dirname(__file__)
+        self.test_image_name = get_image_name(self.input_image_path)
+        self.output_files = []
+
+    def tearDown(self):
+        """Clean up after each test."""
+        for file_path in self.output_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_chained_operations(self):
+        """Test resizing, grayscale and format conversion in a single pass."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_pipeline.jpg")
+        self.output_files.append(output_path)
+
+        pipeline = Pipeline().resize(64, 32).grayscale().to_format('jpg')
+        result_path = pipeline.run(self.input_image_path, output_path)
+
+        self.assertEqual(result_path, output_path)
+        with Image.open(result_path) as img:
+            self.assertEqual(img.format, 'JPEG')
+            self.assertEqual(img.size, (64, 32))
+
+    def test_empty_pipeline_copies_source(self):
+        """Test that a pipeline without steps copies the source bytes unchanged."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_copy.png")
+        self.output_files.append(output_path)
+
+        Pipeline().run(self.input_image_path, output_path)
+
+        with open(self.input_image_path, 'rb') as src, open(output_path, 'rb') as dst:
+            self.assertEqual(src.read(), dst.read())
+
+    def test_same_format_is_linked_without_decoding(self):
+        """Test that a conversion to the source's own format copies or hard-links the source."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_linked.png")
+        self.output_files.append(output_path)
+
+        Pipeline().to_format('png').link_unchanged().run(self.input_image_path, output_path)
+        self.assertTrue(os.path.samefile(self.input_image_path, output_path))
+
+        Pipeline().to_format('png').encode_with('fast').run(self.input_image_path, output_path)
+        self.assertFalse(os.path.samefile(self.input_image_path, output_path))
+        with Image.open(self.input_image_path) as src, Image.open(output_path) as dst:
+            self.assertEqual(src.convert('RGBA').tobytes(), dst.convert('RGBA').tobytes())
+
+    def test_auto_format_replaces_extension(self):
+        """Test that automatic format selection writes the chosen format under its own extension."""
+        pipeline = Pipeline().resize(64, 64).to_auto_format(['webp', 'png'])
+        self.assertEqual(pipeline.output_extension(self.input_image_path), 'auto')
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_auto.auto")
+
+        result_path = pipeline.run(self.input_image_path, output_path)
+        self.output_files.append(result_path)
+
+        self.assertIn(result_path, pipeline.auto_output_paths(output_path))
+        self.assertEqual(pipeline.output_paths(result_path), [result_path])
+        with Image.open(result_path) as img:
+            self.assertEqual(img.format.lower(), os.path.splitext(result_path)[1][1:])
+
+    def test_output_extension(self):
+        """Test the extension reported for the final output."""
+        self.assertEqual(Pipeline().output_extension("logo.jpeg"), "jpeg")
+        self.assertEqual(Pipeline().to_format('ICO').output_extension("logo.png"), "ico")
+        self.assertEqual(Pipeline().remove_background("key").output_extension("logo.jpg"), "png")
+        self.assertEqual(Pipeline().to_svg().output_extension("logo.png"), "svg")
+
+    def test_variants_are_written_next_to_output(self):
+        """Test that each variant is saved with the naming template."""
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_variant.png")
+        pipeline = Pipeline().to_variants(["32", "16x8"], name_template="{name}-{width}.{ext}")
+        paths = pipeline.output_paths(output_path)
+        self.output_files.extend(paths)
+
+        self.assertEqual([os.path.basename(path) for path in paths], ["logo_variant-32.png", "logo_variant-16.png"])
+        pipeline.run(self.input_image_path, output_path)
+        with Image.open(paths[1]) as img:
+            self.assertEqual(img.size, (16, 8))
+
+    def test_run_to_bytes_writes_nothing(self):
+        """Test that a chain runs from bytes or a stream to bytes, keeping the source format by default."""
+        with open(self.input_image_path, 'rb') as f:
+            source = f.read()
+        before = set(os.listdir(self.output_dir))
+
+        data, extension = Pipeline().resize(32, 16).run_to_bytes(io.BytesIO(source))
+        self.assertEqual(extension, 'png')
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual((img.format, img.size), ('PNG', (32, 16)))
+
+        data, extension = Pipeline().grayscale().to_format('jpg').run_to_bytes(source)
+        self.assertEqual(extension, 'jpg')
+        self.assertEqual(data[:2], b'\xff\xd8')
+
+        self.assertEqual(Pipeline().run_to_bytes(self.input_image_path), (source, 'png'))
+        with self.assertRaises(ValueError):
+            Pipeline().to_variants(["16"]).run_to_bytes(source)
+        self.assertEqual(set(os.listdir(self.output_dir)), before)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.pipeline import Pipeline
+from image_ops.plan import plan_steps, read_info
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_read_info(self):
+        """Test that the header gives the format, size, mode and alpha presence."""
+        info = read_info(self.input_image_path)
+        self.assertEqual((info.format, info.width, info.height, info.mode, info.has_alpha), ('PNG', 500, 500, 'RGBA', True))
+        self.assertEqual(info.file_size, os.path.getsize(self.input_image_path))
+
+        with self.assertRaises(IOError):
+            read_info(b"not an image")
+
+    def test_plan_steps(self):
+        """Test that no-op steps are dropped and consecutive resizes fused."""
+        info = read_info(self.input_image_path)
+        resize = lambda width, height: ('resize', {'width': width, 'height': height})
+
+        self.assertEqual(plan_steps([resize(500, 500), ('grayscale', {})], info), [('grayscale', {})])
+        self.assertEqual(plan_steps([resize(64, 64), resize(32, 32)], info), [resize(32, 32)])
+        self.assertEqual(plan_steps([('grayscale', {}), ('grayscale', {})], info), [('grayscale', {})])
+        # The size is unknown after remove.bg
+        remove_bg = ('remove_bg', {})
+        self.assertEqual(plan_steps([remove_bg, resize(500, 500)], info), [remove_bg, resize(500, 500)])
+
+    def test_noop_chain_copies_source(self):
+        """Test that a chain of no-op steps to the same format copies the source instead of re-encoding it."""
+        buffer = io.BytesIO()
+        Image.new('L', (40, 30)).save(buffer, format='PNG')
+        source = buffer.getvalue()
+        pipeline = Pipeline().resize(40, 30).grayscale().to_format('png')
+
+        planned = pipeline.plan(source)
+        self.assertEqual(planned.steps, [])
+        self.assertEqual(planned.route(source), 'copy')
+        self.assertEqual(pipeline.run_to_bytes(source), (source, 'png'))
+
+        output_path = os.path.join(self.output_dir, "logo.png")
+        Pipeline().resize(500, 500).run(self.input_image_path, output_path)
+        with open(self.input_image_path, 'rb') as f, open(output_path, 'rb') as out:
+            self.assertEqual(f.read(), out.read())
+        self.assertEqual(Pipeline().grayscale().plan(self.input_image_path).route(self.input_image_path), 'decode')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.processor import BatchProcessor, build_pipeline, default_output_path
+from image_ops.worker import serve_stream
+
+class TestProcessor(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_build_pipeline(self):
+        """Test that operations build the same chain as the CLI and unknown ones are rejected."""
+        pipeline = build_pipeline({'resize': [64, 64], 'grayscale': True, 'format': 'jpg'})
+        self.assertEqual([name for name, _ in pipeline.steps], ['resize', 'grayscale'])
+        self.assertEqual(pipeline.output_format, 'jpg')
+        self.assertEqual(default_output_path(pipeline, self.input_image_path, self.output_dir), os.path.join(self.output_dir, "logo.jpg"))
+
+        pipeline = build_pipeline({'grayscale': True, 'effects': ['contrast:1.2', 'sepia']})
+        self.assertEqual(pipeline.steps, [('effects', {'chain': [['grayscale', {}], ['contrast', {'value': 1.2}], ['sepia', {}]]})])
+
+        with self.assertRaises(ValueError):
+            build_pipeline({'blur': 2})
+        with self.assertRaises(ValueError):
+            build_pipeline({'effects': ['blurry']})
+        with self.assertRaises(ValueError):
+            build_pipeline({'remove_bg': {'api_key': ''}})
+
+    def test_process_reuses_pools(self):
+        """Test that successive calls share the same pools and report errors."""
+        pipeline = build_pipeline({'resize': [64, 64], 'format': 'jpg'})
+        with BatchProcessor(workers=1) as processor:
+            first = processor.process(pipeline, self.input_image_path, os.path.join(self.output_dir, "a.jpg"))
+            pools = processor._pools
+            second = processor.process(pipeline, self.input_image_path, os.path.join(self.output_dir, "b.jpg"))
+            self.assertIs(processor._pools, pools)
+
+            with self.assertRaises(Exception):
+                processor.process(pipeline, os.path.join(self.output_dir, "missing.png"))
+        self.assertIsNone(processor._pools)
+
+        for outputs in (first, second):
+            with Image.open(outputs[0]) as img:
+                self.assertEqual(img.size, (64, 64))
+
+    def test_serve_stream(self):
+        """Test that the worker answers every JSON-lines request, including bad ones."""
+        output_path = os.path.join(self.output_dir, "logo.jpg")
+        requests = [
+            {'id': 1, 'input': self.input_image_path, 'output': output_path, 'operations': {'resize': [32, 32], 'format': 'jpg'}},
+            {'id': 2, 'input': self.input_image_path, 'operations': {'blur': 2}},
+        ]
+        infile = io.StringIO("\n".join(json.dumps(request) for request in requests) + "\nnot json\n")
+        outfile = io.StringIO()
+
+        with BatchProcessor(workers=1) as processor:
+            serve_stream(processor, infile, outfile)
+
+        responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual(len(responses), 3)
+        by_id = {response['id']: response for response in responses}
+        self.assertTrue(by_id[1]['ok'])
+        self.assertEqual(by_id[1]['outputs'], [output_path])
+        self.assertFalse(by_id[2]['ok'])
+        self.assertFalse(by_id[None]['ok'])
+        self.assertTrue(os.path.exists(output_path))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,13 +1,16 @@
 import sys
 import os
+import io
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
 from PIL import Image
 
 # Adjust the path to import from the parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from image_ops.rmbg import remove_background
+from image_ops.rmbg import remove_background, RemoveBgClient
 from image_ops.utils import get_image_name
 
 # Load environment variables from .env file
@@ -50,7 +53,116 @@ class TestRemoveBG(unittest.TestCase):
         except IOError as e:
             self.fail(f"File or network error occurred: {e}")
 
+class _StandInHandler(BaseHTTPRequestHandler):
+    """A local remove.bg stand-in: rate-limits the first requests, then returns a PNG."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            throttle = server.requests <= server.throttled
+
+        if throttle or server.status != 200:
+            self.send_response(429 if throttle else server.status)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        buffer = io.BytesIO()
+        Image.new('RGBA', (8, 8), (255, 0, 0, 0)).save(buffer, format='PNG')
+        body = buffer.getvalue()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.truncate:
+            # The connection drops halfway through the response
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestRemoveBgClient(unittest.TestCase):
+    def setUp(self):
+        """Start a local stand-in for the remove.bg API."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.throttled = 1
+        self.server.status = 200
+        self.server.truncate = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}/v1.0/removebg"
+
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.jpeg'))
+        self.output_dir = os.path.dirname(__file__)
+        self.output_files = []
+
+    def tearDown(self):
+        """Stop the server and clean up outputs."""
+        self.server.shutdown()
+        self.server.server_close()
+        for file_path in self.output_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_retries_after_rate_limit(self):
+        """Test that a 429 response is retried and the result is returned."""
+        with RemoveBgClient("test-key", api_url=self.api_url, backoff=0) as client:
+            with open(self.input_image_path, 'rb') as image_file:
+                result = client.remove_background_data(image_file.read())
+
+            self.assertEqual(client.retries, 1)
+        with Image.open(io.BytesIO(result)) as img:
+            self.assertEqual(img.format, 'PNG')
+
+    def test_concurrent_batch_streams_to_disk(self):
+        """Test processing several images concurrently, streaming each result to a file."""
+        items = []
+        for index in range(4):
+            output_path = os.path.join(self.output_dir, f"stand_in_no_bg{index}.png")
+            self.output_files.append(output_path)
+            items.append((self.input_image_path, output_path))
+
+        with RemoveBgClient("test-key", api_url=self.api_url, max_concurrency=4, backoff=0) as client:
+            results = list(client.remove_backgrounds(items))
+
+        self.assertEqual([error for _, _, error in results], [None] * 4)
+        self.assertEqual(self.server.requests, 5)
+        for _, output_path, _ in results:
+            with Image.open(output_path) as img:
+                self.assertEqual(img.size, (8, 8))
+
+    def test_interrupted_response_leaves_no_file(self):
+        """Test that a response cut short fails without leaving a truncated PNG behind."""
+        self.server.throttled = 0
+        self.server.truncate = True
+        output_path = os.path.join(self.output_dir, "stand_in_truncated.png")
+        self.output_files.append(output_path)
+
+        with RemoveBgClient("test-key", api_url=self.api_url, backoff=0) as client:
+            with self.assertRaises(IOError):
+                client.remove_background_to_file(b"image", output_path)
+
+        self.assertFalse(os.path.exists(output_path))
+        self.assertFalse([name for name in os.listdir(self.output_dir) if name.endswith('.part')])
+
+    def test_client_error_is_not_retried(self):
+        """Test that a 4xx error other than 429 fails immediately."""
+        self.server.throttled = 0
+        self.server.status = 403
+
+        with RemoveBgClient("test-key", api_url=self.api_url, backoff=0) as client:
+            with self.assertRaises(IOError):
+                client.remove_background_data(b"not-an-image")
+
+        self.assertEqual(self.server.requests, 1)
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
-
@@ -6,7 +6,7 @@ from PIL import Image
 # Adjust the path to import from the parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from image_ops.resize import resize_image
+from image_ops.resize import resize, resize_image, resize_variants, parse_variant
 from image_ops.utils import get_image_name
 
 class TestImageResize(unittest.TestCase):
@@ -36,6 +36,45 @@ class TestImageResize(unittest.TestCase):
             self.assertEqual(img.size, (width, height))
         self.assertEqual(result_path, output_path)
 
+    def test_resize_uses_jpeg_draft_mode(self):
+        """Test that large JPEG downscales are decoded at a reduced scale."""
+        jpeg_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.jpeg'))
+        with Image.open(jpeg_path) as img:
+            resized_img = resize(img, 64, 64, preset='fast')
+            self.assertEqual(resized_img.size, (64, 64))
+            self.assertLess(img.size, (1024, 1024))
+
+        with Image.open(jpeg_path) as img:
+            resize(img, 64, 64, resample='lanczos', preset='quality')
+            self.assertEqual(img.size, (1024, 1024))
+
+    def test_resize_rejects_unknown_preset(self):
+        """Test that an unknown preset or filter raises a ValueError."""
+        with Image.open(self.input_image_path) as img:
+            with self.assertRaises(ValueError):
+                resize(img, 10, 10, preset='ultra')
+            with self.assertRaises(ValueError):
+                resize(img, 10, 10, resample='sinc')
+
+    def test_resize_variants(self):
+        """Test building fit, fill and exact variants from one decode."""
+        variants = [parse_variant("64"), parse_variant("200x100:fill"), parse_variant("30x40"), parse_variant("4096")]
+        with Image.open(self.input_image_path) as img:
+            source_size = img.size
+            results = resize_variants(img, variants)
+
+        self.assertEqual(results[0].size, (64, 64))
+        self.assertEqual(results[1].size, (200, 100))
+        self.assertEqual(results[2].size, (30, 40))
+        # Fit variants never enlarge the source
+        self.assertEqual(results[3].size, source_size)
+
+    def test_parse_variant_rejects_bad_specs(self):
+        """Test that malformed variant specs raise a ValueError."""
+        for spec in ["abc", "0", "10x10:stretch", "10x"]:
+            with self.assertRaises(ValueError):
+                parse_variant(spec)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
 
@@ -0,0 +1,38 @@
+import sys
+import os
+import subprocess
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from image_ops import convert, dedupe, resize, stream, tiles, writer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestStartup(unittest.TestCase):
+    def test_parser_matches_operations(self):
+        """Test that the CLI choices and defaults mirror the ones of image_ops."""
+        self.assertEqual(main.FORMAT_CHOICES, list(convert.CONVERSIONS))
+        self.assertEqual(main.AUTO_FORMAT_CHOICES, list(convert.AUTO_FORMATS))
+        self.assertEqual(main.RESAMPLE_CHOICES, list(resize.RESAMPLE_FILTERS))
+        self.assertEqual(main.RESIZE_PRESET_CHOICES, list(resize.RESIZE_PRESETS))
+        self.assertEqual(main.ENCODE_PRESET_CHOICES, list(convert.ENCODE_PRESETS))
+        self.assertEqual(main.STREAM_CHOICES, list(stream.FRAMINGS))
+        self.assertEqual(main.DEDUPE_CHOICES, list(dedupe.FAN_OUT_MODES))
+        self.assertEqual(main.DURABILITY_CHOICES, list(writer.DURABILITY_LEVELS))
+        self.assertEqual(main.DEFAULT_MEMORY_LIMIT_MB * 1024 * 1024, tiles.DEFAULT_MEMORY_LIMIT)
+
+    def test_help_imports_no_heavy_modules(self):
+        """Test that building the parser and printing help does not load Pillow, rich or requests."""
+        code = (
+            "import sys, contextlib, io, main\n"
+            "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+            "    main.build_parser().parse_args(['--help'])\n"
+            "print(' '.join(m for m in ('PIL', 'numpy', 'requests', 'rich', 'dotenv', 'image_ops') if m in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
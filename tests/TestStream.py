@@ -0,0 +1,50 @@
+import sys
+import os
+import io
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.pipeline import Pipeline
+from image_ops.stream import StreamWriter, output_name, process_stream, read_stream
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        with open(input_image_path, 'rb') as f:
+            self.image_data = f.read()
+
+    def test_framings_round_trip(self):
+        """Test that images written with each framing are read back with their names, in order."""
+        images = [("logo.png", self.image_data), ("icons/small.png", b"abc")]
+        for framing in ('frames', 'tar'):
+            buffer = io.BytesIO()
+            with StreamWriter(buffer, framing) as writer:
+                for name, data in images:
+                    writer.write(name, data)
+            buffer.seek(0)
+            self.assertEqual(list(read_stream(buffer, framing)), images)
+
+        with self.assertRaises(ValueError):
+            list(read_stream(io.BytesIO(b"10 logo.png\nshort"), 'frames'))
+        with self.assertRaises(ValueError):
+            StreamWriter(io.BytesIO(), 'zip')
+
+    def test_process_stream_keeps_input_order(self):
+        """Test that results come back in input order, renamed, with failures reported per image."""
+        images = [("a.png", self.image_data), ("bad.png", b"not an image"), ("dir/b.png", self.image_data)]
+        pipeline = Pipeline().resize(16, 16).to_format('jpg')
+
+        results = list(process_stream(pipeline, images, workers=1, remote_workers=1))
+        self.assertEqual([name for name, _, _, _ in results], ["a.png", "bad.png", "dir/b.png"])
+        self.assertEqual([result[1] for result in results], ["a.jpg", None, "dir/b.jpg"])
+        self.assertIsNotNone(results[1][3])
+        with Image.open(io.BytesIO(results[2][2])) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', (16, 16)))
+
+        self.assertEqual(output_name("dir/b.tar.png", "svg"), "dir/b.tar.svg")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
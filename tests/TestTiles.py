@@ -0,0 +1,61 @@
+import sys
+import os
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops import tiles
+from image_ops.pipeline import Pipeline
+from image_ops.utils import get_image_name
+
+class TestTiles(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = os.path.dirname(__file__)
+        self.test_image_name = get_image_name(self.input_image_path)
+        self.output_files = []
+
+    def tearDown(self):
+        """Clean up after each test."""
+        for file_path in self.output_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _run(self, pipeline, suffix):
+        output_path = os.path.join(self.output_dir, f"{self.test_image_name}_{suffix}")
+        self.output_files.append(output_path)
+        pipeline.run(self.input_image_path, output_path)
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+    def test_strip_boxes_cover_image(self):
+        """Test that strips cover every row exactly once."""
+        boxes = list(tiles.strip_boxes((10, 25), 10))
+        self.assertEqual(boxes, [(0, 0, 10, 10), (0, 10, 10, 20), (0, 20, 10, 25)])
+
+    def test_decoded_size_from_header(self):
+        """Test that the decoded size is estimated from the header."""
+        with Image.open(self.input_image_path) as img:
+            self.assertEqual(tiles.decoded_size(img), img.width * img.height * 4)
+
+    def test_tiled_results_match(self):
+        """Test that tiled mode (a tiny memory limit) gives the same files as whole-image mode."""
+        for suffix, build in [
+            ("flatten.jpg", lambda pipeline: pipeline.to_format('jpg')),
+            ("trace.svg", lambda pipeline: pipeline.to_svg()),
+            ("colors.svg", lambda pipeline: pipeline.to_svg(colors=4)),
+        ]:
+            whole = self._run(build(Pipeline()), f"whole_{suffix}")
+            tiled = self._run(build(Pipeline().limit_memory(1024)), f"tiled_{suffix}")
+            self.assertEqual(whole, tiled, suffix)
+
+    def test_peak_memory(self):
+        """Test that peak memory is reported where the platform supports it."""
+        peak = tiles.peak_memory_mb()
+        if tiles.resource is not None:
+            self.assertGreater(peak, 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,29 +1,36 @@
 import sys
 import os
+import stat
 import unittest
-import subprocess
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from PIL import Image, ImageDraw
+from image_ops import vectorize
 from image_ops.vectorize import vectorize_image
 from image_ops.utils import get_image_name
 
 def is_potrace_available():
-    """Check if potrace executable is available in the project's bin directory or system PATH."""
-    potrace_executable = "potrace.exe"
-    
-    # Check for potrace.exe in the project's bin directory
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    local_potrace_path = os.path.join(project_root, "bin", potrace_executable)
-    if os.path.exists(local_potrace_path):
-        return True
-
-    # If not found locally, check the system's PATH
+    """Check if a Potrace executable for this OS can be found."""
     try:
-        subprocess.run([potrace_executable, '--version'], check=True, capture_output=True)
+        vectorize._find_potrace()
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    except FileNotFoundError:
         return False
+    finally:
+        vectorize._locate_potrace.cache_clear()
+
+# Stand-in for Potrace: checks that the bitmap arrives as PBM on stdin and answers on stdout.
+FAKE_POTRACE = """#!{python}
+import sys
+data = sys.stdin.buffer.read()
+assert sys.argv[1:5] == ['-', '--svg', '-o', '-'], sys.argv
+if not data.startswith(b'P4'):
+    sys.stderr.write('not a PBM bitmap')
+    sys.exit(1)
+width, height = data.split(b'\\n')[1].split()
+sys.stdout.write('<svg width="%s" height="%s"><path fill="%s"/></svg>' % (width.decode(), height.decode(), sys.argv[-1]))
+"""
 
 @unittest.skipIf(not is_potrace_available(), "Potrace executable not found, skipping vectorization tests.")
 class TestVectorize(unittest.TestCase):
@@ -45,7 +52,7 @@ class TestVectorize(unittest.TestCase):
         output_path = os.path.join(self.output_dir, f"{self.test_image_name}.svg")
         self.output_files.append(output_path)
 
-        result_path = vectorize_image(self.input_image_path, custom_output_path=output_path)
+        result_path = vectorize_image(self.input_image_path, custom_output_path=output_path, backend='potrace')
         
         self.assertTrue(os.path.exists(result_path))
         self.assertEqual(result_path, output_path)
@@ -56,5 +63,119 @@ class TestVectorize(unittest.TestCase):
             self.assertIn('<svg', content)
             self.assertIn('</svg>', content)
 
+class TestPotracePipe(unittest.TestCase):
+    def setUp(self):
+        """Point POTRACE_PATH at a stand-in executable."""
+        self.output_dir = os.path.dirname(__file__)
+        self.input_image_path = os.path.abspath(os.path.join(self.output_dir, '..', 'assets', 'logo.png'))
+        self.output_path = os.path.join(self.output_dir, "test_potrace_pipe.svg")
+        self.fake_potrace = os.path.join(self.output_dir, "fake_potrace.py")
+        with open(self.fake_potrace, 'w') as f:
+            f.write(FAKE_POTRACE.format(python=sys.executable))
+        os.chmod(self.fake_potrace, os.stat(self.fake_potrace).st_mode | stat.S_IXUSR)
+
+        self.previous_path = os.environ.get("POTRACE_PATH")
+        os.environ["POTRACE_PATH"] = self.fake_potrace
+        vectorize._locate_potrace.cache_clear()
+
+    def tearDown(self):
+        """Restore the environment and clean up."""
+        if self.previous_path is None:
+            os.environ.pop("POTRACE_PATH", None)
+        else:
+            os.environ["POTRACE_PATH"] = self.previous_path
+        vectorize._locate_potrace.cache_clear()
+        for file_path in (self.fake_potrace, self.output_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_streams_without_temp_files(self):
+        """Test that the bitmap is piped in, the SVG read back, and nothing else is written."""
+        before = set(os.listdir(self.output_dir))
+        vectorize_image(self.input_image_path, custom_output_path=self.output_path, color='#123456', backend='potrace')
+
+        with open(self.output_path, 'r') as f:
+            content = f.read()
+        with Image.open(self.input_image_path) as img:
+            self.assertIn(f'width="{img.width}" height="{img.height}"', content)
+        self.assertIn('fill="#123456"', content)
+        self.assertEqual(set(os.listdir(self.output_dir)) - before, {os.path.basename(self.output_path)})
+
+class TestNativeVectorize(unittest.TestCase):
+    def setUp(self):
+        """Set up a black disc with a hole and a few specks on white."""
+        self.output_dir = os.path.dirname(__file__)
+        self.input_image_path = os.path.join(self.output_dir, "test_native_trace.png")
+        self.output_path = os.path.join(self.output_dir, "test_native_trace.svg")
+
+        img = Image.new('RGB', (120, 120), 'white')
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((10, 10, 110, 110), fill='black')
+        draw.ellipse((45, 45, 75, 75), fill='white')
+        draw.point([(2, 2), (117, 3)], fill='black')
+        img.save(self.input_image_path)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        for file_path in (self.input_image_path, self.output_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_native_vectorize(self):
+        """Test tracing in-process: one path with the outline and the hole, specks dropped."""
+        result_path = vectorize_image(self.input_image_path, custom_output_path=self.output_path, color='#ff0000')
+        self.assertEqual(result_path, self.output_path)
+
+        with open(result_path, 'r') as f:
+            content = f.read()
+        self.assertIn('<svg', content)
+        self.assertIn('viewBox="0 0 120 120"', content)
+        self.assertIn('fill="#ff0000"', content)
+        self.assertEqual(content.count('<path'), 1)
+        # Outer outline and hole, but no subpaths for the single-pixel specks
+        self.assertEqual(content.count('M'), 2)
+
+    def test_turd_size_zero_keeps_specks(self):
+        """Test that specks are traced when turd_size allows them."""
+        vectorize_image(self.input_image_path, custom_output_path=self.output_path, turd_size=0)
+        with open(self.output_path, 'r') as f:
+            self.assertEqual(f.read().count('M'), 4)
+
+    def test_color_layers(self):
+        """Test that a multi-color image is traced into one stacked layer per color."""
+        img = Image.new('RGB', (90, 90), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((10, 10, 59, 59), fill=(200, 0, 0))
+        draw.rectangle((40, 40, 79, 79), fill=(0, 0, 200))
+        img.save(self.input_image_path)
+
+        vectorize_image(self.input_image_path, custom_output_path=self.output_path, colors=3)
+        with open(self.output_path, 'r') as f:
+            content = f.read()
+
+        # Most common color first, each painted over the previous ones
+        fills = [content.index(f'fill="{color}"') for color in ('#ffffff', '#c80000', '#0000c8')]
+        self.assertEqual(fills, sorted(fills))
+        self.assertEqual(content.count('<path'), 3)
+
+    def test_missing_potrace_is_cached(self):
+        """Test that a missing Potrace is looked up once and reported as FileNotFoundError."""
+        os.environ["POTRACE_PATH"] = os.path.join(self.output_dir, "missing_potrace")
+        vectorize._locate_potrace.cache_clear()
+        for _ in range(2):
+            with self.assertRaises(FileNotFoundError):
+                vectorize.vectorize(Image.new('RGB', (8, 8)), self.output_path, backend='potrace')
+        self.assertEqual(vectorize._locate_potrace.cache_info().misses, 1)
+
+    def test_colors_require_native_backend(self):
+        """Test that color tracing is rejected with the Potrace backend."""
+        with self.assertRaises(ValueError):
+            vectorize.vectorize(Image.new('RGB', (8, 8)), self.output_path, colors=3, backend='potrace')
+
+    def test_invalid_color(self):
+        """Test that an invalid color is rejected."""
+        with self.assertRaises(ValueError):
+            vectorize_image(self.input_image_path, custom_output_path=self.output_path, color='red')
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
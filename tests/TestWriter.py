@@ -0,0 +1,118 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_ops.batch import run_batch
+from image_ops.pipeline import Pipeline
+from image_ops.utils import clone_file, place_copy
+from image_ops.writer import OutputWriter
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment."""
+        self.input_image_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'logo.png'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_submit_writes_files_atomically(self):
+        """Test that every durability level puts each file in place, leaving no temporary files."""
+        for durability in ('none', 'batch', 'always'):
+            # A limit below one file's size: each submission waits for the previous ones
+            with OutputWriter(workers=3, durability=durability, max_pending_bytes=1000) as writer:
+                futures = []
+                for index in range(20):
+                    path = os.path.join(self.output_dir, f"{durability}{index}.bin")
+                    futures.append((writer.submit([(path, bytes([index]) * 2000)]), path))
+            for index, (future, path) in enumerate(futures):
+                self.assertEqual(future.result(), [path])
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), bytes([index]) * 2000)
+
+        self.assertFalse([name for name in os.listdir(self.output_dir) if name.endswith('.part')])
+
+    def test_submit_replaces_existing_files(self):
+        """Test that an existing output is replaced, with the permissions of a normally created file."""
+        path = os.path.join(self.output_dir, 'out.bin')
+        with open(path, 'wb') as f:
+            f.write(b"old")
+        with OutputWriter() as writer:
+            writer.submit([(path, b"new")]).result()
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"new")
+        if os.name == 'posix':
+            umask = os.umask(0)
+            os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+
+    def test_failed_write_leaves_nothing(self):
+        """Test that a write that cannot be done fails its future."""
+        path = os.path.join(self.output_dir, 'missing', 'out.bin')
+        with OutputWriter() as writer:
+            future = writer.submit([(path, b"data")])
+            with self.assertRaises(OSError):
+                future.result()
+
+        with self.assertRaises(ValueError):
+            OutputWriter(durability='sometimes')
+
+    def test_copies_replace_outputs_atomically(self):
+        """Test that copies, links and clones replace an output by renaming, leaving files linked to it unchanged."""
+        source = os.path.join(self.output_dir, 'source.bin')
+        with open(source, 'wb') as f:
+            f.write(b"new")
+        for place in (place_copy, clone_file, lambda s, o: place_copy(s, o, link=True)):
+            linked = os.path.join(self.output_dir, 'linked.bin')
+            output = os.path.join(self.output_dir, 'out.bin')
+            with open(linked, 'wb') as f:
+                f.write(b"old")
+            os.link(linked, output)
+
+            self.assertEqual(place(source, output), output)
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), b"new")
+            with open(linked, 'rb') as f:
+                self.assertEqual(f.read(), b"old")
+            os.remove(linked)
+            os.remove(output)
+
+        self.assertFalse([name for name in os.listdir(self.output_dir) if name.endswith('.part')])
+
+    def test_render_returns_files(self):
+        """Test that render encodes the outputs without writing them."""
+        output_path = os.path.join(self.output_dir, 'logo.jpg')
+        pipeline = Pipeline().resize(32, 32).to_format('jpg')
+        path, files = pipeline.render(self.input_image_path, output_path)
+
+        self.assertEqual(path, output_path)
+        self.assertEqual([name for name, _ in files], [output_path])
+        self.assertTrue(files[0][1].startswith(b'\xff\xd8'))
+        self.assertFalse(os.path.exists(output_path))
+
+        pipeline = Pipeline().to_format('png').to_variants(['16', '32'])
+        path, files = pipeline.render(self.input_image_path, os.path.join(self.output_dir, 'logo.png'))
+        self.assertEqual([name for name, _ in files], pipeline.output_paths(path))
+
+    def test_run_batch_with_writer(self):
+        """Test that run_batch yields jobs once the writer has put their files in place."""
+        jobs = [(self.input_image_path, os.path.join(self.output_dir, f"logo{index}.jpg")) for index in range(3)]
+        jobs.append((self.input_image_path, os.path.join(self.output_dir, 'missing', 'logo.jpg')))
+
+        with OutputWriter(durability='batch') as writer:
+            results = {output_path: error for _, output_path, error in run_batch(Pipeline().resize(32, 32).to_format('jpg'), jobs, workers=2, writer=writer)}
+            for _, output_path in jobs[:3]:
+                self.assertIsNone(results[output_path])
+                with Image.open(output_path) as img:
+                    self.assertEqual(img.size, (32, 32))
+            self.assertIsInstance(results[jobs[3][1]], OSError)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)